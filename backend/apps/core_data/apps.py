@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoreDataConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.core_data"
+
+    def ready(self):
+        import apps.core_data.signals
@@ -0,0 +1,117 @@
+# backend/apps/core_data/autocomplete.py
+#
+# Autocomplete for the pass-creation form's dropdowns: up to
+# AUTOCOMPLETE_PAGE_SIZE {id, label} pairs whose label starts with the typed
+# prefix, instead of whole driver, vehicle, purpose and employee lists.
+#
+# Each source is matched with a prefix query its indexes can serve (see
+# migrations/0004_autocomplete_indexes.py) and results are kept in an
+# in-process LRU of AUTOCOMPLETE_CACHE_SIZE prefixes, tagged with the source's
+# version (versions.py); a save to the source moves its version, so popular
+# prefixes are answered without a query until the data changes.
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Trim
+
+from apps.drivers.models import Driver
+from apps.vehicles import plates
+from apps.vehicles.models import Vehicle
+from . import versions
+from .models import Purpose
+
+
+class LRUCache:
+    """A bounded mapping that drops the least recently used entry when full."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Source:
+    def __init__(self, name, queryset, label, matches, normalize=str.strip):
+        self.name = name
+        self.queryset = queryset
+        self.label = label
+        self.matches = matches
+        self.normalize = normalize
+
+    def version(self):
+        return versions.get(f'autocomplete:{self.name}')
+
+    def bump(self):
+        versions.bump_on_commit(f'autocomplete:{self.name}')
+
+    def lookup(self, prefix, limit):
+        queryset = self.queryset()
+        if prefix:
+            queryset = queryset.filter(self.matches(prefix))
+        return [
+            {'id': pk, 'label': label}
+            for pk, label in queryset.annotate(label=self.label).order_by('label', 'pk').values_list('pk', 'label')[:limit]
+        ]
+
+
+def _employees():
+    # Anyone may list employees (visitors pick whom they visit), so only by
+    # name: matching or showing usernames would let them enumerate accounts.
+    return get_user_model().objects.filter(is_active=True).exclude(first_name='', last_name='')
+
+
+SOURCES = {
+    source.name: source for source in [
+        Source(
+            'drivers', Driver.objects.all, Concat('name', Value(' ('), 'license_number', Value(')')),
+            lambda prefix: Q(name__istartswith=prefix) | Q(license_number__istartswith=prefix),
+        ),
+        Source(
+            'vehicles', Vehicle.objects.all, F('vehicle_number'),
+            lambda prefix: Q(plate_key__startswith=prefix), normalize=plates.canonical,
+        ),
+        Source('purposes', Purpose.objects.all, F('name'), lambda prefix: Q(name__istartswith=prefix)),
+        Source(
+            'employees', _employees, Trim(Concat('first_name', Value(' '), 'last_name')),
+            lambda prefix: Q(first_name__istartswith=prefix) | Q(last_name__istartswith=prefix),
+        ),
+    ]
+}
+
+recent_prefixes = LRUCache(maxsize=settings.AUTOCOMPLETE_CACHE_SIZE)
+
+
+def complete(source, prefix, version, limit):
+    """Up to `limit` {id, label} for `prefix`, from the LRU when `version` still matches."""
+    key = (source.name, prefix, limit)
+    hit = recent_prefixes.get(key)
+    if hit is not None and hit[0] == version:
+        return hit[1]
+    results = source.lookup(prefix, limit)
+    recent_prefixes.set(key, (version, results))
+    return results
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0002_populate_initial_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gate',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='purpose',
+            name='change_seq',
+            field=models.BigIntegerField(db_index=True, default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-19 15:02
+
+from django.db import migrations
+
+# Case-insensitive prefix matches (istartswith) compare UPPER(column) with LIKE
+# 'PREFIX%'; only pattern_ops indexes on that expression can serve them.
+PREFIX_INDEXES = [
+    ('driver_name_prefix_idx', 'drivers_driver', 'UPPER(name::text)', 'text_pattern_ops'),
+    ('driver_license_prefix_idx', 'drivers_driver', 'UPPER(license_number::text)', 'text_pattern_ops'),
+    ('purpose_name_prefix_idx', 'core_data_purpose', 'UPPER(name::text)', 'text_pattern_ops'),
+    ('user_first_name_prefix_idx', 'users_customuser', 'UPPER(first_name::text)', 'text_pattern_ops'),
+    ('user_last_name_prefix_idx', 'users_customuser', 'UPPER(last_name::text)', 'text_pattern_ops'),
+    ('user_username_prefix_idx', 'users_customuser', 'UPPER(username::text)', 'text_pattern_ops'),
+    ('vehicle_plate_key_prefix_idx', 'vehicles_vehicle', 'plate_key', 'varchar_pattern_ops'),
+]
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # SQLite's LIKE optimization needs no extra index; the others are PostgreSQL syntax.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, expression, opclass in PREFIX_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} (({expression}) {opclass})')
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, *_ in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0003_gate_change_seq_purpose_change_seq'),
+        ('drivers', '0002_driver_change_seq'),
+        ('users', '0001_initial'),
+        ('vehicles', '0003_plate_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
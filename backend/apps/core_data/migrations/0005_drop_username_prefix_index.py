@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:25
+
+from django.db import migrations
+
+
+def drop_username_prefix_index(apps, schema_editor):
+    # Employee autocomplete no longer matches usernames (apps/core_data/autocomplete.py).
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS user_username_prefix_idx')
+
+
+def create_username_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS user_username_prefix_idx ON users_customuser ((UPPER(username::text)) text_pattern_ops)'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0004_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_username_prefix_index, create_username_prefix_index),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from apps.sync.models import ChangeTracked
 
 class VehicleType(models.Model):
     name = models.CharField(max_length=255, unique=True)
@@ -7,16 +8,25 @@ class VehicleType(models.Model):
     def __str__(self):
         return self.name
 
-class Purpose(models.Model):
+class Purpose(ChangeTracked):
     name = models.CharField(max_length=255, unique=True)
     description = models.TextField(blank=True, null=True)
 
     def __str__(self):
         return self.name
 
-class Gate(models.Model):
+class Gate(ChangeTracked):
     name = models.CharField(max_length=255, unique=True)
     location = models.CharField(max_length=255, blank=True, null=True)
 
     def __str__(self):
         return self.name
+
+
+# Versions of data that server processes keep copies of in memory (versions.py).
+class DataVersion(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,129 @@
+# backend/apps/core_data/reference.py
+#
+# Gates, purposes and vehicle types: a handful of rows that almost never
+# change but are resolved on every gate pass create and serialized into every
+# gate pass and gate log read. Each process loads a table whole, once per
+# version of it (versions.py, bumped on commit by saves and deletes, see
+# signals.py), and then answers from memory:
+#
+# - ReferencePrimaryKeyRelatedField resolves submitted ids without a query;
+# - ReferenceField serializes a row from its foreign key id, so reads need not
+#   join the table, and keeps each row's serialized form;
+# - the core-data list endpoints serve the table with an ETag (views.py).
+#
+# Versions are shared by every process, which sees another's bump within
+# DATA_VERSION_TTL seconds; until then it answers from the table it has. An id
+# missing from a loaded table (a row created since, whose bump this process
+# has not seen yet) is looked up in the database before it is refused.
+
+import copy
+import threading
+
+from django.core.exceptions import ValidationError
+from rest_framework import serializers
+
+from . import versions
+from .models import Gate, Purpose, VehicleType
+
+
+class Snapshot:
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        self.serialized = {}
+
+
+class ReferenceTable:
+    def __init__(self, model):
+        self.model = model
+        self.name = model._meta.model_name
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        return versions.get(f'reference:{self.name}')
+
+    def bump(self):
+        versions.bump_on_commit(f'reference:{self.name}')
+
+    def snapshot(self):
+        version = self.version()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or snapshot.version != version:
+                    rows = {row.pk: row for row in self.model.objects.order_by('pk')}
+                    snapshot = self._snapshot = Snapshot(version, rows)
+        return snapshot
+
+    def all(self):
+        """Every row, by primary key."""
+        return list(self.snapshot().rows.values())
+
+    def get(self, pk):
+        """The row with primary key `pk`, or None. Callers get their own copy."""
+        row = self.snapshot().rows.get(pk)
+        if row is None:
+            return self.model.objects.filter(pk=pk).first()
+        return copy.copy(row)
+
+    def serialize(self, serializer_class, pk):
+        """serializer_class(row).data for the row with primary key `pk`, made once per version."""
+        snapshot = self.snapshot()
+        key = (serializer_class, pk)
+        data = snapshot.serialized.get(key)
+        if data is None:
+            row = snapshot.rows.get(pk) or self.model.objects.filter(pk=pk).first()
+            if row is None:
+                return None
+            data = snapshot.serialized[key] = dict(serializer_class(row).data)
+        return dict(data)
+
+    def forget(self):
+        self._snapshot = None
+
+
+TABLES = {model: ReferenceTable(model) for model in (Gate, Purpose, VehicleType)}
+
+
+def table(model):
+    return TABLES[model]
+
+
+def forget():
+    """Drops every loaded table in this process, e.g. between tests."""
+    for reference_table in TABLES.values():
+        reference_table.forget()
+
+
+class ReferencePrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """A PrimaryKeyRelatedField over a reference table that resolves ids from memory."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        model = self.get_queryset().model
+        try:
+            pk = model._meta.pk.to_python(data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        row = table(model).get(pk)
+        if row is None:
+            self.fail('does_not_exist', pk_value=data)
+        return row
+
+
+class ReferenceField(serializers.Field):
+    """
+    A read-only nested representation of a reference row, taken from its
+    foreign key id: `ReferenceField(GateSerializer, source='gate_id')`.
+    """
+
+    def __init__(self, serializer_class, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.serializer_class = serializer_class
+
+    def to_representation(self, pk):
+        return table(self.serializer_class.Meta.model).serialize(self.serializer_class, pk)
@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+
+from apps.drivers.models import Driver
+from apps.vehicles.models import Vehicle
+from . import reference
+from .autocomplete import SOURCES
+from .models import Purpose
+
+AUTOCOMPLETE_SOURCES = {Driver: 'drivers', Vehicle: 'vehicles', Purpose: 'purposes', get_user_model(): 'employees'}
+
+
+def bump_autocomplete_version(sender, **kwargs):
+    """Cached autocomplete results for a source are stale once one of its rows changes."""
+    SOURCES[AUTOCOMPLETE_SOURCES[sender]].bump()
+
+
+for model in AUTOCOMPLETE_SOURCES:
+    post_save.connect(bump_autocomplete_version, sender=model, dispatch_uid=f'autocomplete-{model._meta.label}-save')
+    post_delete.connect(bump_autocomplete_version, sender=model, dispatch_uid=f'autocomplete-{model._meta.label}-delete')
+
+
+def bump_reference_version(sender, **kwargs):
+    """Every process's copy of a reference table (reference.py) is stale once one of its rows changes."""
+    reference.table(sender).bump()
+
+
+for model in reference.TABLES:
+    post_save.connect(bump_reference_version, sender=model, dispatch_uid=f'reference-{model._meta.label}-save')
+    post_delete.connect(bump_reference_version, sender=model, dispatch_uid=f'reference-{model._meta.label}-delete')
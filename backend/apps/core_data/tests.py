@@ -1,3 +1,129 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from apps.drivers.models import Driver
+from apps.users.models import CustomUser
+from apps.vehicles.models import Vehicle
+from apps.gatepass.serializers import GatePassSerializer
+from . import reference
+from .models import DataVersion, Gate, Purpose, VehicleType
+
+
+class AutocompleteTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='guard', password='password123')
+        for name, license_number in [('Ravi Kumar', 'DL-001'), ('Rahul Singh', 'DL-002'), ('Suresh Rao', 'RA-003')]:
+            Driver.objects.create(
+                name=name, license_number=license_number, contact_details='123', address='Address', status='Active',
+            )
+        self.client.force_authenticate(user=self.user)
+
+    def complete(self, source, q, **headers):
+        return self.client.get(reverse('autocomplete', args=[source]), {'q': q}, **headers)
+
+    def test_prefix_matches_name_or_license(self):
+        response = self.complete('drivers', 'ra')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['label'] for result in response.data['results']],
+            ['Rahul Singh (DL-002)', 'Ravi Kumar (DL-001)', 'Suresh Rao (RA-003)'],
+        )
+        self.assertEqual([r['label'] for r in self.complete('drivers', 'rav').data['results']], ['Ravi Kumar (DL-001)'])
+
+    def test_vehicle_prefix_ignores_separators(self):
+        Vehicle.objects.create(
+            vehicle_number='KA 01 AB 1234', type=VehicleType.objects.create(name='Truck'), make='Make',
+            model='Model', capacity='1', status='Active', registration_date=date.today(),
+        )
+        response = self.complete('vehicles', 'ka-01-a')
+        self.assertEqual([result['label'] for result in response.data['results']], ['KA 01 AB 1234'])
+
+    def test_repeated_prefix_is_served_from_memory_until_the_source_changes(self):
+        self.complete('drivers', 'ra')
+        with self.assertNumQueries(0):
+            response = self.complete('drivers', 'ra')
+        self.assertEqual(len(response.data['results']), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Driver.objects.create(
+                name='Ramesh', license_number='DL-004', contact_details='123', address='Address', status='Active',
+            )
+        with self.assertNumQueries(1):
+            response = self.complete('drivers', 'ra')
+        self.assertEqual(len(response.data['results']), 4)
+
+    def test_unchanged_results_are_not_modified(self):
+        etag = self.complete('purposes', '')['ETag']
+        with self.assertNumQueries(0):
+            response = self.complete('purposes', '', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Purpose.objects.create(name='Audit')
+        self.assertEqual(self.complete('purposes', '', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_employees_are_public_and_other_sources_are_not(self):
+        CustomUser.objects.create_user(username='host', first_name='Anita', last_name='Shah', password='password123')
+        self.client.force_authenticate(user=None)
+        response = self.complete('employees', 'sha')
+        self.assertEqual([result['label'] for result in response.data['results']], ['Anita Shah'])
+        # Usernames are neither matched nor shown.
+        self.assertEqual(self.complete('employees', 'hos').data['results'], [])
+        self.assertNotIn('guard', [result['label'] for result in self.complete('employees', '').data['results']])
+        self.assertEqual(self.complete('drivers', 'ra').status_code, 401)
+
+    def test_unknown_source(self):
+        self.assertEqual(self.complete('gates', 'ma').status_code, 404)
+
+
+class ReferenceDataTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='guard', password='password123')
+        self.gate = Gate.objects.create(name='Reference Gate')
+        self.purpose = Purpose.objects.create(name='Reference Purpose')
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_is_served_from_memory_with_an_etag(self):
+        response = self.client.get(reverse('gate-list'))
+        self.assertIn('Reference Gate', [gate['name'] for gate in response.data['results']])
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('gate-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gate.name = 'Renamed Gate'
+            self.gate.save()
+        response = self.client.get(reverse('gate-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed Gate', [gate['name'] for gate in response.data['results']])
+
+    def test_gate_pass_ids_resolve_without_queries(self):
+        data = {
+            'person_name': 'Visitor', 'person_phone': '555', 'purpose_id': self.purpose.id, 'gate_id': self.gate.id,
+            'entry_time': '2025-01-01T12:00:00Z', 'exit_time': '2025-01-01T13:00:00Z',
+        }
+        self.assertTrue(GatePassSerializer(data=data).is_valid())
+        with self.assertNumQueries(0):
+            serializer = GatePassSerializer(data=data)
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['gate_id'], self.gate)
+        self.assertFalse(GatePassSerializer(data={**data, 'gate_id': 0}).is_valid())
+
+    def test_rows_created_since_loading_are_still_found(self):
+        reference.table(Gate).all()
+        gate = Gate.objects.create(name='Newer Gate')
+        self.assertEqual(reference.table(Gate).get(gate.pk), gate)
+        self.assertEqual(reference.table(Gate).serialize(GatePassSerializer().fields['gate'].serializer_class, gate.pk),
+                         {'id': gate.pk, 'name': 'Newer Gate'})
+
+    def test_changes_made_by_other_processes_are_seen_after_the_ttl(self):
+        self.assertEqual(reference.table(Gate).get(self.gate.pk).name, 'Reference Gate')
+        # Another process renames the gate; its bump reaches this one only through the database.
+        Gate.objects.filter(pk=self.gate.pk).update(name='Renamed Gate')
+        DataVersion.objects.create(name='reference:gate', version=1)
+        self.assertEqual(reference.table(Gate).get(self.gate.pk).name, 'Reference Gate')
+        with override_settings(DATA_VERSION_TTL=0):
+            self.assertEqual(reference.table(Gate).get(self.gate.pk).name, 'Renamed Gate')
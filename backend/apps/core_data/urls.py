@@ -2,7 +2,7 @@
 
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
-from .views import GateViewSet, PurposeViewSet, VehicleTypeViewSet, generate_visitor_qr_code
+from .views import AutocompleteView, GateViewSet, PurposeViewSet, VehicleTypeViewSet, generate_visitor_qr_code
 
 router = DefaultRouter()
 router.register(r'gates', GateViewSet)
@@ -12,4 +12,5 @@ router.register(r'vehicle-types', VehicleTypeViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('visitor-qr-code/', generate_visitor_qr_code, name='visitor-qr-code'),
+    path('autocomplete/<slug:source>/', AutocompleteView.as_view(), name='autocomplete'),
 ]
\ No newline at end of file
@@ -0,0 +1,72 @@
+# backend/apps/core_data/versions.py
+#
+# Version numbers for slow-changing data that server processes keep copies of
+# in memory (autocomplete results, reference data, the pre-approved NID
+# filter). A copy remembers the version it was built from and is rebuilt once
+# the version moves; saves and deletes bump the version when their transaction
+# commits.
+#
+# Versions are DataVersion rows, so a bump in one process reaches every
+# process. Each process reads all of them with one query at most every
+# DATA_VERSION_TTL seconds, so another process's bump is seen within that
+# long; this process's own bumps are seen straight away. That read is not
+# counted against the query budget of the request that happens to make it.
+
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from apps.monitoring import query_budget
+from .models import DataVersion
+
+_versions = {}
+_loaded_at = None
+_lock = threading.Lock()
+
+
+def _current():
+    global _versions, _loaded_at
+    now = time.monotonic()
+    if _loaded_at is None or now - _loaded_at >= settings.DATA_VERSION_TTL:
+        with _lock:
+            if _loaded_at is None or now - _loaded_at >= settings.DATA_VERSION_TTL:
+                with query_budget.unbudgeted():
+                    _versions = dict(DataVersion.objects.values_list('name', 'version'))
+                _loaded_at = now
+    return _versions
+
+
+def get(name):
+    """The current version of `name`; 0 until it is first bumped."""
+    return _current().get(name, 0)
+
+
+def bump(name):
+    """Moves `name` to a new version for every process and returns it."""
+    versions = DataVersion.objects.filter(name=name)
+    if not versions.update(version=F('version') + 1):
+        try:
+            # Starts from the clock so a version removed and created again never repeats one.
+            with transaction.atomic():
+                DataVersion.objects.create(name=name, version=time.time_ns())
+        except IntegrityError:
+            versions.update(version=F('version') + 1)
+    version = versions.values_list('version', flat=True).get()
+    with _lock:
+        _versions[name] = version
+    return version
+
+
+def bump_on_commit(name):
+    transaction.on_commit(partial(bump, name))
+
+
+def forget():
+    """Drops this process's copy of the versions, e.g. between tests."""
+    global _versions, _loaded_at
+    with _lock:
+        _versions, _loaded_at = {}, None
@@ -7,27 +7,121 @@ from io import BytesIO
 # Create your views here.
 # backend/apps/core_data/views.py
 
-from rest_framework import viewsets, permissions
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from rest_framework import viewsets, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.monitoring.query_budget import QueryBudgetMixin
+from apps.sync.conditional import ConditionalGetMixin, make_etag, not_modified, set_validators
+from . import autocomplete, reference
 from .models import Gate, Purpose, VehicleType
 from .serializers import GateSerializer, PurposeSerializer, VehicleTypeSerializer
 
+class ReferenceDataMixin(ConditionalGetMixin):
+    """
+    Lists and retrieves a reference table (gates, purposes, vehicle types)
+    from the in-process cache (reference.py), validated by the table's
+    version: no query at all while it is loaded and unchanged.
+    """
+
+    def reference_table(self):
+        return reference.table(self.queryset.model)
+
+    def list_validators(self, queryset):
+        return make_etag(self.request, self.reference_table().version()), None
+
+    def object_validators(self, instance):
+        return make_etag(self.request, instance.pk, self.reference_table().version()), None
+
+    def get_object(self):
+        if self.action != 'retrieve':
+            return super().get_object()
+        # Updates and deletes work on a fresh row; reads can use the cached one.
+        table = self.reference_table()
+        try:
+            row = table.get(table.model._meta.pk.to_python(self.kwargs[self.lookup_url_kwarg or self.lookup_field]))
+        except ValidationError:
+            row = None
+        if row is None:
+            raise Http404
+        self.check_object_permissions(self.request, row)
+        return row
+
+    def list(self, request, *args, **kwargs):
+        etag, _ = self.list_validators(None)
+        response = not_modified(request, etag)
+        if response is not None:
+            return response
+
+        rows = self.reference_table().all()
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(rows, many=True).data)
+        return set_validators(response, etag)
+
+
 # Gate ViewSet - Accessible only by Admins/Staff
-class GateViewSet(viewsets.ModelViewSet):
+class GateViewSet(QueryBudgetMixin, ReferenceDataMixin, viewsets.ModelViewSet):
     queryset = Gate.objects.all()
     serializer_class = GateSerializer
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can manage gates
+    query_budget = {'list': 1, 'retrieve': 1}
 
 # Purpose ViewSet - Accessible only by Admins/Staff
-class PurposeViewSet(viewsets.ModelViewSet):
+class PurposeViewSet(QueryBudgetMixin, ReferenceDataMixin, viewsets.ModelViewSet):
     queryset = Purpose.objects.all()
     serializer_class = PurposeSerializer
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can manage purposes
+    query_budget = {'list': 1, 'retrieve': 1}
 
 # VehicleType ViewSet - Accessible only by Admins/Staff
-class VehicleTypeViewSet(viewsets.ModelViewSet):
+class VehicleTypeViewSet(QueryBudgetMixin, ReferenceDataMixin, viewsets.ModelViewSet):
     queryset = VehicleType.objects.all()
     serializer_class = VehicleTypeSerializer
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can manage vehicle types
+    query_budget = {'list': 1, 'retrieve': 1}
+
+class AutocompleteView(QueryBudgetMixin, APIView):
+    """
+    Up to AUTOCOMPLETE_PAGE_SIZE `{id, label}` pairs of drivers, vehicles,
+    purposes or employees starting with `?q=` (all of them, by label, when
+    empty). Responses carry an ETag that changes only when the source's data
+    does; send it back in If-None-Match to get 304.
+    """
+    query_budget = 1
+
+    def get_permissions(self):
+        # The public visitor form picks the employee to visit.
+        if self.kwargs.get('source') == 'employees':
+            return [permissions.AllowAny()]
+        return [permissions.IsAuthenticated()]
+
+    def get(self, request, source):
+        source = autocomplete.SOURCES.get(source)
+        if source is None:
+            return Response({"detail": "Unknown autocomplete source."}, status=status.HTTP_404_NOT_FOUND)
+        prefix = source.normalize(request.query_params.get('q', ''))[:64]
+        version = source.version()
+        digest = hashlib.sha1(prefix.encode()).hexdigest()[:16]
+        etag = f'"{source.name}-{version}-{digest}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        limit = settings.AUTOCOMPLETE_PAGE_SIZE
+        response = Response({'results': autocomplete.complete(source, prefix, version, limit)})
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
 
 def generate_visitor_qr_code(request):
     # Construct the URL for the visitor form
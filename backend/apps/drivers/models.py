@@ -1,6 +1,7 @@
 from django.db import models
+from apps.sync.models import ChangeTracked
 
-class Driver(models.Model):
+class Driver(ChangeTracked):
     name = models.CharField(max_length=255)
     license_number = models.CharField(max_length=255, unique=True)
     contact_details = models.CharField(max_length=255)
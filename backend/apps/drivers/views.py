@@ -1,11 +1,12 @@
 # backend/apps/drivers/views.py
 
 from rest_framework import viewsets, permissions
+from apps.sync.conditional import ConditionalGetMixin
 from .models import Driver
 from .serializers import DriverSerializer
 
 # Driver ViewSet - Accessible only by Admins/Staff
-class DriverViewSet(viewsets.ModelViewSet):
+class DriverViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Driver.objects.all()
     serializer_class = DriverSerializer
     permission_classes = [permissions.IsAuthenticated] # Only authenticated users can manage drivers
\ No newline at end of file
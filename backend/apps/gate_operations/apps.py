@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GateOperationsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.gate_operations"
+
+    def ready(self):
+        import apps.gate_operations.signals
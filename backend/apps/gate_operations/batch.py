@@ -0,0 +1,144 @@
+# backend/apps/gate_operations/batch.py
+#
+# Batched scan ingestion for scanners that queue scans and upload them
+# together, e.g. after a network outage. Every event carries a client-made
+# UUID (GateLog.event_id), so a retried upload records nothing twice. The
+# whole batch is resolved in memory from a handful of queries and written
+# with one bulk_create.
+
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.gatepass import expiry
+from apps.gatepass.models import GatePass
+from . import events, occupancy, presence
+from .models import GateLog
+
+
+class ScanBatchError(ValueError):
+    pass
+
+
+def parse_event_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ScanBatchError(f'Invalid event_id: {value!r}.')
+
+
+def recorded_event_ids(event_ids):
+    """The subset of `event_ids` that already have a GateLog row."""
+    return set(GateLog.objects.filter(event_id__in=event_ids).values_list('event_id', flat=True))
+
+
+def parse_qr_code(qr_code_data):
+    """Returns the gate pass id in a scanned QR payload; raises ValueError with the reason otherwise."""
+    try:
+        gatepass_id = json.loads(qr_code_data).get('gatepass_id')
+    except (json.JSONDecodeError, AttributeError, TypeError):
+        raise ValueError("Invalid QR code data format.")
+    if not gatepass_id:
+        raise ValueError("QR code data missing 'gatepass_id'.")
+    try:
+        return int(gatepass_id)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid QR code data format.")
+
+
+def _parse_event(event):
+    if not isinstance(event, dict):
+        raise ScanBatchError('Each event must be an object.')
+    event_id = parse_event_id(event.get('event_id'))
+    qr_code_data = event.get('qr_code_data')
+    if not isinstance(qr_code_data, str):
+        raise ScanBatchError(f'Event {event_id} has no qr_code_data.')
+    scanned_at = event.get('scanned_at')
+    try:
+        scanned_at = timezone.now() if scanned_at is None else datetime.fromtimestamp(int(scanned_at), tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ScanBatchError(f'Event {event_id} has an invalid scanned_at.')
+    return event_id, qr_code_data, scanned_at
+
+
+def ingest_scan_batch(user, gate_id, raw_events):
+    """
+    Validates and records a batch of scans, returning one verdict per event
+    in the order received:
+
+        {"event_id": ..., "verdict": "entry" | "exit" | "rejected" | "invalid" | "duplicate",
+         "gatepass_id": ..., "reason": ...}
+
+    Events are applied to each pass's presence state in scan-time order, so
+    a pass scanned twice in one batch gets an entry and then an exit, exactly
+    as if the scans had been sent one by one.
+    """
+    if not isinstance(raw_events, list):
+        raise ScanBatchError('events must be a list.')
+    if len(raw_events) > settings.SCAN_BATCH_MAX_EVENTS:
+        raise ScanBatchError(f'At most {settings.SCAN_BATCH_MAX_EVENTS} events per batch.')
+    parsed = [_parse_event(event) for event in raw_events]
+
+    pass_ids, qr_errors = {}, {}
+    for event_id, qr_code_data, _ in parsed:
+        try:
+            pass_ids[event_id] = parse_qr_code(qr_code_data)
+        except ValueError as e:
+            qr_errors[event_id] = str(e)
+
+    with transaction.atomic():
+        # Locking the passes serialises batches that touch the same passes,
+        # including a batch retried while the first attempt is still running.
+        passes = GatePass.objects.select_for_update().in_bulk(set(pass_ids.values()))
+        already_recorded = recorded_event_ids([event_id for event_id, _, _ in parsed])
+        verdicts, logs, moved = _resolve(user, gate_id, parsed, pass_ids, qr_errors, passes, already_recorded)
+        presence.save_presence(moved)
+        # ignore_conflicts is a last line of defence for duplicate event ids.
+        GateLog.objects.bulk_create(logs, batch_size=500, ignore_conflicts=True)
+    events.publish_log_counters(logs)
+    return verdicts
+
+
+def _resolve(user, gate_id, parsed, pass_ids, qr_errors, passes, already_recorded):
+    verdicts, logs, seen, moved = [None] * len(parsed), [], set(), {}
+    in_scan_order = sorted(range(len(parsed)), key=lambda index: parsed[index][2])
+    for index in in_scan_order:
+        event_id, qr_code_data, scanned_at = parsed[index]
+        if event_id in already_recorded or event_id in seen:
+            verdicts[index] = {'event_id': str(event_id), 'verdict': 'duplicate'}
+            continue
+        seen.add(event_id)
+
+        log = GateLog(
+            event_id=event_id, security_personnel=user, gate_id=gate_id,
+            timestamp=scanned_at, scanned_data=qr_code_data,
+        )
+        gate_pass = passes.get(pass_ids.get(event_id))
+        if event_id in qr_errors:
+            log.action, log.status, log.reason = 'scan_attempt', 'failure', qr_errors[event_id]
+            verdict = 'invalid'
+        elif gate_pass is None:
+            log.action, log.status, log.reason = 'scan_attempt', 'failure', "Gate Pass not found."
+            verdict = 'invalid'
+        else:
+            log.gate_pass = gate_pass
+            refusal = expiry.scan_refusal(gate_pass, scanned_at)
+            if refusal is not None:
+                log.action, log.status, log.reason = 'scan_attempt', 'failure', refusal
+                verdict = 'rejected'
+            else:
+                log.action, log.status = presence.next_action(gate_pass), 'success'
+                moved.setdefault(gate_pass.id, (gate_pass, occupancy.state(gate_pass)))
+                presence.apply(gate_pass, log.action, scanned_at, gate_id=gate_id)
+                verdict = log.action
+
+        logs.append(log)
+        verdicts[index] = {
+            'event_id': str(event_id), 'verdict': verdict,
+            'gatepass_id': pass_ids.get(event_id), 'reason': log.reason,
+        }
+    return verdicts, logs, moved
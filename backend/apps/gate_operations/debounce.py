@@ -0,0 +1,127 @@
+# backend/apps/gate_operations/debounce.py
+#
+# Guards often scan the same QR code twice within a few seconds. Without a
+# guard against it, the second scan writes another GateLog row and turns the
+# entry that just happened into an exit. Every accepted scan is remembered
+# here for a short while, keyed by pass:
+#
+# - a repeat scan of the pass at the same gate within SCAN_DEBOUNCE_SECONDS
+#   is answered with the response the first scan got, without touching the
+#   database;
+# - a scan of the pass at a different gate within SCAN_ANTI_PASSBACK_SECONDS
+#   is refused (anti-passback: one pass, two gates, moments apart).
+#
+# Recent scans live in a bounded in-process map. With several server
+# processes, set SCAN_DEBOUNCE_CACHE to a shared cache alias (e.g. Redis) so
+# a repeat that lands on another process is caught too; both are then read
+# and the later scan wins, since this process's own may be stale.
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+REPEAT = 'repeat'
+PASSBACK = 'passback'
+
+
+class TTLMap:
+    """A bounded mapping whose entries expire `ttl` seconds after they are set."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._items[key] = (now + ttl, value)
+            self._items.move_to_end(key)
+            # Entries share one ttl, so the oldest are at the front.
+            while self._items and (len(self._items) > self.maxsize or next(iter(self._items.values()))[0] <= now):
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+recent_scans = TTLMap(maxsize=10000)
+
+
+def window():
+    return max(settings.SCAN_DEBOUNCE_SECONDS, settings.SCAN_ANTI_PASSBACK_SECONDS)
+
+
+def _shared_cache():
+    alias = settings.SCAN_DEBOUNCE_CACHE
+    return caches[alias] if alias else None
+
+
+def _cache_key(gatepass_id):
+    return f'scan-recent:{gatepass_id}'
+
+
+def lookup(gatepass_id):
+    """The latest accepted scan of the pass remembered here or in the shared cache, or None."""
+    scan = recent_scans.get(gatepass_id)
+    shared = _shared_cache()
+    if shared is not None:
+        shared_scan = shared.get(_cache_key(gatepass_id))
+        if shared_scan is not None and (scan is None or shared_scan['at'] > scan['at']):
+            scan = shared_scan
+    return scan
+
+
+def check(gatepass_id, gate_id, now=None):
+    """
+    Returns (REPEAT, scan) when the scan repeats the last accepted one,
+    (PASSBACK, scan) when it breaks anti-passback, or (None, None).
+    `scan` holds the remembered gate, time, action and response.
+
+    Anti-passback ignores direction: an exit at one gate refuses an entry at
+    another within the window just as a second entry would, and scans without
+    a gate are never refused.
+    """
+    if window() <= 0:
+        return None, None
+    scan = lookup(gatepass_id)
+    if scan is None:
+        return None, None
+    elapsed = (time.time() if now is None else now) - scan['at']
+    if scan['gate'] == gate_id:
+        if elapsed < settings.SCAN_DEBOUNCE_SECONDS:
+            return REPEAT, scan
+    elif scan['gate'] is not None and gate_id is not None and elapsed < settings.SCAN_ANTI_PASSBACK_SECONDS:
+        return PASSBACK, scan
+    return None, None
+
+
+def remember(gatepass_id, gate_id, action, response, now=None):
+    """Records an accepted scan and the response it got."""
+    ttl = window()
+    if ttl <= 0:
+        return
+    scan = {'gate': gate_id, 'at': time.time() if now is None else now, 'action': action, 'response': response}
+    recent_scans.set(gatepass_id, scan, ttl, now=now)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_cache_key(gatepass_id), scan, ttl)
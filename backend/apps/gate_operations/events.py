@@ -0,0 +1,220 @@
+# backend/apps/gate_operations/events.py
+#
+# In-process publish/subscribe for live gate events. Signal handlers publish
+# scan results, gate pass status changes and dashboard counter deltas once the
+# surrounding transaction commits; the event stream view (GateEventStreamView)
+# subscribes and pushes them to control-room screens as Server-Sent Events.
+#
+# Subscribers live on the ASGI event loop while publishers run in worker
+# threads, so events are handed over with loop.call_soon_threadsafe. With more
+# than one server process, set GATE_EVENTS_BROKER_URL to a Redis URL: events
+# are then published to Redis and every process relays them to its own
+# subscribers.
+#
+# Event ids must keep growing across restarts and be the same in every
+# process, or a client reconnecting with Last-Event-ID would skip every event
+# until the ids caught up. With Redis they come from an INCR on a shared key;
+# in-process they continue from the boot time in microseconds. Both start
+# from the clock, so either is above any id handed out before.
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger('gatepass_project.events')
+
+BROKER_CHANNEL = 'gatepass:gate-events'
+BROKER_ID_KEY = 'gatepass:gate-events:id'
+
+
+def clock_id():
+    return time.time_ns() // 1000
+
+
+class Subscriber:
+    """A bounded queue of events for one open stream."""
+
+    def __init__(self, loop, max_pending=100):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def deliver(self, event):
+        # Runs on the subscriber's event loop.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client that cannot keep up is disconnected rather than letting
+            # the queue grow; it reconnects with Last-Event-ID and catches up
+            # from the replay buffer.
+            self.overflowed = True
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class EventBus:
+    """
+    Fans published events out to local subscribers and keeps the most recent
+    ones so a reconnecting client can resume from its Last-Event-ID.
+    """
+
+    def __init__(self, replay_size=200):
+        self._last_id = clock_id()
+        self.latest_id = None
+        self._recent = deque(maxlen=replay_size)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, max_pending=100):
+        subscriber = Subscriber(asyncio.get_running_loop(), max_pending)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def since(self, last_id):
+        """Buffered events newer than `last_id`, oldest first."""
+        with self._lock:
+            return [event for event in self._recent if event['id'] > last_id]
+
+    def dispatch(self, event_type, data, event_id=None):
+        """Delivers an event to the subscribers of this process, numbered here unless `event_id` is given."""
+        with self._lock:
+            if event_id is None:
+                event_id = self._last_id + 1
+            self._last_id = max(self._last_id, event_id)
+            self.latest_id = event_id
+            event = {'id': event_id, 'type': event_type, 'data': data}
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has been closed.
+                self.unsubscribe(subscriber)
+        return event
+
+
+class RedisRelay:
+    """Publishes events to Redis and relays the channel to the local bus."""
+
+    def __init__(self, url, bus):
+        import redis
+
+        self.bus = bus
+        self.client = redis.Redis.from_url(url)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        self.ensure_listening()
+        # Seeded from the clock once, so ids keep growing if Redis loses the key.
+        self.client.set(BROKER_ID_KEY, clock_id(), nx=True)
+        event_id = self.client.incr(BROKER_ID_KEY)
+        self.client.publish(BROKER_CHANNEL, json.dumps(
+            {'id': event_id, 'type': event_type, 'data': data}, cls=DjangoJSONEncoder,
+        ))
+
+    def ensure_listening(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name='gate-events-relay', daemon=True)
+                self._thread.start()
+
+    def _listen(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(BROKER_CHANNEL)
+        for message in pubsub.listen():
+            try:
+                payload = json.loads(message['data'])
+                self.bus.dispatch(payload['type'], payload['data'], event_id=int(payload['id']))
+            except (TypeError, ValueError, KeyError):
+                logger.warning('Ignoring malformed gate event from the broker: %r', message.get('data'))
+
+
+_bus = None
+_relay = None
+
+
+def get_bus():
+    global _bus
+    if _bus is None:
+        _bus = EventBus()
+    return _bus
+
+
+def get_relay():
+    """The Redis relay when GATE_EVENTS_BROKER_URL is set and redis is installed, else None."""
+    global _relay
+    url = settings.GATE_EVENTS_BROKER_URL
+    if not url:
+        return None
+    if _relay is None:
+        try:
+            _relay = RedisRelay(url, get_bus())
+        except ImportError:
+            logger.error('GATE_EVENTS_BROKER_URL is set but the redis package is not installed; '
+                         'gate events are delivered in-process only.')
+            _relay = False
+    return _relay or None
+
+
+def _send(event_type, data):
+    relay = get_relay()
+    if relay is None:
+        get_bus().dispatch(event_type, data)
+        return
+    try:
+        relay.publish(event_type, data)
+    except Exception:
+        logger.exception('Could not publish gate event to the broker; delivering locally.')
+        get_bus().dispatch(event_type, data)
+
+
+def publish(event_type, data):
+    """Publishes an event once the current transaction (if any) commits."""
+    transaction.on_commit(lambda: _send(event_type, data))
+
+
+def publish_counters(**deltas):
+    """Publishes increments to the dashboard counters, e.g. publish_counters(entries=1)."""
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        publish('counters', deltas)
+
+
+def publish_scan(log):
+    """A 'scan' event for a GateLog row, built only from data already loaded on it."""
+    data = {
+        'id': log.id,
+        'action': log.action,
+        'status': log.status,
+        'reason': log.reason,
+        'gate_pass_id': log.gate_pass_id,
+        'gate_id': log.gate_id,
+        'security_personnel_id': log.security_personnel_id,
+        'timestamp': log.timestamp,
+    }
+    if log.gate_pass_id and log.__class__.gate_pass.is_cached(log):
+        data['person_name'] = log.gate_pass.person_name
+    publish('scan', data)
+
+
+def publish_log_counters(logs):
+    """Counter deltas for GateLog rows written with bulk_create, which sends no post_save signals."""
+    entries = sum(1 for log in logs if log.status == 'success' and log.action == 'entry')
+    exits = sum(1 for log in logs if log.status == 'success' and log.action == 'exit')
+    failed = sum(log.repeat_count for log in logs if log.status == 'failure')
+    publish_counters(entries=entries, exits=exits, inside=entries - exits, failed_scans=failed)
@@ -0,0 +1,360 @@
+# backend/apps/gate_operations/log_writer.py
+#
+# Buffered GateLog writer for the live scan path. With GATE_LOG_BUFFERED on,
+# a scan's log row is appended to a local journal file and kept in memory, and
+# the guard gets the answer straight away; a background thread writes the
+# buffered rows with one bulk_create every GATE_LOG_FLUSH_RECORDS records or
+# GATE_LOG_FLUSH_MS milliseconds, whichever comes first. A flood of failed
+# scans (a camera re-reading garbage) then costs a file append each instead
+# of a database round trip.
+#
+# The journal is what makes this safe across restarts. Each process appends
+# to its own segment (gatelog-<pid>-<n>.jsonl in GATE_LOG_JOURNAL_DIR), synced
+# to disk before the scan is answered, and deletes it once its rows are in the
+# database; rows that fail to write stay queued and journaled for the next
+# flush. Segments left behind by a
+# process that died are replayed by the next flush of any process on the host
+# (or `manage.py flush_gate_log_journal`). Every buffered row carries a fresh
+# event_id, so a segment replayed after its rows were already written inserts
+# nothing twice.
+#
+# Gates listed in GATE_LOG_STRICT_GATES (compliance gates) always write their
+# log row synchronously, before the guard gets an answer.
+#
+# Failed scans go through write_failure(), which folds a failure identical to
+# a recent one (same guard, gate, payload and reason within
+# SCAN_FAILURE_AGGREGATE_SECONDS) into that one's row by bumping its
+# repeat_count and last_seen_at (buffered failures when they are flushed), so
+# a scanner stuck re-reading the same bad code adds one row per window, not
+# millions, whichever worker sees it.
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import DateTimeField, F, Subquery, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import events
+from .models import GateLog
+
+logger = logging.getLogger('gatepass_project.gate_log_writer')
+
+FOREIGN_KEYS = ('gate_pass', 'gate', 'security_personnel')
+SEGMENT_NAME = re.compile(r'^gatelog-(\d+)-(\d+)\.jsonl$')
+
+
+def is_strict(gate_id):
+    return gate_id is not None and str(gate_id) in settings.GATE_LOG_STRICT_GATES
+
+
+def buffers(gate_id):
+    """Whether a scan's log row at `gate_id` is buffered rather than written before answering."""
+    return settings.GATE_LOG_BUFFERED and not is_strict(gate_id)
+
+
+def failure_fingerprint(scanned_data, reason):
+    return hashlib.sha1(f'{reason}\0{scanned_data}'.encode()).hexdigest()
+
+
+def _fk_id(fields, name):
+    if name in fields:
+        obj = fields[name]
+        return obj.pk if obj is not None else None
+    return fields.get(f'{name}_id')
+
+
+def _bump_recent_failure(fields, cutoff, count=1):
+    """Counts `count` failures against the latest identical one seen since `cutoff`; False if there is none."""
+    recent = GateLog.objects.filter(
+        status='failure', fingerprint=fields['fingerprint'], last_seen_at__gte=cutoff,
+        security_personnel_id=_fk_id(fields, 'security_personnel'), gate_id=_fk_id(fields, 'gate'),
+    ).order_by('-last_seen_at').values('pk')[:1]
+    updated = GateLog.objects.filter(pk=Subquery(recent)).update(
+        repeat_count=F('repeat_count') + count,
+        last_seen_at=Greatest('last_seen_at', Value(fields['last_seen_at'], output_field=DateTimeField())),
+    )
+    if updated:
+        events.publish_counters(failed_scans=count)
+    return bool(updated)
+
+
+def collapse_failures(records):
+    """
+    Folds buffered records of identical failures within the aggregation
+    window into the first of them, keeping the order of the rest.
+    """
+    window = settings.SCAN_FAILURE_AGGREGATE_SECONDS
+    collapsed, open_rows = [], {}
+    for record in records:
+        if not record.get('fingerprint'):
+            collapsed.append(record)
+            continue
+        key = (record.get('security_personnel_id'), record.get('gate_id'), record['fingerprint'])
+        seen_at = parse_datetime(record['timestamp'])
+        row = open_rows.get(key)
+        if row is not None and (seen_at - parse_datetime(row['last_seen_at'])).total_seconds() <= window:
+            row['repeat_count'] = row.get('repeat_count', 1) + record.get('repeat_count', 1)
+            row['last_seen_at'] = record['last_seen_at']
+            continue
+        row = open_rows[key] = dict(record)
+        collapsed.append(row)
+    return collapsed
+
+
+def _encode(fields):
+    record = dict(fields)
+    for name in FOREIGN_KEYS:
+        if name in record:
+            obj = record.pop(name)
+            record[f'{name}_id'] = obj.pk if obj is not None else None
+    record['event_id'] = str(record.get('event_id') or uuid.uuid4())
+    record['timestamp'] = (record.get('timestamp') or timezone.now()).isoformat()
+    if record.get('last_seen_at'):
+        record['last_seen_at'] = record['last_seen_at'].isoformat()
+    return record
+
+
+def _decode(record):
+    fields = dict(record)
+    fields['event_id'] = uuid.UUID(fields['event_id'])
+    fields['timestamp'] = parse_datetime(fields['timestamp'])
+    if fields.get('last_seen_at'):
+        fields['last_seen_at'] = parse_datetime(fields['last_seen_at'])
+    return GateLog(**fields)
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class GateLogWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._flush_at_exit = False
+        self._buffer = []
+        self._journal = None
+        self._journal_path = None
+        self._segments = 0
+        self._own_paths = set()
+        # (journal path or None, records) taken off the buffer but not yet in the database.
+        self._pending = []
+
+    def write(self, **fields):
+        """
+        Records a GateLog row. Takes the same arguments as
+        GateLog.objects.create and returns the row when it was written
+        synchronously, or None when it was buffered.
+        """
+        if not buffers(_fk_id(fields, 'gate')):
+            return GateLog.objects.create(**fields)
+
+        record = _encode(fields)
+        with self._lock:
+            journal = self._open_journal()
+            if journal is not None:
+                journal.write(json.dumps(record) + '\n')
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._buffer.append(record)
+            full = len(self._buffer) >= settings.GATE_LOG_FLUSH_RECORDS
+
+        if settings.GATE_LOG_FLUSH_MS > 0:
+            self._start_thread()
+            if full:
+                self._wakeup.set()
+        elif full:
+            self.flush()
+        return None
+
+    def write_failure(self, **fields):
+        """
+        Records a failed scan, folding it into the row of an identical recent
+        failure when there is one. Buffered failures are folded together, and
+        into such a row, when they are flushed.
+        """
+        window = settings.SCAN_FAILURE_AGGREGATE_SECONDS
+        if window <= 0:
+            return self.write(**fields)
+        now = timezone.now()
+        fields.update(
+            status='failure', timestamp=now, last_seen_at=now,
+            fingerprint=failure_fingerprint(fields.get('scanned_data'), fields.get('reason')),
+        )
+        if not buffers(_fk_id(fields, 'gate')) and _bump_recent_failure(fields, now - timedelta(seconds=window)):
+            return None
+        return self.write(**fields)
+
+    def flush(self):
+        """
+        Writes everything buffered, plus any journal left by a dead process.
+        Returns the number of records processed; replayed ones already in the
+        database are skipped on their event_id.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._buffer:
+                    self._pending.append((self._close_journal(), self._buffer))
+                    self._buffer = []
+                pending, self._pending = self._pending + self._orphaned_segments(), []
+
+            written, failed = 0, []
+            for index, (path, records) in enumerate(pending):
+                try:
+                    written += self._insert(records)
+                except DatabaseError:
+                    logger.exception('Could not write %d buffered gate logs; will retry.', len(records))
+                    failed.extend(pending[index:])
+                    break
+                except Exception:
+                    # Not the database being away: keep these for the next
+                    # flush (and their segment for replay) but write the rest.
+                    logger.exception('Could not write %d buffered gate logs; will retry.', len(records))
+                    failed.append((path, records))
+                    continue
+                if path is not None:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass  # Replayed by another process at the same time.
+                    self._own_paths.discard(path)
+            if failed:
+                with self._lock:
+                    self._pending[:0] = failed
+            return written
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._buffer) + sum(len(records) for _, records in self._pending)
+
+    def close(self):
+        """Flushes and closes the journal; the writer can still be used afterwards."""
+        self.flush()
+        with self._lock:
+            self._close_journal()
+
+    def _insert(self, records):
+        logs = [_decode(record) for record in collapse_failures(records)]
+        processed = len(logs)
+        with transaction.atomic():
+            failures = [log for log in logs if log.fingerprint]
+            if failures:
+                # A failure still open in the database (written by an earlier
+                # flush or another process) takes this batch's repeats instead
+                # of a new row. Failures replayed from a journal whose rows
+                # are already written are skipped; ones that were counted on
+                # another row by the lost flush are counted again.
+                written = set(GateLog.objects.filter(
+                    event_id__in=[log.event_id for log in failures],
+                ).values_list('event_id', flat=True))
+                window = timedelta(seconds=settings.SCAN_FAILURE_AGGREGATE_SECONDS)
+                logs = [
+                    log for log in logs
+                    if not log.fingerprint or (log.event_id not in written and not _bump_recent_failure(
+                        {'fingerprint': log.fingerprint, 'last_seen_at': log.last_seen_at,
+                         'security_personnel_id': log.security_personnel_id, 'gate_id': log.gate_id},
+                        log.timestamp - window, count=log.repeat_count,
+                    ))
+                ]
+            GateLog.objects.bulk_create(logs, batch_size=500, ignore_conflicts=True)
+        for log in logs:
+            events.publish_scan(log)
+        events.publish_log_counters(logs)
+        return processed
+
+    # Journal segments; called with self._lock held.
+
+    def _open_journal(self):
+        journal_dir = settings.GATE_LOG_JOURNAL_DIR
+        if not journal_dir:
+            return None
+        if self._journal is None:
+            os.makedirs(journal_dir, exist_ok=True)
+            # Never append to a segment an earlier process with this pid left behind.
+            while True:
+                self._segments += 1
+                self._journal_path = os.path.join(journal_dir, f'gatelog-{os.getpid()}-{self._segments}.jsonl')
+                if not os.path.exists(self._journal_path):
+                    break
+            self._own_paths.add(self._journal_path)
+            self._journal = open(self._journal_path, 'a', encoding='utf-8')
+        return self._journal
+
+    def _close_journal(self):
+        path = self._journal_path
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = self._journal_path = None
+        return path
+
+    def _orphaned_segments(self):
+        """Journal segments of processes that are gone, or of an earlier process with this pid."""
+        journal_dir = settings.GATE_LOG_JOURNAL_DIR
+        if not journal_dir or not os.path.isdir(journal_dir):
+            return []
+        queued = {path for path, _ in self._pending}
+        orphaned = []
+        for name in sorted(os.listdir(journal_dir)):
+            match = SEGMENT_NAME.match(name)
+            path = os.path.join(journal_dir, name)
+            if not match or path in self._own_paths or path in queued:
+                continue
+            pid = int(match.group(1))
+            if pid != os.getpid() and _process_alive(pid):
+                continue
+            with open(path, encoding='utf-8') as journal:
+                # A torn last line is a record whose scan never got an answer.
+                records = []
+                for line in journal:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        logger.warning('Skipping a malformed line in gate log journal %s.', path)
+            orphaned.append((path, records))
+        return orphaned
+
+    # Background flushing.
+
+    def _start_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='gate-log-writer', daemon=True)
+                self._thread.start()
+                if not self._flush_at_exit:
+                    atexit.register(self.flush)
+                    self._flush_at_exit = True
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(settings.GATE_LOG_FLUSH_MS / 1000)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Gate log writer flush failed.')
+            finally:
+                close_old_connections()
+
+
+writer = GateLogWriter()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.gate_operations.log_writer import writer
+
+
+class Command(BaseCommand):
+    help = 'Writes the scan logs left in the buffered gate log journal by stopped server processes.'
+
+    def handle(self, *args, **options):
+        written = writer.flush()
+        self.stdout.write(self.style.SUCCESS(f'{written} gate log(s) written from the journal.'))
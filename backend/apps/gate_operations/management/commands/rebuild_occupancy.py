@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.gate_operations import occupancy
+
+
+class Command(BaseCommand):
+    help = 'Recomputes who is on site and the occupancy counters from the gate scan logs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report counters that differ from the logs.')
+
+    def handle(self, *args, **options):
+        expected = occupancy.counts_from_logs()
+        current = occupancy.current_counts()
+        drift = {
+            gate_id: (current.get(gate_id, 0), expected.get(gate_id, 0))
+            for gate_id in current.keys() | expected.keys()
+            if current.get(gate_id, 0) != expected.get(gate_id, 0)
+        }
+        for gate_id, (counted, logged) in sorted(drift.items(), key=lambda item: item[0] or 0):
+            self.stdout.write(self.style.WARNING(f'{occupancy.gate_key(gate_id)}: counter {counted}, logs {logged}'))
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drift)} counter(s) out of date; nothing changed (dry run).')
+            return
+        counts = occupancy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Occupancy rebuilt: {sum(counts.values())} on site.'))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate_operations', '0003_gatelog_gate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PassRevocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gate_pass_id', models.BigIntegerField()),
+                ('revoked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='gatelog',
+            name='offline',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='gatelog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate_operations', '0004_passrevocation_gatelog_offline_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatelog',
+            name='event_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_presence(apps, schema_editor):
+    """
+    Derives each pass's presence from its scan history: inside if its latest
+    successful entry/exit scan was an entry, with one transition per scan.
+    """
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    GateLog = apps.get_model('gate_operations', 'GateLog')
+
+    transitions = GateLog.objects.filter(gate_pass=OuterRef('pk'), status='success', action__in=['entry', 'exit'])
+    latest = transitions.order_by('-timestamp', '-id')
+    counted = transitions.order_by().values('gate_pass').annotate(total=Count('id')).values('total')
+
+    GatePass.objects.update(
+        transition_count=Coalesce(Subquery(counted, output_field=IntegerField()), 0),
+        presence_changed_at=Subquery(latest.values('timestamp')[:1]),
+    )
+    GatePass.objects.annotate(last_action=Subquery(latest.values('action')[:1])).filter(
+        last_action='entry'
+    ).update(presence='inside')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gate_operations', '0005_gatelog_event_id'),
+        ('gatepass', '0013_gatepass_presence'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_presence, migrations.RunPython.noop),
+    ]
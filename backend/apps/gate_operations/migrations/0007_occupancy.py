@@ -0,0 +1,57 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_occupancy(apps, schema_editor):
+    """
+    Records the gate each pass now inside came in through (that of its latest
+    entry scan) and creates the counters: the site, every gate and entries
+    without a gate, seeded with the passes inside.
+    """
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    GateLog = apps.get_model('gate_operations', 'GateLog')
+    Gate = apps.get_model('core_data', 'Gate')
+    OccupancyCounter = apps.get_model('gate_operations', 'OccupancyCounter')
+
+    latest = GateLog.objects.filter(
+        gate_pass=OuterRef('pk'), status='success', action__in=['entry', 'exit'],
+    ).order_by('-timestamp', '-id')
+    GatePass.objects.filter(presence='inside').update(presence_gate=Subquery(latest.values('gate')[:1]))
+
+    inside = dict(
+        GatePass.objects.filter(presence='inside')
+        .values('presence_gate').annotate(total=Count('id')).values_list('presence_gate', 'total')
+    )
+    counters = [OccupancyCounter(key='site', count=sum(inside.values()))]
+    counters.append(OccupancyCounter(key='gate:none', count=inside.get(None, 0)))
+    counters.extend(
+        OccupancyCounter(key=f'gate:{gate_id}', gate_id=gate_id, count=inside.get(gate_id, 0))
+        for gate_id in Gate.objects.values_list('id', flat=True)
+    )
+    OccupancyCounter.objects.bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0003_gate_change_seq_purpose_change_seq'),
+        ('gate_operations', '0006_backfill_gatepass_presence'),
+        ('gatepass', '0014_gatepass_presence_gate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gate', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core_data.gate')),
+            ],
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0003_gate_change_seq_purpose_change_seq'),
+        ('gate_operations', '0007_occupancy'),
+        ('gatepass', '0014_gatepass_presence_gate'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatelog',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='gatelog',
+            name='last_seen_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gatelog',
+            name='repeat_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='gatelog',
+            index=models.Index(condition=models.Q(('status', 'failure')), fields=['fingerprint', 'last_seen_at'], name='gatelog_failure_flood_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from apps.gatepass.models import GatePass
 from apps.users.models import CustomUser
 
@@ -17,11 +18,22 @@ class GateLog(models.Model):
     gate_pass = models.ForeignKey(GatePass, on_delete=models.CASCADE, null=True, blank=True)
     gate = models.ForeignKey('core_data.Gate', on_delete=models.SET_NULL, null=True, blank=True)
     security_personnel = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Defaults to now, but scans recorded offline keep the time they happened.
+    timestamp = models.DateTimeField(default=timezone.now)
     action = models.CharField(max_length=50, choices=ACTION_CHOICES)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES)
     reason = models.TextField(blank=True, null=True)
     scanned_data = models.TextField(blank=True, null=True)
+    offline = models.BooleanField(default=False)  # Checked by the scanner against an offline snapshot.
+    # Id of a batched or offline scan (made by the client) or of a buffered scan log (see
+    # log_writer.py), so retried uploads and replayed journals are recorded once.
+    event_id = models.UUIDField(unique=True, null=True, blank=True, editable=False)
+    # Identical failed scans (same guard, gate, payload and reason) within
+    # SCAN_FAILURE_AGGREGATE_SECONDS share one row: `timestamp` is the first,
+    # `last_seen_at` the latest and `repeat_count` how many there were.
+    repeat_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    fingerprint = models.CharField(max_length=40, blank=True, default='', editable=False)
 
 
     def __str__(self):
@@ -31,3 +43,40 @@ class GateLog(models.Model):
         verbose_name = "Gate Log"
         verbose_name_plural = "Gate Logs"
         ordering = ['-timestamp']
+        indexes = [
+            # Finding the open aggregate row for a repeated failure.
+            models.Index(
+                fields=['fingerprint', 'last_seen_at'], condition=models.Q(status='failure'),
+                name='gatelog_failure_flood_idx',
+            ),
+        ]
+
+
+
+class PassRevocation(models.Model):
+    """
+    One row per approved gate pass that stopped being valid (rejected,
+    cancelled or deleted). The latest id is the revocation epoch stamped on
+    offline snapshots, so scanners can tell when theirs is out of date.
+    """
+    gate_pass_id = models.BigIntegerField()
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Gate pass #{self.gate_pass_id} revoked at {self.revoked_at}"
+
+
+class OccupancyCounter(models.Model):
+    """
+    Number of pass holders on site, kept up to date by every entry and exit.
+    One row for the whole site (key 'site'), one per gate ('gate:<id>') and
+    one for entries recorded without a gate ('gate:none'). Rebuild with
+    `manage.py rebuild_occupancy`.
+    """
+    key = models.CharField(max_length=50, unique=True)
+    gate = models.ForeignKey('core_data.Gate', on_delete=models.CASCADE, null=True, blank=True)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
@@ -0,0 +1,154 @@
+# backend/apps/gate_operations/occupancy.py
+#
+# Live count of pass holders on site, overall and per gate of entry. Every
+# entry and exit moves the counters with an in-place `count = count + n`
+# UPDATE in the same transaction as the pass's presence change, so reading
+# them is a single small query however many passes and logs there are.
+#
+# Counter rows exist for the site, for every gate (created with the gate) and
+# for entries made without a gate. If the counters ever drift (a gate deleted
+# while people were inside, a bug, manual edits), `manage.py
+# rebuild_occupancy` recomputes them from the scan logs.
+
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+
+from apps.gatepass.models import GatePass
+from .models import GateLog, OccupancyCounter
+
+SITE = 'site'
+
+
+def gate_key(gate_id):
+    return f'gate:{gate_id}' if gate_id is not None else 'gate:none'
+
+
+def delta(gate_pass, before):
+    """
+    Occupancy change, by gate id, between a pass's `before` state (from
+    state()) and its current one.
+    """
+    deltas = Counter()
+    was_inside, was_gate = before
+    if was_inside:
+        deltas[was_gate] -= 1
+    if gate_pass.presence == GatePass.INSIDE:
+        deltas[gate_pass.presence_gate_id] += 1
+    return deltas
+
+
+def state(gate_pass):
+    return gate_pass.presence == GatePass.INSIDE, gate_pass.presence_gate_id
+
+
+def adjust(deltas):
+    """
+    Adds `deltas` ({gate_id: change}) to the gate counters and their total to
+    the site counter: one UPDATE per distinct change, so a single scan costs
+    one query.
+    """
+    deltas = {gate_id: change for gate_id, change in deltas.items() if change}
+    if not deltas:
+        return
+    by_change = defaultdict(list)
+    for gate_id, change in deltas.items():
+        by_change[change].append(gate_key(gate_id))
+    by_change[sum(deltas.values())].append(SITE)
+
+    for change, keys in by_change.items():
+        if not change:
+            continue
+        updated = OccupancyCounter.objects.filter(key__in=keys).update(count=F('count') + change)
+        if updated < len(keys):
+            _create_missing(keys, change)
+
+
+def _create_missing(keys, change):
+    existing = set(OccupancyCounter.objects.filter(key__in=keys).values_list('key', flat=True))
+    OccupancyCounter.objects.bulk_create(
+        [OccupancyCounter(key=key, gate_id=_gate_id(key), count=change) for key in keys if key not in existing],
+        ignore_conflicts=True,
+    )
+
+
+def _gate_id(key):
+    gate_id = key.partition(':')[2]
+    return int(gate_id) if gate_id.isdigit() else None
+
+
+def ensure_counter(gate):
+    OccupancyCounter.objects.get_or_create(key=gate_key(gate.id), defaults={'gate': gate})
+
+
+def snapshot():
+    """{"site": n, "gates": [{"gate": id, "name": ..., "count": n}, ...]} from one query."""
+    result = {'site': 0, 'gates': []}
+    rows = OccupancyCounter.objects.order_by('id').values_list('key', 'gate_id', 'gate__name', 'count')
+    for key, gate_id, name, count in rows:
+        if key == SITE:
+            result['site'] = count
+        else:
+            result['gates'].append({'gate': gate_id, 'name': name, 'count': count})
+    return result
+
+
+def on_site(gate_id=None):
+    """Ids of the passes whose holders are inside, optionally only those who came in through `gate_id`."""
+    passes = GatePass.objects.filter(presence=GatePass.INSIDE)
+    if gate_id is not None:
+        passes = passes.filter(presence_gate_id=gate_id)
+    return list(passes.order_by('id').values_list('id', flat=True))
+
+
+def _latest_transitions():
+    return GateLog.objects.filter(
+        gate_pass=OuterRef('pk'), status='success', action__in=['entry', 'exit'],
+    ).order_by('-timestamp', '-id')
+
+
+def counts_from_logs():
+    """Occupancy by gate id as the scan logs have it: passes whose latest entry/exit scan is an entry."""
+    latest = _latest_transitions()
+    rows = (
+        GatePass.objects
+        .annotate(last_action=Subquery(latest.values('action')[:1]), last_gate=Subquery(latest.values('gate')[:1]))
+        .filter(last_action='entry')
+        .values('last_gate')
+        .annotate(inside=Count('id'))
+        .values_list('last_gate', 'inside')
+    )
+    return dict(rows)
+
+
+def current_counts():
+    return {
+        _gate_id(key): count
+        for key, count in OccupancyCounter.objects.exclude(key=SITE).values_list('key', 'count')
+        if count
+    }
+
+
+@transaction.atomic
+def rebuild():
+    """
+    Recomputes every pass's presence and the counters from the scan logs,
+    returning the new counts by gate id.
+    """
+    latest = _latest_transitions()
+    GatePass.objects.update(
+        presence=GatePass.OUTSIDE, presence_gate=None,
+        presence_changed_at=Subquery(latest.values('timestamp')[:1]),
+    )
+    GatePass.objects.annotate(last_action=Subquery(latest.values('action')[:1])).filter(
+        last_action='entry'
+    ).update(presence=GatePass.INSIDE, presence_gate=Subquery(latest.values('gate')[:1]))
+
+    counts = dict(
+        GatePass.objects.filter(presence=GatePass.INSIDE)
+        .values('presence_gate').annotate(inside=Count('id')).values_list('presence_gate', 'inside')
+    )
+    OccupancyCounter.objects.update(count=0)
+    adjust({gate_id: count for gate_id, count in counts.items()})
+    return counts
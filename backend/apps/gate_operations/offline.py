@@ -0,0 +1,170 @@
+# backend/apps/gate_operations/offline.py
+#
+# Offline scanner support. A scanner downloads a signed snapshot of the passes
+# valid at its gate for the day while it is online, checks QR codes against it
+# when the network is down, and uploads the scans it recorded once it is back.
+#
+# Snapshots are plain JSON text signed with HMAC-SHA256 under
+# OFFLINE_SNAPSHOT_KEY; the scanner verifies the signature over the exact text
+# it received before trusting it. Each snapshot carries the revocation epoch
+# (latest PassRevocation id) it was built at, and scanners fetch the passes
+# revoked since then with `revocations_since` instead of a whole new snapshot.
+
+import hashlib
+import hmac
+import json
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from apps.gatepass.models import GatePass
+from apps.sync.models import current_change_seq
+from . import events, occupancy, presence
+from .batch import parse_event_id, recorded_event_ids
+from .models import GateLog, PassRevocation
+
+SNAPSHOT_FIELDS = ['id', 'valid_from', 'valid_until']
+OFFLINE_VERDICTS = ('entry', 'exit', 'rejected')
+
+
+class OfflineUploadError(ValueError):
+    pass
+
+
+def sign(text):
+    return hmac.new(settings.OFFLINE_SNAPSHOT_KEY.encode(), text.encode(), hashlib.sha256).hexdigest()
+
+
+def signed(payload):
+    text = json.dumps(payload, separators=(',', ':'))
+    return {'snapshot': text, 'signature': sign(text)}
+
+
+def current_epoch():
+    return PassRevocation.objects.aggregate(epoch=Max('id'))['epoch'] or 0
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def build_snapshot(gate_id, day):
+    """
+    Signed list of the approved passes usable at `gate_id` at some point on
+    `day`: passes for that gate or for no particular gate, whose validity
+    window overlaps the day. Rows are [id, valid_from, valid_until] with
+    times as Unix seconds.
+
+    Built from a single values_list query and cached until any pass changes
+    (tracked by the sync change counter) or a pass is revoked.
+    """
+    epoch = current_epoch()
+    cache_key = f'offline-snapshot:{gate_id}:{day.isoformat()}:{current_change_seq()}:{epoch}'
+    snapshot = cache.get(cache_key)
+    if snapshot is not None:
+        return snapshot
+
+    start, end = day_bounds(day)
+    rows = (
+        GatePass.objects
+        .filter(status=GatePass.APPROVED, exit_time__gte=start, entry_time__lt=end)
+        .filter(Q(gate_id=gate_id) | Q(gate__isnull=True))
+        .order_by('id')
+        .values_list('id', 'entry_time', 'exit_time')
+    )
+    snapshot = signed({
+        'gate': gate_id,
+        'date': day.isoformat(),
+        'epoch': epoch,
+        'issued_at': int(timezone.now().timestamp()),
+        'expires_at': int(end.timestamp()),
+        'fields': SNAPSHOT_FIELDS,
+        'passes': [[pk, int(valid_from.timestamp()), int(valid_until.timestamp())] for pk, valid_from, valid_until in rows],
+    })
+    cache.set(cache_key, snapshot, settings.OFFLINE_SNAPSHOT_CACHE_SECONDS)
+    return snapshot
+
+
+def revocations_since(epoch):
+    revoked = list(
+        PassRevocation.objects.filter(id__gt=epoch).order_by('id').values_list('id', 'gate_pass_id')
+    )
+    return signed({
+        'since': epoch,
+        'epoch': revoked[-1][0] if revoked else epoch,
+        'revoked': sorted({gate_pass_id for _, gate_pass_id in revoked}),
+    })
+
+
+def _parse_event(event):
+    try:
+        gatepass_id = int(event['gatepass_id'])
+        scanned_at = datetime.fromtimestamp(int(event['scanned_at']), tz=dt_timezone.utc)
+        verdict = event['verdict']
+    except (KeyError, TypeError, ValueError, OverflowError, OSError):
+        raise OfflineUploadError('Each event needs an integer gatepass_id and scanned_at and a verdict.')
+    if verdict not in OFFLINE_VERDICTS:
+        raise OfflineUploadError(f"verdict must be one of {', '.join(OFFLINE_VERDICTS)}.")
+    event_id = parse_event_id(event['event_id']) if event.get('event_id') else None
+    return event_id, gatepass_id, scanned_at, verdict, str(event.get('reason') or '')[:255]
+
+
+def ingest_offline_scans(user, gate_id, snapshot_epoch, raw_events):
+    """
+    Records scans a scanner made offline as GateLog rows with their original
+    times, in a few lookup queries and one bulk insert, and moves each pass's
+    presence state on to match. Events that carry an event_id are recorded
+    once, however often they are uploaded. The scanner's verdicts are kept as
+    they were, since the guard has already acted on them; passes that were
+    admitted but revoked after the snapshot was built are reported back so
+    security can follow up.
+    """
+    if not isinstance(raw_events, list):
+        raise OfflineUploadError('events must be a list.')
+    if len(raw_events) > settings.OFFLINE_UPLOAD_MAX_EVENTS:
+        raise OfflineUploadError(f'At most {settings.OFFLINE_UPLOAD_MAX_EVENTS} events per upload.')
+    parsed = [_parse_event(event) for event in raw_events]
+    pass_ids = {event[1] for event in parsed}
+    admitted = {event[1] for event in parsed if event[3] != 'rejected'}
+    revoked = set(
+        PassRevocation.objects.filter(id__gt=snapshot_epoch, gate_pass_id__in=admitted).values_list('gate_pass_id', flat=True)
+    )
+
+    with transaction.atomic():
+        passes = GatePass.objects.select_for_update().in_bulk(pass_ids)
+        recorded = recorded_event_ids([event[0] for event in parsed if event[0]])
+        logs, moved = [], {}
+        for event_id, gatepass_id, scanned_at, verdict, reason in sorted(parsed, key=lambda event: event[2]):
+            if event_id is not None:
+                if event_id in recorded:
+                    continue
+                recorded.add(event_id)
+            log = GateLog(
+                event_id=event_id, security_personnel=user, gate_id=gate_id, timestamp=scanned_at, offline=True,
+                scanned_data=json.dumps({'gatepass_id': gatepass_id}),
+            )
+            if gatepass_id not in passes:
+                log.action, log.status, log.reason = 'scan_attempt', 'failure', 'Gate Pass not found.'
+            elif verdict == 'rejected':
+                log.gate_pass_id, log.action, log.status = gatepass_id, 'scan_attempt', 'failure'
+                log.reason = reason or 'Rejected by offline scanner.'
+            else:
+                log.gate_pass_id, log.action, log.status = gatepass_id, verdict, 'success'
+                # Scans made online since then already reflect the current state.
+                gate_pass = passes[gatepass_id]
+                moved.setdefault(gatepass_id, (gate_pass, occupancy.state(gate_pass)))
+                presence.apply(gate_pass, verdict, scanned_at, only_if_newer=True, gate_id=gate_id)
+            logs.append(log)
+        presence.save_presence(moved)
+        GateLog.objects.bulk_create(logs, batch_size=1000, ignore_conflicts=True)
+    events.publish_log_counters(logs)
+    return {
+        'recorded': len(logs),
+        'unknown_passes': sorted(pass_ids - passes.keys()),
+        'revoked_since_snapshot': sorted(revoked),
+    }
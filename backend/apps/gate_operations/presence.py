@@ -0,0 +1,79 @@
+# backend/apps/gate_operations/presence.py
+#
+# Entry/exit state for gate passes. Each pass records whether its holder is
+# inside, when that last changed and how many transitions it has made, so a
+# scan decides entry or exit from the pass it has already loaded instead of
+# searching GateLog history. A single scan commits its transition with one
+# conditional UPDATE on the pass's primary key: if a concurrent scan changed
+# the state first, the UPDATE matches no row and the later scan is refused.
+#
+# These are plain UPDATEs, so they do not bump the pass's sync change number;
+# presence is not part of the /api/sync/ payload. Every transition also moves
+# the site occupancy counters (see occupancy.py) in the same transaction.
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.gatepass.models import GatePass
+from . import occupancy
+
+PRESENCE_FIELDS = ['presence', 'presence_changed_at', 'transition_count', 'presence_gate']
+
+
+def next_action(gate_pass):
+    return 'exit' if gate_pass.presence == GatePass.INSIDE else 'entry'
+
+
+def presence_after(action):
+    return GatePass.INSIDE if action == 'entry' else GatePass.OUTSIDE
+
+
+def record_scan(gate_pass, at=None, gate_id=None):
+    """
+    Moves the pass to its next state through `gate_id`, returning 'entry' or
+    'exit', or None when another scan changed its state since it was loaded.
+    """
+    at = at or timezone.now()
+    action = next_action(gate_pass)
+    before = occupancy.state(gate_pass)
+    with transaction.atomic():
+        updated = GatePass.objects.filter(pk=gate_pass.pk, presence=gate_pass.presence).update(
+            presence=presence_after(action), presence_changed_at=at, transition_count=F('transition_count') + 1,
+            presence_gate_id=gate_id if action == 'entry' else None,
+        )
+        if not updated:
+            return None
+        apply(gate_pass, action, at, gate_id=gate_id)
+        occupancy.adjust(occupancy.delta(gate_pass, before))
+    return action
+
+
+def apply(gate_pass, action, at, only_if_newer=False, gate_id=None):
+    """
+    Applies a transition to a pass in memory; save with save_presence().
+    With only_if_newer, a transition older than the pass's last change is
+    counted but does not alter the current state (late offline uploads).
+    """
+    gate_pass.transition_count += 1
+    if only_if_newer and gate_pass.presence_changed_at and at < gate_pass.presence_changed_at:
+        return
+    gate_pass.presence = presence_after(action)
+    gate_pass.presence_changed_at = at
+    gate_pass.presence_gate_id = gate_id if action == 'entry' else None
+
+
+def save_presence(moved):
+    """
+    Writes the presence of passes changed with apply() and moves the
+    occupancy counters to match. `moved` maps each pass id to the pass and
+    its occupancy.state() before the first apply(); lock the passes with
+    select_for_update first.
+    """
+    deltas = Counter()
+    for gate_pass, before in moved.values():
+        deltas.update(occupancy.delta(gate_pass, before))
+    GatePass.objects.bulk_update([gate_pass for gate_pass, _ in moved.values()], PRESENCE_FIELDS)
+    occupancy.adjust(deltas)
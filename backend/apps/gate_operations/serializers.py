@@ -2,6 +2,8 @@ from rest_framework import serializers
 from .models import GateLog
 from apps.gatepass.serializers import GatePassSerializer
 from apps.users.serializers import UserSerializer
+from apps.core_data.models import Gate
+from apps.core_data.reference import ReferenceField, ReferencePrimaryKeyRelatedField
 from apps.core_data.serializers import GateSerializer
 
 class QRCodeScanSerializer(serializers.Serializer):
@@ -9,6 +11,10 @@ class QRCodeScanSerializer(serializers.Serializer):
     Serializer for validating the incoming QR code data.
     """
     qr_code_data = serializers.CharField(required=True)
+    # The gate the scanner stands at, counted in that gate's occupancy.
+    gate_id = ReferencePrimaryKeyRelatedField(
+        queryset=Gate.objects.all(), source='gate', required=False, allow_null=True
+    )
 
 class GateLogSerializer(serializers.ModelSerializer):
     """
@@ -16,12 +22,12 @@ class GateLogSerializer(serializers.ModelSerializer):
     """
     gate_pass = GatePassSerializer(read_only=True)
     security_personnel = UserSerializer(read_only=True)
-    gate = GateSerializer(read_only=True)
+    gate = ReferenceField(GateSerializer, source='gate_id')
     timestamp = serializers.SerializerMethodField()
 
     class Meta:
         model = GateLog
-        fields = '__all__'
+        exclude = ['fingerprint']
 
     def get_timestamp(self, obj):
         return obj.timestamp.strftime("%d-%m-%Y, %I:%M:%S %p") if obj.timestamp else None
\ No newline at end of file
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core_data.models import Gate
+from apps.gatepass.models import GatePass
+from . import events, occupancy
+from .models import GateLog, PassRevocation
+
+
+@receiver(post_save, sender=GateLog)
+def publish_gate_log(sender, instance, created, **kwargs):
+    """
+    Pushes every new scan to the live event stream, along with the change it
+    makes to the dashboard counters. Only data already loaded on the instance
+    is used, so publishing adds no queries to the scan.
+    """
+    if not created:
+        return
+
+    events.publish_scan(instance)
+
+    if instance.status == 'failure':
+        events.publish_counters(failed_scans=1)
+    elif instance.action == 'entry':
+        events.publish_counters(entries=1, inside=1)
+    elif instance.action == 'exit':
+        events.publish_counters(exits=1, inside=-1)
+
+
+@receiver(post_save, sender=GatePass)
+def record_revocation_on_status_change(sender, instance, created, **kwargs):
+    """Bumps the offline revocation epoch when an approved pass stops being approved."""
+    if not created and getattr(instance, '_old_status', None) == GatePass.APPROVED and instance.status != GatePass.APPROVED:
+        PassRevocation.objects.create(gate_pass_id=instance.pk)
+
+
+@receiver(post_delete, sender=GatePass)
+def record_revocation_on_delete(sender, instance, **kwargs):
+    if instance.status == GatePass.APPROVED:
+        PassRevocation.objects.create(gate_pass_id=instance.pk)
+
+
+@receiver(post_save, sender=Gate)
+def create_occupancy_counter(sender, instance, created, **kwargs):
+    """Every gate gets its occupancy counter up front, so scans only ever UPDATE it."""
+    if created:
+        occupancy.ensure_counter(instance)
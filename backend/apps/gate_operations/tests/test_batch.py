@@ -0,0 +1,79 @@
+import json
+import uuid
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.core_data.models import Gate, Purpose
+from apps.gatepass.models import GatePass
+from apps.users.models import CustomUser
+from .. import presence
+from ..models import GateLog
+
+
+class ScanBatchTests(APITestCase):
+    def setUp(self):
+        self.guard = CustomUser.objects.create_user(username='guard', password='password')
+        self.client.force_authenticate(user=self.guard)
+        self.purpose = Purpose.objects.create(name='Batch Purpose')
+        self.gate = Gate.objects.create(name='Batch Gate')
+        self.url = reverse('scan_batch')
+
+    def create_pass(self, status=GatePass.APPROVED):
+        return GatePass.objects.create(
+            created_by=self.guard, person_name='Visitor', person_phone='123', purpose=self.purpose,
+            entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z', status=status,
+        )
+
+    def event(self, qr_code_data, scanned_at=1735732800):
+        return {'event_id': str(uuid.uuid4()), 'qr_code_data': qr_code_data, 'scanned_at': scanned_at}
+
+    def scan(self, gate_pass):
+        return json.dumps({'gatepass_id': gate_pass.id})
+
+    def post(self, events):
+        return self.client.post(self.url, {'gate_id': self.gate.id, 'events': events}, format='json')
+
+    def test_returns_a_verdict_per_event(self):
+        approved, pending = self.create_pass(), self.create_pass(GatePass.PENDING)
+        events = [
+            self.event(self.scan(approved), scanned_at=1735732900),
+            self.event(self.scan(approved), scanned_at=1735732800),
+            self.event(self.scan(pending)),
+            self.event('not json'),
+            self.event(json.dumps({'gatepass_id': 999999})),
+        ]
+        response = self.post(events)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Resolved in scan-time order: the earlier scan is the entry.
+        self.assertEqual(
+            [result['verdict'] for result in response.data['results']],
+            ['exit', 'entry', 'rejected', 'invalid', 'invalid'],
+        )
+        self.assertEqual(response.data['results'][3]['reason'], 'Invalid QR code data format.')
+        self.assertEqual(GateLog.objects.count(), 5)
+        self.assertEqual(GateLog.objects.filter(gate=self.gate, gate_pass=approved, status='success').count(), 2)
+
+    def test_retried_events_are_recorded_once(self):
+        gate_pass = self.create_pass()
+        events = [self.event(self.scan(gate_pass))]
+        self.post(events)
+
+        retry = self.post(events + events)
+        self.assertEqual([result['verdict'] for result in retry.data['results']], ['duplicate', 'duplicate'])
+        self.assertEqual(GateLog.objects.count(), 1)
+
+    def test_continues_from_current_presence(self):
+        gate_pass = self.create_pass()
+        presence.record_scan(gate_pass)
+        response = self.post([self.event(self.scan(gate_pass))])
+        self.assertEqual(response.data['results'][0]['verdict'], 'exit')
+        gate_pass.refresh_from_db()
+        self.assertEqual((gate_pass.presence, gate_pass.transition_count), (GatePass.OUTSIDE, 2))
+
+    def test_rejects_malformed_batches(self):
+        response = self.post([{'event_id': 'not-a-uuid', 'qr_code_data': '{}'}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GateLog.objects.exists())
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core_data.models import Purpose
+from apps.gatepass.models import GatePass
+from apps.users.models import CustomUser
+from .. import events
+from ..models import GateLog
+
+
+class GateEventPublishingTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='guard', password='password', is_staff=True)
+        self.purpose = Purpose.objects.create(name='Meeting')
+        self.bus = events.get_bus()
+        self.last_id = self.bus.dispatch('test', {})['id']
+
+    def published(self):
+        return [(event['type'], event['data']) for event in self.bus.since(self.last_id)]
+
+    def create_pass(self, status=GatePass.PENDING):
+        return GatePass.objects.create(
+            created_by=self.user, person_name='Visitor', person_phone='123',
+            entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z',
+            purpose=self.purpose, status=status,
+        )
+
+    def test_scan_publishes_event_and_counters_after_commit(self):
+        gate_pass = self.create_pass(GatePass.APPROVED)
+        self.last_id = self.bus.since(0)[-1]['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            log = GateLog.objects.create(security_personnel=self.user, gate_pass=gate_pass, action='entry', status='success')
+            self.assertEqual(self.published(), [])
+
+        (scan_type, scan), (counters_type, counters) = self.published()
+        self.assertEqual(scan_type, 'scan')
+        self.assertEqual(scan['id'], log.id)
+        self.assertEqual(scan['person_name'], 'Visitor')
+        self.assertEqual((counters_type, counters), ('counters', {'entries': 1, 'inside': 1}))
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_status_change_publishes_counter_deltas(self, mock_send_message):
+        with self.captureOnCommitCallbacks(execute=True):
+            gate_pass = self.create_pass()
+        self.assertIn(('counters', {'pending_count': 1}), self.published())
+
+        self.last_id = self.bus.since(0)[-1]['id']
+        with self.captureOnCommitCallbacks(execute=True):
+            gate_pass.status = GatePass.APPROVED
+            gate_pass.save()
+        self.assertEqual(self.published(), [
+            ('gatepass_status', {'id': gate_pass.id, 'person_name': 'Visitor', 'old_status': 'PENDING', 'status': 'APPROVED'}),
+            ('counters', {'pending_count': -1, 'approved_count': 1}),
+        ])
+
+
+class GateEventStreamTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='password', is_staff=True)
+        self.guard = CustomUser.objects.create_user(username='guard', password='password')
+        self.url = reverse('gate_events')
+
+    async def test_requires_staff(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(self.url, {'token': str(AccessToken.for_user(self.guard))})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_streams_published_events(self):
+        bus = events.get_bus()
+        response = await self.async_client.get(self.url, {'token': str(AccessToken.for_user(self.admin))})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        event = bus.dispatch('counters', {'entries': 1})
+        self.assertEqual(
+            await anext(stream),
+            f'id: {event["id"]}\nevent: counters\ndata: {{"entries": 1}}\n\n'.encode(),
+        )
+        await stream.aclose()
+
+    async def test_resumes_from_last_event_id(self):
+        bus = events.get_bus()
+        missed = bus.dispatch('counters', {'exits': 1})
+        response = await self.async_client.get(
+            self.url, {'token': str(AccessToken.for_user(self.admin))}, headers={'Last-Event-ID': str(missed['id'] - 1)},
+        )
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        self.assertIn(f'id: {missed["id"]}\n'.encode(), await anext(stream))
+        await stream.aclose()
+
+    async def test_ids_continue_across_restarts_and_unknown_ids_start_over(self):
+        before = events.EventBus().dispatch('counters', {})
+        bus = events.get_bus()
+        self.assertGreater(events.EventBus().dispatch('counters', {})['id'], before['id'])
+        bus.dispatch('counters', {})
+        response = await self.async_client.get(
+            self.url, {'token': str(AccessToken.for_user(self.admin))}, headers={'Last-Event-ID': str(10 ** 18)},
+        )
+        stream = aiter(response.streaming_content)
+        await anext(stream)
+        event = bus.dispatch('counters', {'entries': 1})
+        self.assertIn(f'id: {event["id"]}\n'.encode(), await anext(stream))
+        await stream.aclose()
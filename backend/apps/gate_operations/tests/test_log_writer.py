@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from apps.core_data.models import Gate
+from apps.users.models import CustomUser
+from .. import log_writer
+from ..log_writer import GateLogWriter
+from ..models import GateLog
+
+
+class GateLogWriterTests(TestCase):
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.journal_dir)
+        settings = override_settings(
+            GATE_LOG_BUFFERED=True, GATE_LOG_FLUSH_RECORDS=3, GATE_LOG_FLUSH_MS=0,
+            GATE_LOG_JOURNAL_DIR=self.journal_dir,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.guard = CustomUser.objects.create_user(username='guard', password='password')
+        self.gate = Gate.objects.create(name='Writer Gate')
+        self.writer = GateLogWriter()
+
+    def write_failure(self, gate=None):
+        return self.writer.write(
+            security_personnel=self.guard, gate=gate, action='scan_attempt', status='failure',
+            reason='Invalid QR code data format.', scanned_data='garbage',
+        )
+
+    def test_flushes_every_n_records(self):
+        self.write_failure()
+        self.write_failure()
+        self.assertFalse(GateLog.objects.exists())
+        self.assertEqual(len(os.listdir(self.journal_dir)), 1)
+
+        self.write_failure()
+        self.assertEqual(GateLog.objects.filter(status='failure').count(), 3)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    def test_replays_journal_left_by_a_previous_process(self):
+        self.write_failure()
+        [segment] = os.listdir(self.journal_dir)
+        with open(os.path.join(self.journal_dir, segment)) as journal:
+            record = journal.read()
+        # A segment of a dead process holding the same record twice, e.g. replayed once already.
+        with open(os.path.join(self.journal_dir, 'gatelog-999999999-1.jsonl'), 'w') as orphan:
+            orphan.write(record + record)
+
+        # A new writer in this process (a restart that reused the pid) takes over both segments.
+        restarted = GateLogWriter()
+        self.assertEqual(restarted.flush(), 3)
+        self.assertEqual(GateLog.objects.count(), 1)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+        self.assertEqual(str(GateLog.objects.get().event_id), json.loads(record)['event_id'])
+
+    @override_settings(GATE_LOG_FLUSH_RECORDS=100)
+    def test_records_that_fail_to_write_are_kept_for_the_next_flush(self):
+        self.write_failure()
+        with mock.patch.object(log_writer, '_decode', side_effect=ValueError('bad record')):
+            self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual(self.writer.pending_count(), 1)
+        self.assertEqual(len(os.listdir(self.journal_dir)), 1)
+
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(GateLog.objects.count(), 1)
+        self.assertEqual(os.listdir(self.journal_dir), [])
+
+    @override_settings(GATE_LOG_FLUSH_RECORDS=100)
+    def test_buffered_failure_floods_are_folded_on_flush(self):
+        for _ in range(5):
+            self.writer.write_failure(
+                security_personnel=self.guard, gate=self.gate, action='scan_attempt',
+                reason='Invalid QR code data format.', scanned_data='garbage',
+            )
+        self.writer.flush()
+        log = GateLog.objects.get()
+        self.assertEqual((log.repeat_count, log.gate), (5, self.gate))
+        self.assertGreaterEqual(log.last_seen_at, log.timestamp)
+
+    @override_settings(GATE_LOG_FLUSH_RECORDS=100)
+    def test_buffered_failures_join_the_open_row_across_flushes(self):
+        for repeats in (3, 2):
+            for _ in range(repeats):
+                self.writer.write_failure(
+                    security_personnel=self.guard, gate=self.gate, action='scan_attempt',
+                    reason='Invalid QR code data format.', scanned_data='garbage',
+                )
+            self.writer.flush()
+        log = GateLog.objects.get()
+        self.assertEqual(log.repeat_count, 5)
+        self.assertGreater(log.last_seen_at, log.timestamp)
+
+    def test_strict_gates_write_synchronously(self):
+        with override_settings(GATE_LOG_STRICT_GATES=[str(self.gate.id)]):
+            log = self.write_failure(self.gate)
+        self.assertEqual(GateLog.objects.get(), log)
+        self.assertEqual(self.writer.pending_count(), 0)
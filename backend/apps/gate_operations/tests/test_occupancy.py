@@ -0,0 +1,73 @@
+import json
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.core_data.models import Gate, Purpose
+from apps.gatepass.models import GatePass
+from apps.users.models import CustomUser
+from .. import occupancy
+from ..models import OccupancyCounter
+
+
+class OccupancyTests(APITestCase):
+    def setUp(self):
+        self.guard = CustomUser.objects.create_user(username='guard', password='password')
+        self.client.force_authenticate(user=self.guard)
+        self.purpose = Purpose.objects.create(name='Occupancy Purpose')
+        self.north = Gate.objects.create(name='North Gate')
+        self.south = Gate.objects.create(name='South Gate')
+
+    def create_pass(self):
+        return GatePass.objects.create(
+            created_by=self.guard, person_name='Visitor', person_phone='123', purpose=self.purpose,
+            entry_time=timezone.now() - timedelta(hours=1), exit_time=timezone.now() + timedelta(hours=1),
+            status=GatePass.APPROVED,
+        )
+
+    def scan_batch(self, gate, *passes):
+        events = [
+            {'event_id': str(uuid.uuid4()), 'qr_code_data': json.dumps({'gatepass_id': gate_pass.id})}
+            for gate_pass in passes
+        ]
+        return self.client.post(reverse('scan_batch'), {'gate_id': gate.id, 'events': events}, format='json')
+
+    def counts(self):
+        data = self.client.get(reverse('occupancy')).data
+        return data['site'], {row['gate']: row['count'] for row in data['gates']}
+
+    def test_counters_follow_entries_and_exits(self):
+        first, second, third = self.create_pass(), self.create_pass(), self.create_pass()
+        self.scan_batch(self.north, first, second)
+        self.scan_batch(self.south, third)
+
+        site, gates = self.counts()
+        self.assertEqual((site, gates[self.north.id], gates[self.south.id]), (3, 2, 1))
+
+        # Leaving by another gate still releases the place at the gate of entry.
+        self.scan_batch(self.south, first)
+        site, gates = self.counts()
+        self.assertEqual((site, gates[self.north.id], gates[self.south.id]), (2, 1, 1))
+
+        response = self.client.get(reverse('occupancy_on_site'), {'gate': self.north.id})
+        self.assertEqual(response.data, {'count': 1, 'gatepass_ids': [second.id]})
+
+    def test_rebuild_repairs_drift(self):
+        gate_pass = self.create_pass()
+        self.scan_batch(self.north, gate_pass)
+        OccupancyCounter.objects.update(count=7)
+
+        out = StringIO()
+        call_command('rebuild_occupancy', '--dry-run', stdout=out)
+        self.assertIn(f'gate:{self.north.id}: counter 7, logs 1', out.getvalue())
+        self.assertEqual(occupancy.snapshot()['site'], 7)
+
+        call_command('rebuild_occupancy', stdout=StringIO())
+        site, gates = self.counts()
+        self.assertEqual((site, gates[self.north.id], gates[self.south.id]), (1, 1, 0))
+        self.assertEqual(occupancy.on_site(), [gate_pass.id])
@@ -0,0 +1,94 @@
+import json
+from datetime import timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.core_data.models import Gate, Purpose
+from apps.gatepass.models import GatePass
+from apps.users.models import CustomUser
+from .. import offline
+from ..models import GateLog
+
+
+class OfflineScannerTests(APITestCase):
+    def setUp(self):
+        self.guard = CustomUser.objects.create_user(username='guard', password='password')
+        self.client.force_authenticate(user=self.guard)
+        self.purpose = Purpose.objects.create(name='Offline Purpose')
+        self.gate = Gate.objects.create(name='Offline Gate')
+        self.other_gate = Gate.objects.create(name='Other Gate')
+        self.now = timezone.now()
+
+    def create_pass(self, gate=None, status=GatePass.APPROVED, starts_in=timedelta(hours=-1)):
+        return GatePass.objects.create(
+            created_by=self.guard, person_name='Visitor', person_phone='123', purpose=self.purpose, gate=gate,
+            entry_time=self.now + starts_in, exit_time=self.now + starts_in + timedelta(hours=4), status=status,
+        )
+
+    def get_snapshot(self):
+        response = self.client.get(reverse('offline_snapshot'), {'gate': self.gate.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['signature'], offline.sign(response.data['snapshot']))
+        return json.loads(response.data['snapshot'])
+
+    def test_snapshot_lists_passes_valid_at_gate_today(self):
+        at_gate = self.create_pass(self.gate)
+        any_gate = self.create_pass()
+        self.create_pass(self.other_gate)
+        self.create_pass(self.gate, status=GatePass.PENDING)
+        self.create_pass(self.gate, starts_in=timedelta(days=3))
+
+        snapshot = self.get_snapshot()
+        self.assertEqual(snapshot['fields'], ['id', 'valid_from', 'valid_until'])
+        self.assertEqual([row[0] for row in snapshot['passes']], [at_gate.id, any_gate.id])
+        self.assertEqual(snapshot['passes'][0][1], int(at_gate.entry_time.timestamp()))
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_revocation_bumps_epoch_and_is_listed(self, mock_send_message):
+        gate_pass = self.create_pass(self.gate)
+        epoch = self.get_snapshot()['epoch']
+
+        gate_pass.status = GatePass.CANCELLED
+        gate_pass.save()
+
+        snapshot = self.get_snapshot()
+        self.assertGreater(snapshot['epoch'], epoch)
+        self.assertEqual(snapshot['passes'], [])
+        response = self.client.get(reverse('offline_revocations'), {'since': epoch})
+        self.assertEqual(json.loads(response.data['snapshot'])['revoked'], [gate_pass.id])
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_upload_records_offline_scans(self, mock_send_message):
+        gate_pass = self.create_pass(self.gate)
+        epoch = self.get_snapshot()['epoch']
+        gate_pass.status = GatePass.REJECTED
+        gate_pass.save()
+
+        scanned_at = int((self.now - timedelta(minutes=30)).timestamp())
+        response = self.client.post(reverse('offline_scans'), {
+            'gate_id': self.gate.id,
+            'snapshot_epoch': epoch,
+            'events': [
+                {'gatepass_id': gate_pass.id, 'scanned_at': scanned_at, 'verdict': 'entry'},
+                {'gatepass_id': 999999, 'scanned_at': scanned_at, 'verdict': 'rejected'},
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {
+            'recorded': 2, 'unknown_passes': [999999], 'revoked_since_snapshot': [gate_pass.id],
+        })
+        entry = GateLog.objects.get(gate_pass=gate_pass)
+        self.assertEqual((entry.action, entry.status, entry.offline), ('entry', 'success', True))
+        self.assertEqual(int(entry.timestamp.timestamp()), scanned_at)
+
+    def test_upload_rejects_malformed_events(self):
+        response = self.client.post(reverse('offline_scans'), {
+            'gate_id': self.gate.id, 'events': [{'gatepass_id': 1, 'verdict': 'entry'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(GateLog.objects.exists())
@@ -2,13 +2,24 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ScanQRCodeView, GateLogViewSet, GateOperationsDashboardView
+from .views import (
+    ScanQRCodeView, GateLogViewSet, GateOperationsDashboardView, GateEventStreamView,
+    OfflineSnapshotView, OfflineRevocationsView, OfflineScanUploadView, ScanBatchView,
+    OccupancyView, OnSiteView,
+)
 
 router = DefaultRouter()
 router.register(r'logs', GateLogViewSet, basename='gatelog')
 
 urlpatterns = [
     path('scan_qr_code/', ScanQRCodeView.as_view(), name='scan_qr_code'),
+    path('scan-batch/', ScanBatchView.as_view(), name='scan_batch'),
     path('dashboard/', GateOperationsDashboardView.as_view(), name='dashboard'),
+    path('events/', GateEventStreamView.as_view(), name='gate_events'),
+    path('offline/snapshot/', OfflineSnapshotView.as_view(), name='offline_snapshot'),
+    path('offline/revocations/', OfflineRevocationsView.as_view(), name='offline_revocations'),
+    path('offline/scans/', OfflineScanUploadView.as_view(), name='offline_scans'),
+    path('occupancy/', OccupancyView.as_view(), name='occupancy'),
+    path('occupancy/on-site/', OnSiteView.as_view(), name='occupancy_on_site'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
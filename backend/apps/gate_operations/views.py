@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, viewsets
 from django.shortcuts import get_object_or_404
+from apps.gatepass import expiry
 from apps.gatepass.models import GatePass
 from .models import GateLog
 from .serializers import GateLogSerializer, QRCodeScanSerializer
@@ -10,65 +11,124 @@ from django_filters.rest_framework import DjangoFilterBackend
 import json
 from rest_framework.generics import ListAPIView
 from rest_framework.pagination import PageNumberPagination
+from apps.monitoring import metrics, tracing
+from apps.monitoring.query_budget import QueryBudgetMixin
+import time
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from django.core.serializers.json import DjangoJSONEncoder
+from . import batch, debounce, events, log_writer, occupancy, offline, presence
+from apps.core_data import reference
+from apps.core_data.models import Gate, Purpose
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
-class ScanQRCodeView(APIView):
+class ScanQRCodeView(QueryBudgetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    # A scan once this process has loaded the gate and purpose tables
+    # (apps/core_data/reference.py; loading them costs one query each): load
+    # the pass, move its presence, move the occupancy counters. Writing the
+    # log row before answering, when it is not buffered, is one more.
+    query_budget = 3
+
+    SCAN_OUTCOMES = {
+        status.HTTP_200_OK: 'success',
+        status.HTTP_400_BAD_REQUEST: 'invalid',
+        status.HTTP_403_FORBIDDEN: 'rejected',
+        status.HTTP_404_NOT_FOUND: 'not_found',
+        status.HTTP_409_CONFLICT: 'conflict',
+    }
+
+    def get_query_budget(self):
+        gate_id = getattr(self, 'scan_gate_id', None)
+        return self.query_budget + (0 if log_writer.buffers(gate_id) else 1)
 
     def post(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        response = self._scan(request)
+        outcome = getattr(response, 'scan_outcome', None) or self.SCAN_OUTCOMES.get(response.status_code, 'error')
+        metrics.SCAN_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        return response
+
+    def _scan(self, request):
         serializer = QRCodeScanSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         qr_code_data = serializer.validated_data['qr_code_data']
+        gate = serializer.validated_data.get('gate')
 
         try:
-            parsed_data = json.loads(qr_code_data)
-            gatepass_id = parsed_data.get('gatepass_id')
-        except (json.JSONDecodeError, AttributeError):
-            self._log_failure(request.user, "Invalid QR code data format.", qr_code_data)
-            return Response({"error": "Invalid QR code data format."}, status=status.HTTP_400_BAD_REQUEST)
+            gatepass_id = batch.parse_qr_code(qr_code_data)
+        except ValueError as e:
+            self._log_failure(request.user, str(e), qr_code_data, gate=gate)
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not gatepass_id:
-            self._log_failure(request.user, "QR code data missing 'gatepass_id'.", qr_code_data)
-            return Response({"error": "QR code data missing 'gatepass_id'."}, status=status.HTTP_400_BAD_REQUEST)
+        gate_id = self.scan_gate_id = gate.id if gate else None
+        verdict, recent = debounce.check(gatepass_id, gate_id)
+        if verdict == debounce.REPEAT:
+            # A double scan: same answer as the first one, nothing written.
+            response = Response({**recent['response'], "repeat": True}, status=status.HTTP_200_OK)
+            response.scan_outcome = 'repeat'
+            return response
+        if verdict == debounce.PASSBACK:
+            reason = f"Gate Pass was just used for {recent['action']} at another gate."
+            self._log_failure(request.user, reason, qr_code_data, gate=gate, gate_pass_id=gatepass_id)
+            return Response({"error": reason}, status=status.HTTP_409_CONFLICT)
 
         try:
-            gate_pass = GatePass.objects.get(id=gatepass_id)
-            if gate_pass.status == GatePass.APPROVED:
-                action_logged = self._log_success(request.user, gate_pass, qr_code_data)
-                return Response(self._get_success_response(gate_pass, action_logged), status=status.HTTP_200_OK)
+            with tracing.span('scan.lookup', gatepass_id=gatepass_id):
+                gate_pass = GatePass.objects.select_related('driver', 'vehicle').get(id=gatepass_id)
+            # Status and validity window are checked on the pass just loaded.
+            refusal = expiry.scan_refusal(gate_pass)
+            if refusal is None:
+                with tracing.span('scan.log'):
+                    action_logged = self._log_success(request.user, gate_pass, qr_code_data, gate)
+                if action_logged is None:
+                    reason = "Gate Pass was scanned at the same moment by another scanner."
+                    self._log_failure(request.user, reason, qr_code_data, gate_pass, gate)
+                    return Response({"error": reason}, status=status.HTTP_409_CONFLICT)
+                data = self._get_success_response(gate_pass, action_logged)
+                debounce.remember(gatepass_id, gate_id, action_logged, data)
+                return Response(data, status=status.HTTP_200_OK)
             else:
-                reason = f"Gate Pass has status: {gate_pass.get_status_display()}"
-                self._log_failure(request.user, reason, qr_code_data, gate_pass)
-                return Response({"error": reason}, status=status.HTTP_403_FORBIDDEN)
+                self._log_failure(request.user, refusal, qr_code_data, gate_pass, gate)
+                return Response({"error": refusal}, status=status.HTTP_403_FORBIDDEN)
         except GatePass.DoesNotExist:
-            self._log_failure(request.user, "Gate Pass not found.", qr_code_data)
+            self._log_failure(request.user, "Gate Pass not found.", qr_code_data, gate=gate)
             return Response({"error": "Gate Pass not found."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            self._log_failure(request.user, f"An unexpected error occurred: {str(e)}", qr_code_data)
+            self._log_failure(request.user, f"An unexpected error occurred: {str(e)}", qr_code_data, gate=gate)
             return Response({"error": "An unexpected error occurred."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    def _log_failure(self, user, reason, scanned_data, gate_pass=None):
-        GateLog.objects.create(
+    # Scan logs go through the buffered writer, which only writes them here and
+    # now at strict gates or when buffering is off (GATE_LOG_BUFFERED).
+    def _log_failure(self, user, reason, scanned_data, gate_pass=None, gate=None, gate_pass_id=None):
+        # Repeats of the same failure are counted on one row (see log_writer.write_failure).
+        log_writer.writer.write_failure(
             security_personnel=user,
             action='scan_attempt',
-            status='failure',
             reason=reason,
             scanned_data=scanned_data,
-            gate_pass=gate_pass
+            gate_pass_id=gate_pass.id if gate_pass else gate_pass_id,
+            gate=gate
         )
 
-    def _log_success(self, user, gate_pass, scanned_data):
-        # Determine if this is an entry or exit scan
-        is_exit_scan = GateLog.objects.filter(
-            gate_pass=gate_pass,
-            action='entry',
-            status='success'
-        ).exists()
-
-        action = 'exit' if is_exit_scan else 'entry'
+    def _log_success(self, user, gate_pass, scanned_data, gate=None):
+        # Entry or exit follows from the pass's presence state, moved on by a
+        # conditional UPDATE; None means a concurrent scan got there first.
+        action = presence.record_scan(gate_pass, gate_id=gate.id if gate else None)
+        if action is None:
+            return None
 
-        GateLog.objects.create(
+        log_writer.writer.write(
             security_personnel=user,
             gate_pass=gate_pass,
+            gate=gate,
             action=action,
             status='success',
             scanned_data=scanned_data
@@ -79,21 +139,32 @@ class ScanQRCodeView(APIView):
 
     def _get_success_response(self, gate_pass, action_logged):
         message = f"Gate Pass Validated for {action_logged.capitalize()} Successfully!"
+        purpose = reference.table(Purpose).get(gate_pass.purpose_id) if gate_pass.purpose_id else None
         return {
             "message": message,
             "gate_pass_details": {
                 "id": gate_pass.id,
                 "person_name": gate_pass.driver.name,
                 "status": gate_pass.get_status_display(),
-                "purpose": gate_pass.purpose.name,
+                "purpose": purpose.name if purpose else None,
                 "vehicle_number": gate_pass.vehicle.vehicle_number,
             }
         }
 
 
-class GateLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = GateLog.objects.all()
+# Everything GateLogSerializer nests, so a page of logs costs a fixed number of queries.
+# Gates and purposes are serialized from the reference cache (apps/core_data/reference.py).
+GATE_LOG_RELATED = (
+    'security_personnel',
+    'gate_pass__vehicle', 'gate_pass__driver',
+    'gate_pass__created_by', 'gate_pass__approved_by',
+)
+
+
+class GateLogViewSet(QueryBudgetMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = GateLog.objects.select_related(*GATE_LOG_RELATED).prefetch_related('security_personnel__groups')
     serializer_class = GateLogSerializer
+    query_budget = {'list': 4, 'retrieve': 2}
     permission_classes = [permissions.IsAdminUser]
     filter_backends = [DjangoFilterBackend]
     filterset_class = GateLogFilter
@@ -104,8 +175,184 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 100
 
-class GateOperationsDashboardView(ListAPIView):
-    queryset = GateLog.objects.order_by('-timestamp')
+class GateOperationsDashboardView(QueryBudgetMixin, ListAPIView):
+    queryset = GateLog.objects.select_related(*GATE_LOG_RELATED).prefetch_related('security_personnel__groups').order_by('-timestamp')
     serializer_class = GateLogSerializer
+    query_budget = 4
     permission_classes = [permissions.IsAdminUser]
-    pagination_class = StandardResultsSetPagination
\ No newline at end of file
+    pagination_class = StandardResultsSetPagination
+
+
+class OfflineSnapshotView(QueryBudgetMixin, APIView):
+    """
+    Signed allow-list of the passes valid at `?gate=` on `?date=` (default
+    today), for scanners to verify QR codes while offline. See offline.py.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 4
+
+    def get(self, request):
+        gate = get_object_or_404(Gate, pk=request.query_params.get('gate') or 0)
+        day = timezone.localdate()
+        if 'date' in request.query_params:
+            day = parse_date(request.query_params['date'])
+            if day is None:
+                return Response({"error": "date must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(offline.build_snapshot(gate.id, day))
+
+
+class OfflineRevocationsView(QueryBudgetMixin, APIView):
+    """Signed list of passes revoked after revocation epoch `?since=`."""
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 1
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response({"error": "since must be an integer epoch."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(offline.revocations_since(since))
+
+
+class OfflineScanUploadView(QueryBudgetMixin, APIView):
+    """
+    Uploads the scans a scanner recorded while offline:
+    {"gate_id": 1, "snapshot_epoch": 7, "events": [{"gatepass_id": 12, "scanned_at": <unix seconds>,
+    "verdict": "entry" | "exit" | "rejected", "reason": "..."}]}
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 9
+
+    def post(self, request):
+        gate = get_object_or_404(Gate, pk=request.data.get('gate_id') or 0)
+        try:
+            snapshot_epoch = int(request.data.get('snapshot_epoch', 0))
+            result = offline.ingest_offline_scans(request.user, gate.id, snapshot_epoch, request.data.get('events'))
+        except (TypeError, ValueError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+class ScanBatchView(QueryBudgetMixin, APIView):
+    """
+    Records up to SCAN_BATCH_MAX_EVENTS queued scans at once:
+    {"gate_id": 1, "events": [{"event_id": "<uuid>", "qr_code_data": "...", "scanned_at": <unix seconds>}]}
+    and returns a verdict per event. Re-sending events is safe; events
+    already recorded come back as "duplicate".
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 8
+
+    def post(self, request):
+        gate_id = request.data.get('gate_id')
+        if gate_id is not None:
+            gate_id = get_object_or_404(Gate, pk=gate_id).id
+        try:
+            verdicts = batch.ingest_scan_batch(request.user, gate_id, request.data.get('events'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"results": verdicts}, status=status.HTTP_200_OK)
+
+
+class OccupancyView(QueryBudgetMixin, APIView):
+    """
+    How many pass holders are on site right now, in total and by the gate
+    they came in through. Read from the live counters in a single query.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 1
+
+    def get(self, request):
+        return Response(occupancy.snapshot())
+
+
+class OnSiteView(QueryBudgetMixin, APIView):
+    """Ids of the passes whose holders are on site, optionally only those who came in through `?gate=`."""
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 1
+
+    def get(self, request):
+        gate_id = request.query_params.get('gate')
+        if gate_id is not None and not gate_id.isdigit():
+            return Response({"error": "gate must be a gate id."}, status=status.HTTP_400_BAD_REQUEST)
+        pass_ids = occupancy.on_site(int(gate_id) if gate_id is not None else None)
+        return Response({"count": len(pass_ids), "gatepass_ids": pass_ids})
+
+
+class GateEventStreamView(View):
+    """
+    Server-Sent Events stream of scans, gate pass status changes and dashboard
+    counter deltas, for control-room screens that would otherwise poll the
+    dashboards. Serve the project under ASGI (gatepass_project.asgi) so each
+    open stream costs a coroutine rather than a worker thread.
+
+    Staff only. Browsers' EventSource cannot set headers, so besides the usual
+    Authorization header and session the JWT access token may be passed as
+    ?token=. A reconnecting client resumes after its Last-Event-ID from the
+    recent events kept in memory.
+    """
+
+    async def get(self, request):
+        user = await self.authenticate(request)
+        if user is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+        if not user.is_staff:
+            return JsonResponse({"detail": "You do not have permission to perform this action."}, status=403)
+
+        try:
+            last_id = int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id') or 0)
+        except ValueError:
+            last_id = 0
+
+        relay = events.get_relay()
+        if relay is not None:
+            relay.ensure_listening()
+        bus = events.get_bus()
+        if bus.latest_id is not None and last_id > bus.latest_id:
+            # An id this process's events never reached (e.g. from before the
+            # broker's counter was reset): start over rather than wait for it.
+            last_id = 0
+        # Subscribe before reading the backlog so nothing published in between is lost.
+        subscriber = bus.subscribe()
+        backlog = bus.since(last_id) if last_id else []
+
+        response = StreamingHttpResponse(self.stream(bus, subscriber, backlog, last_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream.
+        return response
+
+    async def authenticate(self, request):
+        header = request.headers.get('Authorization', '')
+        raw_token = header[len('Bearer '):] if header.startswith('Bearer ') else request.GET.get('token')
+        if raw_token:
+            authentication = JWTAuthentication()
+            try:
+                token = authentication.get_validated_token(raw_token)
+                return await sync_to_async(authentication.get_user)(token)
+            except (InvalidToken, TokenError, AuthenticationFailed):
+                return None
+        user = await request.auser()
+        return user if user.is_authenticated else None
+
+    async def stream(self, bus, subscriber, backlog, last_id):
+        try:
+            yield 'retry: 3000\n\n'
+            for event in backlog:
+                yield self.format_event(event)
+                last_id = event['id']
+            while not subscriber.overflowed:
+                try:
+                    event = await subscriber.get(timeout=settings.GATE_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keep-alive\n\n'
+                    continue
+                if event['id'] > last_id:
+                    yield self.format_event(event)
+                    last_id = event['id']
+        finally:
+            bus.unsubscribe(subscriber)
+
+    @staticmethod
+    def format_event(event):
+        data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+        return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
@@ -0,0 +1,91 @@
+# backend/apps/gatepass/expiry.py
+#
+# Approved gate passes become EXPIRED once their validity window is over, so
+# "active" means status=APPROVED and nothing else. The sweeper walks the
+# (status, exit_time) index in chunks of GATE_PASS_EXPIRY_CHUNK_SIZE passes,
+# oldest exit_time first: each chunk is one short transaction with one
+# bulk_update and one bulk_create of history rows, so it never holds locks on
+# a large range of passes. Run it with `manage.py expire_gate_passes`.
+#
+# Scans check the same window against the pass they have already loaded
+# (scan_refusal), so a pass the sweeper has not reached yet is refused too.
+# A recurring pass is one pass per occurrence (see GatePassViewSet.create),
+# each valid for its own window only.
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.gate_operations import events
+from apps.sync.models import reserve_change_seqs
+from .models import GatePass, GatePassHistory
+
+
+def grace():
+    return timedelta(minutes=settings.GATE_PASS_VALIDITY_GRACE_MINUTES)
+
+
+def scan_refusal(gate_pass, at=None):
+    """
+    Why a scan of the loaded `gate_pass` at `at` must be refused, or None.
+    Holders already inside can always scan out, even on an expired pass.
+    """
+    at = at or timezone.now()
+    if gate_pass.presence == GatePass.INSIDE and gate_pass.status in (GatePass.APPROVED, GatePass.EXPIRED):
+        return None
+    if gate_pass.status != GatePass.APPROVED:
+        return f"Gate Pass has status: {gate_pass.get_status_display()}"
+    if at < gate_pass.entry_time - grace():
+        return f"Gate Pass is not valid until {timezone.localtime(gate_pass.entry_time):%d-%m-%Y, %I:%M %p}."
+    if at > gate_pass.exit_time + grace():
+        return "Gate Pass has expired."
+    return None
+
+
+def _due(cutoff, after=None):
+    """Approved passes whose exit_time is before `cutoff`, in index order from `after` ((exit_time, id))."""
+    passes = GatePass.objects.filter(status=GatePass.APPROVED, exit_time__lt=cutoff)
+    if after is not None:
+        exit_time, pk = after
+        passes = passes.filter(Q(exit_time__gt=exit_time) | Q(exit_time=exit_time, id__gt=pk))
+    return passes.order_by('exit_time', 'id')
+
+
+def expire_passes(now=None, chunk_size=None):
+    """
+    Marks approved passes whose validity window ended before `now` (less
+    the grace period) as EXPIRED and records it in their history. Returns
+    the number of passes expired.
+    """
+    now = now or timezone.now()
+    chunk_size = chunk_size or settings.GATE_PASS_EXPIRY_CHUNK_SIZE
+    cutoff = now - grace()
+    expired, after = 0, None
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                _due(cutoff, after).select_for_update(skip_locked=True)
+                .only('id', 'exit_time', 'status')[:chunk_size]
+            )
+            if not chunk:
+                return expired
+            after = (chunk[-1].exit_time, chunk[-1].id)
+            _expire(chunk, now)
+            expired += len(chunk)
+
+
+def _expire(passes, now):
+    for gate_pass, seq in zip(passes, reserve_change_seqs(len(passes))):
+        gate_pass.status, gate_pass.change_seq, gate_pass.updated_at = GatePass.EXPIRED, seq, now
+    GatePass.objects.bulk_update(passes, ['status', 'change_seq', 'updated_at'])
+    GatePassHistory.objects.bulk_create([
+        GatePassHistory(
+            gate_pass=gate_pass, action='STATUS_CHANGED',
+            details=f'Status changed from {GatePass.APPROVED} to {GatePass.EXPIRED}.',
+        )
+        for gate_pass in passes
+    ])
+    events.publish_counters(approved_count=-len(passes))
@@ -0,0 +1,35 @@
+# backend/apps/gatepass/images.py
+#
+# Image processing for visitor selfies, kept free of Django imports so it can
+# run in worker processes (see selfies.py). Phones upload multi-megabyte JPEGs,
+# often rotated through an EXIF tag and carrying GPS and device metadata; we
+# keep a bounded-size, upright JPEG without metadata and a small WebP
+# thumbnail for lists.
+
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+
+def _encode(image, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def process_selfie(data, max_size=1600, thumbnail_size=320, quality=85, thumbnail_quality=75):
+    """
+    Returns (original, thumbnail) bytes for an uploaded image: a JPEG no
+    larger than `max_size` on either side and a WebP no larger than
+    `thumbnail_size`, both rotated upright and without EXIF data.
+    """
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        # Re-encoding from pixels only is what drops the EXIF block.
+        image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        original = _encode(image, 'JPEG', quality=quality, optimize=True, progressive=True)
+        image.thumbnail((thumbnail_size, thumbnail_size), Image.Resampling.LANCZOS)
+        thumbnail = _encode(image, 'WEBP', quality=thumbnail_quality, method=4)
+    return original, thumbnail
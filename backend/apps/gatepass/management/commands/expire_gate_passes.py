@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.gatepass.expiry import expire_passes
+
+
+class Command(BaseCommand):
+    help = 'Marks approved gate passes whose validity window is over as EXPIRED.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, help='Passes per transaction (default GATE_PASS_EXPIRY_CHUNK_SIZE).')
+        parser.add_argument('--every', type=int, metavar='SECONDS', help='Keep running, sweeping every SECONDS.')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_passes(chunk_size=options['chunk_size'])
+            self.stdout.write(f'{expired} gate pass(es) expired.')
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.gatepass.models import GatePass, PreApprovedVisitor, VisitorPass
+from apps.gatepass.search import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the search_text column used by ?q= search.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk update.')
+
+    def handle(self, *args, **options):
+        for model in (GatePass, VisitorPass, PreApprovedVisitor):
+            count = rebuild(model.objects.all(), batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {count} row(s) rebuilt.')
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0003_gate_change_seq_purpose_change_seq'),
+        ('drivers', '0002_driver_change_seq'),
+        ('gatepass', '0011_gatepass_change_seq_visitorpass_change_seq'),
+        ('vehicles', '0002_vehicle_change_seq'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(fields=['status', 'exit_time'], name='gatepass_status_exit_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0012_gatepass_gatepass_status_exit_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatepass',
+            name='presence',
+            field=models.CharField(choices=[('outside', 'Outside'), ('inside', 'Inside')], default='outside', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='gatepass',
+            name='presence_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='gatepass',
+            name='transition_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
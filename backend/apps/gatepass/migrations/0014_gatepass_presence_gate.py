@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0003_gate_change_seq_purpose_change_seq'),
+        ('drivers', '0002_driver_change_seq'),
+        ('gatepass', '0013_gatepass_presence'),
+        ('vehicles', '0002_vehicle_change_seq'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatepass',
+            name='presence_gate',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='passes_inside', to='core_data.gate'),
+        ),
+        migrations.AddIndex(
+            model_name='gatepass',
+            index=models.Index(condition=models.Q(('presence', 'inside')), fields=['presence_gate'], name='gatepass_inside_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0014_gatepass_presence_gate'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gatepass',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('REJECTED', 'Rejected'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0015_gatepass_expired_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitorpass',
+            name='visitor_selfie_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='visitor_selfies/thumbnails/'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:29
+
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0016_visitorpass_visitor_selfie_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gatepass',
+            name='alcohol_test_photo',
+            field=models.ImageField(blank=True, null=True, upload_to=apps.uploads.storage.sharded('alcohol_tests')),
+        ),
+        migrations.AlterField(
+            model_name='gatepass',
+            name='qr_code',
+            field=models.ImageField(blank=True, null=True, upload_to=apps.uploads.storage.sharded('qrcodes')),
+        ),
+        migrations.AlterField(
+            model_name='visitorpass',
+            name='visitor_selfie',
+            field=models.ImageField(upload_to=apps.uploads.storage.sharded('visitor_selfies')),
+        ),
+        migrations.AlterField(
+            model_name='visitorpass',
+            name='visitor_selfie_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to=apps.uploads.storage.sharded('visitor_selfies/thumbnails')),
+        ),
+    ]
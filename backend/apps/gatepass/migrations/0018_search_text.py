@@ -0,0 +1,109 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:33
+
+import re
+import unicodedata
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+# search_text as apps/gatepass/search.py built it when this migration was
+# written; copied so later changes there do not change what this backfills.
+NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(value):
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return NON_ALPHANUMERIC.sub(' ', value.lower()).strip()
+
+
+def document(words=(), numbers=()):
+    parts = [normalize(value) for value in words]
+    for value in numbers:
+        parts.extend([normalize(value), normalize(value).replace(' ', '')])
+    return ' '.join(dict.fromkeys(part for part in parts if part))
+
+
+def gatepass_text(gate_pass):
+    vehicle_number = gate_pass.vehicle.vehicle_number if gate_pass.vehicle_id else None
+    return document(words=[gate_pass.person_name], numbers=[gate_pass.person_nid, gate_pass.person_phone, vehicle_number])
+
+
+def visitor_pass_text(visitor_pass):
+    return document(words=[visitor_pass.visitor_name, visitor_pass.visitor_company])
+
+
+def pre_approved_visitor_text(visitor):
+    return document(words=[visitor.name, visitor.company], numbers=[visitor.nid, visitor.phone])
+
+
+TRIGRAM_INDEXES = [
+    ('gatepass_search_trgm_idx', 'gatepass_gatepass'),
+    ('visitorpass_search_trgm_idx', 'gatepass_visitorpass'),
+    ('preapproved_search_trgm_idx', 'gatepass_preapprovedvisitor'),
+]
+
+
+def backfill_search_text(apps, schema_editor):
+    GatePass = apps.get_model('gatepass', 'GatePass')
+    VisitorPass = apps.get_model('gatepass', 'VisitorPass')
+    PreApprovedVisitor = apps.get_model('gatepass', 'PreApprovedVisitor')
+    for model, text, related in [
+        (GatePass, gatepass_text, ['vehicle']),
+        (VisitorPass, visitor_pass_text, []),
+        (PreApprovedVisitor, pre_approved_visitor_text, []),
+    ]:
+        batch = []
+        for obj in model.objects.select_related(*related).order_by('pk').iterator(chunk_size=1000):
+            obj.search_text = text(obj)
+            batch.append(obj)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['search_text'])
+                batch = []
+        model.objects.bulk_update(batch, ['search_text'])
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Substring matches only have an index to use on PostgreSQL.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table in TRIGRAM_INDEXES:
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (search_text gin_trgm_ops)')
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gatepass', '0017_sharded_media'),
+        ('vehicles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gatepass',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='preapprovedvisitor',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='visitorpass',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        TrigramExtension(),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,6 +1,8 @@
 # backend/apps/gatepass/models.py
 
+
 from django.db import models
+from apps.sync.models import ChangeTracked
 from apps.users.models import CustomUser
 from apps.vehicles.models import Vehicle
 from apps.drivers.models import Driver
@@ -10,18 +12,22 @@ from io import BytesIO
 from django.core.files import File
 from PIL import Image
 import json
+from apps.monitoring import metrics
+from apps.uploads.storage import sharded
 
-class GatePass(models.Model):
+class GatePass(ChangeTracked):
     # Status Choices
     PENDING = 'PENDING'
     APPROVED = 'APPROVED'
     REJECTED = 'REJECTED'
     CANCELLED = 'CANCELLED'
+    EXPIRED = 'EXPIRED'  # Approved passes past their validity window; set by apps/gatepass/expiry.py.
     STATUS_CHOICES = [
         (PENDING, 'Pending'),
         (APPROVED, 'Approved'),
         (REJECTED, 'Rejected'),
         (CANCELLED, 'Cancelled'),
+        (EXPIRED, 'Expired'),
     ]
 
     person_name = models.CharField(max_length=255) # No default needed here, it's provided in POST
@@ -38,7 +44,7 @@ class GatePass(models.Model):
     vehicle = models.ForeignKey(Vehicle, on_delete=models.SET_NULL, null=True, blank=True, related_name='gatepasses')
     driver = models.ForeignKey(Driver, on_delete=models.SET_NULL, null=True, blank=True, related_name='gatepasses')
 
-    qr_code = models.ImageField(upload_to='qrcodes/', blank=True, null=True)
+    qr_code = models.ImageField(upload_to=sharded('qrcodes'), blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
 
     created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='created_gatepasses')
@@ -47,7 +53,7 @@ class GatePass(models.Model):
     created_at = models.DateTimeField(auto_now_add=True) # Correct: automatically sets on creation
     updated_at = models.DateTimeField(auto_now=True)    # Correct: automatically updates on save
     alcohol_test_required = models.BooleanField(default=False)
-    alcohol_test_photo = models.ImageField(upload_to='alcohol_tests/', blank=True, null=True)
+    alcohol_test_photo = models.ImageField(upload_to=sharded('alcohol_tests'), blank=True, null=True)
 
     # For recurring gate passes
     is_recurring = models.BooleanField(default=False)
@@ -59,6 +65,49 @@ class GatePass(models.Model):
     ]
     frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES, null=True, blank=True)
 
+    # Whether the holder is on site, maintained by the scan path (apps/gate_operations/presence.py).
+    OUTSIDE = 'outside'
+    INSIDE = 'inside'
+    PRESENCE_CHOICES = [
+        (OUTSIDE, 'Outside'),
+        (INSIDE, 'Inside'),
+    ]
+    presence = models.CharField(max_length=10, choices=PRESENCE_CHOICES, default=OUTSIDE, editable=False)
+    presence_changed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    transition_count = models.PositiveIntegerField(default=0, editable=False)
+    # Gate the holder came in through while inside; counted in that gate's occupancy.
+    presence_gate = models.ForeignKey(
+        Gate, on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name='passes_inside'
+    )
+    # Normalized name, NID, phone and plate for ?q= search (apps/gatepass/search.py).
+    search_text = models.TextField(blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # Passes still valid on a given day (offline snapshots, active-pass queries).
+            models.Index(fields=['status', 'exit_time'], name='gatepass_status_exit_idx'),
+            # Who is on site right now; only the (few) passes inside are indexed.
+            models.Index(
+                fields=['presence_gate'], condition=models.Q(presence='inside'), name='gatepass_inside_idx'
+            ),
+        ]
+
+    # Who may see the pass through /api/sync/ (apps/sync/resources.py).
+    sync_scope_fields = ('created_by_id',)
+
+    # What search_text is made from (apps/gatepass/search.py).
+    SEARCH_FIELDS = ('person_name', 'person_nid', 'person_phone', 'vehicle_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so that saves which leave these alone need not load the
+        # vehicle to rebuild search_text (signals.fill_search_text).
+        loaded = dict(zip(field_names, values))
+        if 'search_text' in loaded and all(name in loaded for name in cls.SEARCH_FIELDS):
+            instance._loaded_search = (tuple(loaded[name] for name in cls.SEARCH_FIELDS), loaded['search_text'])
+        return instance
+
     def __str__(self):
         return f"Gate Pass for {self.person_name} ({self.status})"
 
@@ -74,20 +123,21 @@ class GatePass(models.Model):
         }
         qr_data_json = json.dumps(qr_data)
 
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data_json)
-        qr.make(fit=True)
+        with metrics.QR_RENDER_SECONDS.time():
+            qr = qrcode.QRCode(
+                version=1,
+                error_correction=qrcode.constants.ERROR_CORRECT_L,
+                box_size=10,
+                border=4,
+            )
+            qr.add_data(qr_data_json)
+            qr.make(fit=True)
 
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = BytesIO()
-        img.save(buffer, format="PNG")
-        filename = f'gatepass_{self.id}.png'
-        self.qr_code.save(filename, File(buffer), save=False)
+            img = qr.make_image(fill_color="black", back_color="white")
+            buffer = BytesIO()
+            img.save(buffer, format="PNG")
+            filename = f'gatepass_{self.id}.png'
+            self.qr_code.save(filename, File(buffer), save=False)
 
 
 class PreApprovedVisitor(models.Model):
@@ -98,6 +148,8 @@ class PreApprovedVisitor(models.Model):
     approved_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='approved_visitors')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Normalized name, company, NID and phone for ?q= search (apps/gatepass/search.py).
+    search_text = models.TextField(blank=True, default='', editable=False)
 
     def __str__(self):
         return f"{self.name} ({self.nid})"
@@ -128,7 +180,7 @@ class GatePassHistory(models.Model):
         return f'{self.gate_pass} - {self.action} by {self.user} at {self.timestamp}'
 
 
-class VisitorPass(models.Model):
+class VisitorPass(ChangeTracked):
     # Status Choices
     PENDING = 'PENDING'
     APPROVED = 'APPROVED'
@@ -143,11 +195,20 @@ class VisitorPass(models.Model):
     visitor_company = models.CharField(max_length=255)
     purpose = models.TextField()
     whom_to_visit = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='visitor_passes')
-    visitor_selfie = models.ImageField(upload_to='visitor_selfies/')
+    visitor_selfie = models.ImageField(upload_to=sharded('visitor_selfies'))
+    # WebP thumbnail made from the selfie after upload (apps/gatepass/selfies.py); served in lists.
+    visitor_selfie_thumbnail = models.ImageField(
+        upload_to=sharded('visitor_selfies/thumbnails'), blank=True, null=True, editable=False
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    # Normalized name and company for ?q= search (apps/gatepass/search.py).
+    search_text = models.TextField(blank=True, default='', editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Who may see the pass through /api/sync/ (apps/sync/resources.py).
+    sync_scope_fields = ('status', 'whom_to_visit_id')
+
     def __str__(self):
         return f"Visitor Pass for {self.visitor_name} to visit {self.whom_to_visit.get_full_name()} ({self.status})"
\ No newline at end of file
@@ -0,0 +1,100 @@
+# backend/apps/gatepass/preapproved.py
+#
+# Whether a gate pass's person_nid belongs to a pre-approved visitor, which
+# approves the pass on creation. Most NIDs don't, so each process keeps a Bloom
+# filter of every pre-approved NID: a NID the filter rules out needs no query.
+# A NID the filter lets through (pre-approved, or one of the
+# PREAPPROVED_BLOOM_ERROR_RATE false positives) is checked against the database
+# once and the answer kept in a small exact set, so regulars on recurring
+# passes cost no query either.
+#
+# The filter is tagged with the 'preapproved-nids' version (apps/core_data/
+# versions.py), which saves and deletes of PreApprovedVisitor bump on commit
+# (signals.py); a process whose filter is behind rebuilds it on its next
+# lookup, within DATA_VERSION_TTL seconds of a bump made by another process.
+# Bulk writes that skip signals must call bump() themselves.
+
+import hashlib
+import math
+import threading
+
+from django.conf import settings
+
+from apps.core_data import versions
+from apps.core_data.autocomplete import LRUCache
+from .models import PreApprovedVisitor
+
+VERSION = 'preapproved-nids'
+
+
+class BloomFilter:
+    """A set of strings that may answer "maybe" for strings it doesn't hold, never "no" for one it does."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class Membership:
+    def __init__(self, version):
+        self.version = version
+        queryset = PreApprovedVisitor.objects.values_list('nid', flat=True)
+        self.bloom = BloomFilter(queryset.count(), settings.PREAPPROVED_BLOOM_ERROR_RATE)
+        for nid in queryset.iterator(chunk_size=2000):
+            self.bloom.add(nid)
+        self.checked = LRUCache(maxsize=settings.PREAPPROVED_EXACT_SET_SIZE)
+
+    def __contains__(self, nid):
+        if nid not in self.bloom:
+            return False
+        known = self.checked.get(nid)
+        if known is None:
+            known = PreApprovedVisitor.objects.filter(nid=nid).exists()
+            self.checked.set(nid, known)
+        return known
+
+
+_membership = None
+_lock = threading.Lock()
+
+
+def is_pre_approved(nid):
+    """Whether a pre-approved visitor has NID `nid`."""
+    global _membership
+    # Callers pass the submitted value as is; JSON clients may send a number.
+    nid = '' if nid is None else str(nid)
+    if not nid:
+        return False
+    version = versions.get(VERSION)
+    membership = _membership
+    if membership is None or membership.version != version:
+        with _lock:
+            membership = _membership
+            if membership is None or membership.version != version:
+                membership = _membership = Membership(version)
+    return nid in membership
+
+
+def bump():
+    """Makes every process rebuild its filter once the current transaction commits."""
+    versions.bump_on_commit(VERSION)
+
+
+def forget():
+    """Drops this process's filter, e.g. between tests."""
+    global _membership
+    _membership = None
@@ -0,0 +1,159 @@
+# backend/apps/gatepass/search.py
+#
+# `?q=` search on gate passes, visitor passes and pre-approved visitors, for
+# guards looking someone up by part of a name, the tail of a phone number or a
+# plate. Each searchable model keeps a `search_text` column: its searchable
+# fields lowercased, stripped of accents and punctuation, with phone numbers,
+# NIDs and plates also written without separators so "KA 01 AB 1234",
+# "ka01ab" and "1234" all find the same pass. It is filled in on save (see
+# signals.py) and by `manage.py rebuild_search_text`.
+#
+# Every word of the query must occur in search_text; results are ranked by how
+# many query words start a word of the row, then newest first, and capped at
+# SEARCH_MAX_RESULTS without a count. On PostgreSQL a trigram GIN index on
+# search_text serves the substring matches and each search runs under a
+# SEARCH_TIMEOUT_MS statement timeout.
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .models import GatePass, VisitorPass
+
+NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+
+
+def normalize(value):
+    """Lowercase ASCII words of `value`, separated by single spaces."""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKD', str(value))
+    value = ''.join(char for char in value if not unicodedata.combining(char))
+    return NON_ALPHANUMERIC.sub(' ', value.lower()).strip()
+
+
+def compact(value):
+    """`value` normalized with the separators removed, for numbers and plates."""
+    return normalize(value).replace(' ', '')
+
+
+def document(words=(), numbers=()):
+    """search_text for free-text `words` and identifier-like `numbers`."""
+    parts = [normalize(value) for value in words]
+    for value in numbers:
+        parts.extend([normalize(value), compact(value)])
+    return ' '.join(dict.fromkeys(part for part in parts if part))
+
+
+def gatepass_text(gate_pass, vehicle_number=None):
+    return document(
+        words=[gate_pass.person_name],
+        numbers=[gate_pass.person_nid, gate_pass.person_phone, vehicle_number],
+    )
+
+
+def visitor_pass_text(visitor_pass):
+    return document(words=[visitor_pass.visitor_name, visitor_pass.visitor_company])
+
+
+def pre_approved_visitor_text(visitor):
+    return document(words=[visitor.name, visitor.company], numbers=[visitor.nid, visitor.phone])
+
+
+def is_current(obj):
+    """Whether `obj`'s search_text is known to match its searchable fields without recomputing it."""
+    if not isinstance(obj, GatePass):
+        return False
+    loaded = getattr(obj, '_loaded_search', None)
+    return loaded is not None and loaded == (tuple(getattr(obj, name) for name in GatePass.SEARCH_FIELDS), obj.search_text)
+
+
+def text_for(obj):
+    if isinstance(obj, GatePass):
+        return gatepass_text(obj, obj.vehicle.vehicle_number if obj.vehicle_id else None)
+    if isinstance(obj, VisitorPass):
+        return visitor_pass_text(obj)
+    return pre_approved_visitor_text(obj)
+
+
+def rebuild(queryset, batch_size=1000):
+    """Recomputes search_text for the rows of `queryset`, a batch at a time. Returns the number of rows."""
+    if queryset.model is GatePass:
+        queryset = queryset.select_related('vehicle')
+    rebuilt, after = 0, None
+    while True:
+        page = queryset if after is None else queryset.filter(pk__gt=after)
+        batch = list(page.order_by('pk')[:batch_size])
+        if not batch:
+            return rebuilt
+        after = batch[-1].pk
+        for obj in batch:
+            obj.search_text = text_for(obj)
+        # search_text is not served by /api/sync/, so no change numbers.
+        queryset.model.objects.bulk_update(batch, ['search_text'])
+        rebuilt += len(batch)
+
+
+def search(queryset, q):
+    """
+    `queryset` narrowed to rows matching every word of `q` and ranked, or
+    None when `q` has nothing to search for.
+    """
+    terms = normalize(q).split()
+    if not terms or max(len(term) for term in terms) < settings.SEARCH_MIN_CHARS:
+        return None
+    rank = Value(0)
+    for term in terms:
+        queryset = queryset.filter(search_text__contains=term)
+        # A query word that starts a word of the row ranks above one found inside a word.
+        rank = rank + Case(
+            When(Q(search_text__startswith=term) | Q(search_text__contains=f' {term}'), then=Value(1)),
+            default=Value(0), output_field=IntegerField(),
+        )
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', '-created_at', '-pk')
+
+
+class SearchTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Search took too long; add more of the name, number or plate.'
+    default_code = 'search_timeout'
+
+
+def evaluate(queryset):
+    """The first SEARCH_MAX_RESULTS rows of `queryset`, within SEARCH_TIMEOUT_MS on PostgreSQL."""
+    limit = settings.SEARCH_MAX_RESULTS
+    if connection.vendor != 'postgresql' or not settings.SEARCH_TIMEOUT_MS:
+        return list(queryset[:limit])
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [settings.SEARCH_TIMEOUT_MS])
+            return list(queryset[:limit])
+    except OperationalError as exc:
+        raise SearchTimeout() from exc
+
+
+class SearchMixin:
+    """
+    For list endpoints of models with a search_text column: `?q=` returns the
+    best SEARCH_MAX_RESULTS matches as a plain list, without pagination.
+    """
+
+    def list(self, request, *args, **kwargs):
+        q = request.query_params.get('q', '').strip()
+        if not q:
+            return super().list(request, *args, **kwargs)
+        queryset = search(self.filter_queryset(self.get_queryset()), q)
+        if queryset is None:
+            return Response(
+                {"detail": f"Search for at least {settings.SEARCH_MIN_CHARS} letters or digits."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = self.get_serializer(evaluate(queryset), many=True)
+        return Response(serializer.data)
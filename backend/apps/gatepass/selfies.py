@@ -0,0 +1,121 @@
+# backend/apps/gatepass/selfies.py
+#
+# Post-upload processing of visitor selfies. The public create request stores
+# the upload as it came and returns; once its transaction commits, the
+# upload's storage name is handed to a process pool (SELFIE_PROCESSING_WORKERS
+# processes) whose worker reads it, rotates it upright, strips EXIF, bounds
+# its size and makes a WebP thumbnail (images.process_selfie). The results
+# replace the upload, written from a small thread pool rather than the
+# process pool's own result thread, and the pass's sync change number is
+# bumped so clients fetch the new image paths.
+#
+# With SELFIE_PROCESSING = 'sync' (tests, management commands) the same work
+# runs inline instead.
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+
+from apps.sync.models import next_change_seq
+from . import images
+from .models import VisitorPass
+
+logger = logging.getLogger('gatepass_project.selfies')
+
+_pool = None
+_store_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned, not forked: the server process has threads and open connections.
+            # Workers set Django up to read uploads from the configured storage.
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.SELFIE_PROCESSING_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def get_store_pool():
+    global _store_pool
+    with _pool_lock:
+        if _store_pool is None:
+            _store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='selfie-store')
+        return _store_pool
+
+
+def _sizes():
+    return {'max_size': settings.SELFIE_MAX_DIMENSION, 'thumbnail_size': settings.SELFIE_THUMBNAIL_SIZE}
+
+
+def schedule(visitor_pass):
+    """Processes the pass's selfie after the current transaction commits."""
+    if not visitor_pass.visitor_selfie:
+        return
+    if settings.SELFIE_PROCESSING == 'sync':
+        transaction.on_commit(partial(process, visitor_pass.pk))
+    else:
+        transaction.on_commit(partial(_submit, visitor_pass.pk, visitor_pass.visitor_selfie.name))
+
+
+def process_stored(raw_name, **sizes):
+    """(original, thumbnail) bytes for the upload stored as `raw_name`; runs in the pool's workers."""
+    storage = VisitorPass._meta.get_field('visitor_selfie').storage
+    with storage.open(raw_name, 'rb') as upload:
+        return images.process_selfie(upload.read(), **sizes)
+
+
+def process(visitor_pass_id):
+    """Processes a pass's selfie inline."""
+    raw_name = VisitorPass.objects.only('id', 'visitor_selfie').get(pk=visitor_pass_id).visitor_selfie.name
+    original, thumbnail = process_stored(raw_name, **_sizes())
+    _store(visitor_pass_id, raw_name, original, thumbnail)
+
+
+def _submit(visitor_pass_id, raw_name):
+    future = get_pool().submit(process_stored, raw_name, **_sizes())
+    future.add_done_callback(partial(_finish, visitor_pass_id, raw_name))
+
+
+def _finish(visitor_pass_id, raw_name, future):
+    # Runs on the process pool's result thread, which must not block on storage or the database.
+    get_store_pool().submit(_complete, visitor_pass_id, raw_name, future)
+
+
+def _complete(visitor_pass_id, raw_name, future):
+    try:
+        original, thumbnail = future.result()
+        _store(visitor_pass_id, raw_name, original, thumbnail)
+    except Exception:
+        logger.exception('Could not process the selfie of visitor pass %s.', visitor_pass_id)
+    finally:
+        close_old_connections()
+
+
+def _store(visitor_pass_id, raw_name, original, thumbnail):
+    visitor_pass = VisitorPass(pk=visitor_pass_id)
+    stem = os.path.splitext(os.path.basename(raw_name))[0]
+    visitor_pass.visitor_selfie.save(f'{stem}.jpg', ContentFile(original), save=False)
+    visitor_pass.visitor_selfie_thumbnail.save(f'{stem}.webp', ContentFile(thumbnail), save=False)
+    with transaction.atomic():
+        # Only if the selfie was not replaced meanwhile.
+        updated = VisitorPass.objects.filter(pk=visitor_pass_id, visitor_selfie=raw_name).update(
+            visitor_selfie=visitor_pass.visitor_selfie.name,
+            visitor_selfie_thumbnail=visitor_pass.visitor_selfie_thumbnail.name,
+            change_seq=next_change_seq(),
+        )
+    storage = visitor_pass.visitor_selfie.storage
+    for name in ([raw_name] if updated else [visitor_pass.visitor_selfie.name, visitor_pass.visitor_selfie_thumbnail.name]):
+        storage.delete(name)
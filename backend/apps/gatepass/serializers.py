@@ -1,6 +1,9 @@
 # backend/apps/gatepass/serializers.py
 
+from django.db import transaction
 from rest_framework import serializers
+from apps.core_data.reference import ReferenceField, ReferencePrimaryKeyRelatedField
+from apps.uploads import chunks
 from .models import VisitorPass, GatePass, Purpose, Gate, PreApprovedVisitor, GatePassTemplate
 from apps.users.models import CustomUser
 from apps.vehicles.models import Vehicle
@@ -36,8 +39,9 @@ class SimpleUserSerializer(serializers.ModelSerializer):
 
 class GatePassSerializer(serializers.ModelSerializer):
     # These fields will be used for READ operations (GET requests), providing nested objects
-    purpose = PurposeSerializer(read_only=True)
-    gate = GateSerializer(read_only=True)
+    # Gates and purposes come from the in-process reference cache (apps/core_data/reference.py).
+    purpose = ReferenceField(PurposeSerializer, source='purpose_id')
+    gate = ReferenceField(GateSerializer, source='gate_id')
     vehicle = VehicleSerializer(read_only=True)
     driver = DriverSerializer(read_only=True)
     created_by = SimpleUserSerializer(read_only=True)
@@ -62,8 +66,8 @@ class GatePassSerializer(serializers.ModelSerializer):
 
     # These fields will be used for WRITE operations (POST/PUT requests),
     # accepting primary keys and mapping them to the ForeignKey fields on the model.
-    purpose_id = serializers.PrimaryKeyRelatedField(queryset=Purpose.objects.all(), write_only=True)
-    gate_id = serializers.PrimaryKeyRelatedField(queryset=Gate.objects.all(), write_only=True)
+    purpose_id = ReferencePrimaryKeyRelatedField(queryset=Purpose.objects.all(), write_only=True)
+    gate_id = ReferencePrimaryKeyRelatedField(queryset=Gate.objects.all(), write_only=True)
     vehicle_id = serializers.PrimaryKeyRelatedField(queryset=Vehicle.objects.all(), allow_null=True, required=False, write_only=True)
     driver_id = serializers.PrimaryKeyRelatedField(queryset=Driver.objects.all(), allow_null=True, required=False, write_only=True)
 
@@ -151,7 +155,9 @@ class VisitorPassSerializer(serializers.ModelSerializer):
         source='whom_to_visit',
         write_only=True
     )
-    visitor_selfie = serializers.ImageField(required=True)
+    visitor_selfie = serializers.ImageField(required=False)
+    # A finished resumable upload (apps/uploads/) instead of the image itself.
+    visitor_selfie_upload_id = serializers.UUIDField(write_only=True, required=False)
 
     class Meta:
         model = VisitorPass
@@ -163,11 +169,34 @@ class VisitorPassSerializer(serializers.ModelSerializer):
             'whom_to_visit',
             'whom_to_visit_id',
             'visitor_selfie',
+            'visitor_selfie_thumbnail',
+            'visitor_selfie_upload_id',
             'status',
             'created_at',
             'updated_at',
         )
-        read_only_fields = ('id', 'status', 'created_at', 'updated_at', 'whom_to_visit')
+        read_only_fields = ('id', 'status', 'created_at', 'updated_at', 'whom_to_visit', 'visitor_selfie_thumbnail')
+
+    def validate(self, data):
+        if self.instance is None and bool(data.get('visitor_selfie')) == bool(data.get('visitor_selfie_upload_id')):
+            raise serializers.ValidationError("Send either visitor_selfie or visitor_selfie_upload_id.")
+        return data
+
+    def create(self, validated_data):
+        upload_id = validated_data.pop('visitor_selfie_upload_id', None)
+        with transaction.atomic():
+            if upload_id is not None:
+                request = self.context.get('request')
+                upload = chunks.claim(upload_id, request.user if request else None)
+                if upload is None:
+                    raise serializers.ValidationError({'visitor_selfie_upload_id': "No finished upload with this id."})
+                # The selfie pipeline replaces the uploaded file with its processed copies.
+                validated_data['visitor_selfie'] = upload.file.name
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        validated_data.pop('visitor_selfie_upload_id', None)
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         ret = super().to_representation(instance)
@@ -179,14 +208,19 @@ class VisitorPassSerializer(serializers.ModelSerializer):
             else:
                 ret[field_name] = None
 
-        # Build full URL for the selfie image
+        # Build full URLs for the selfie images. Lists get the thumbnail in
+        # place of the full-size selfie once it has been made.
         request = self.context.get('request')
-        if instance.visitor_selfie and hasattr(instance.visitor_selfie, 'url'):
-            if request:
-                ret['visitor_selfie'] = request.build_absolute_uri(instance.visitor_selfie.url)
+        view = self.context.get('view')
+        selfie = instance.visitor_selfie
+        if instance.visitor_selfie_thumbnail and getattr(view, 'action', None) == 'list':
+            selfie = instance.visitor_selfie_thumbnail
+        for field_name, image in [('visitor_selfie', selfie), ('visitor_selfie_thumbnail', instance.visitor_selfie_thumbnail)]:
+            if image and hasattr(image, 'url'):
+                # Fallback to the relative URL if request context is not available
+                ret[field_name] = request.build_absolute_uri(image.url) if request else image.url
             else:
-                # Fallback if request context is not available
-                ret['visitor_selfie'] = instance.visitor_selfie.url
+                ret[field_name] = None
 
         return ret
 
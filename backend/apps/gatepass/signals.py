@@ -1,8 +1,29 @@
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 from fcm_django.models import FCMDevice
-from .models import GatePass, GatePassHistory, VisitorPass
+from .models import GatePass, GatePassHistory, PreApprovedVisitor, VisitorPass
+from . import preapproved, search
+from apps.vehicles.models import Vehicle
 from django.contrib.auth.models import Group
+from apps.monitoring.metrics import track_notification
+from apps.gate_operations import events
+
+def send_after_commit(devices, notification, **message):
+    """
+    Pushes `message` to `devices` once the saving transaction commits: never
+    for a save that is rolled back, and without holding the transaction (and
+    the change counter row its save locked, see apps/sync/models.py) open
+    during the FCM request.
+    """
+    def send():
+        try:
+            with track_notification('fcm', notification):
+                devices.send_message(**message)
+        except Exception as e:
+            print(f"Error sending {notification} notification: {e}")
+    transaction.on_commit(send)
+
 
 @receiver(pre_save, sender=GatePass)
 def store_old_status_on_instance(sender, instance, **kwargs):
@@ -41,8 +62,8 @@ def log_gate_pass_history_on_save(sender, instance, created, **kwargs):
 
         # Send a push notification to the user who created the gate pass
         if instance.created_by:
-            devices = FCMDevice.objects.filter(user=instance.created_by, active=True)
-            devices.send_message(
+            send_after_commit(
+                FCMDevice.objects.filter(user=instance.created_by, active=True), 'gatepass_status',
                 title="Gate Pass Status Updated",
                 body=f"Your gate pass for {instance.person_name} has been {instance.get_status_display()}.",
                 data={"gatepass_id": str(instance.id)} # Send ID to allow app to navigate
@@ -58,6 +79,38 @@ def log_gate_pass_history_on_save(sender, instance, created, **kwargs):
         )
 
 
+# Dashboard counters (DashboardSummaryView) affected by each gate pass status.
+STATUS_COUNTERS = {
+    GatePass.PENDING: 'pending_count',
+    GatePass.APPROVED: 'approved_count',
+    GatePass.REJECTED: 'rejected_count',
+}
+
+
+@receiver(post_save, sender=GatePass)
+def publish_gate_pass_status(sender, instance, created, **kwargs):
+    """
+    Pushes new gate passes and status changes to the live event stream,
+    together with the matching dashboard counter deltas.
+    """
+    old_status = None if created else getattr(instance, '_old_status', instance.status)
+    if old_status == instance.status:
+        return
+
+    events.publish('gatepass_status', {
+        'id': instance.id,
+        'person_name': instance.person_name,
+        'old_status': old_status,
+        'status': instance.status,
+    })
+    deltas = {}
+    if old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if instance.status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[instance.status]] = deltas.get(STATUS_COUNTERS[instance.status], 0) + 1
+    events.publish_counters(**deltas)
+
+
 @receiver(post_save, sender=VisitorPass)
 def send_visitor_pass_notifications(sender, instance, created, **kwargs):
     """
@@ -65,34 +118,49 @@ def send_visitor_pass_notifications(sender, instance, created, **kwargs):
     """
     if created:
         # Notify the employee being visited
-        try:
-            employee_to_visit = instance.whom_to_visit
-            devices = FCMDevice.objects.filter(user=employee_to_visit, active=True)
-            if devices.exists():
-                devices.send_message(
-                    title="New Visitor Request",
-                    body=f"You have a new visitor request from {instance.visitor_name}.",
-                    data={"visitor_pass_id": str(instance.id), "type": "visitor_request"}
-                )
-        except Exception as e:
-            print(f"Error sending notification to employee: {e}")
+        send_after_commit(
+            FCMDevice.objects.filter(user_id=instance.whom_to_visit_id, active=True), 'visitor_request',
+            title="New Visitor Request",
+            body=f"You have a new visitor request from {instance.visitor_name}.",
+            data={"visitor_pass_id": str(instance.id), "type": "visitor_request"}
+        )
 
     else:
         # A more robust way is to check if the status was changed in this save operation.
         # For simplicity, we assume if status is approved, a notification should be sent.
         if instance.status == VisitorPass.APPROVED:
-            try:
-                # Notify all users in the 'Security' group
-                security_group = Group.objects.get(name='Security')
-                security_users = security_group.user_set.all()
-                devices = FCMDevice.objects.filter(user__in=security_users, active=True)
-                if devices.exists():
-                    devices.send_message(
-                        title="Visitor Approved",
-                        body=f"{instance.visitor_name} has been approved to visit {instance.whom_to_visit.get_full_name()}.",
-                        data={"visitor_pass_id": str(instance.id), "type": "visitor_approved"}
-                    )
-            except Group.DoesNotExist:
+            # Notify all users in the 'Security' group
+            if not Group.objects.filter(name='Security').exists():
                 print("Security group not found. Cannot send notification.")
-            except Exception as e:
-                print(f"Error sending notification to security: {e}")
+                return
+            send_after_commit(
+                FCMDevice.objects.filter(user__groups__name='Security', active=True), 'visitor_approved',
+                title="Visitor Approved",
+                body=f"{instance.visitor_name} has been approved to visit {instance.whom_to_visit.get_full_name()}.",
+                data={"visitor_pass_id": str(instance.id), "type": "visitor_approved"}
+            )
+
+
+@receiver(pre_save, sender=GatePass)
+@receiver(pre_save, sender=VisitorPass)
+@receiver(pre_save, sender=PreApprovedVisitor)
+def fill_search_text(sender, instance, **kwargs):
+    """Keeps search_text (apps/gatepass/search.py) in step with the searchable fields."""
+    if not search.is_current(instance):
+        instance.search_text = search.text_for(instance)
+
+
+@receiver(post_save, sender=Vehicle)
+def refresh_vehicle_search_text(sender, instance, created, **kwargs):
+    """A renumbered vehicle's passes must be found by the new plate."""
+    if not created:
+        search.rebuild(GatePass.objects.filter(vehicle=instance).exclude(
+            search_text__contains=search.compact(instance.vehicle_number),
+        ))
+
+
+@receiver(post_save, sender=PreApprovedVisitor)
+@receiver(post_delete, sender=PreApprovedVisitor)
+def rebuild_preapproved_nids(sender, instance, **kwargs):
+    """Every process's NID filter (apps/gatepass/preapproved.py) must learn of added and removed visitors."""
+    preapproved.bump()
@@ -1,6 +1,25 @@
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APITestCase
 from unittest import mock
-from .models import GatePass, GatePassHistory, Purpose
+from concurrent.futures import Future
+import shutil
+import tempfile
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from .models import GatePass, GatePassHistory, Purpose, Gate, PreApprovedVisitor, VisitorPass
+from apps.core_data import reference
+from apps.core_data.models import DataVersion, VehicleType
+from apps.vehicles.models import Vehicle
+from apps.drivers.models import Driver
+from datetime import date, timedelta
+from django.utils import timezone
+from .expiry import expire_passes, scan_refusal
+from . import preapproved, selfies
 from apps.users.models import CustomUser
 from fcm_django.models import FCMDevice
 
@@ -79,8 +98,11 @@ class GatePassSignalTests(TestCase):
         )
 
         # Change the status to trigger the signal
-        gate_pass.status = GatePass.APPROVED
-        gate_pass.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            gate_pass.status = GatePass.APPROVED
+            gate_pass.save()
+            # Nothing is sent until the transaction commits.
+            mock_send_message.assert_not_called()
 
         # Assert that the send_message method was called
         mock_send_message.assert_called_once()
@@ -89,3 +111,287 @@ class GatePassSignalTests(TestCase):
         args, kwargs = mock_send_message.call_args
         self.assertEqual(kwargs['title'], "Gate Pass Status Updated")
         self.assertIn("has been Approved", kwargs['body'])
+
+
+class GatePassQueryBudgetTests(APITestCase):
+    """
+    The test suite runs with QUERY_BUDGET_MODE='raise' (see conftest.py), so
+    these requests fail if nested serializers start issuing a query per row.
+    """
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='client', password='password123')
+        self.admin = CustomUser.objects.create_user(username='admin', password='password123', is_staff=True)
+        purpose = Purpose.objects.create(name='Budget Purpose')
+        gate = Gate.objects.create(name='Budget Gate')
+        vehicle_type = VehicleType.objects.create(name='Budget Type')
+        for i in range(5):
+            vehicle = Vehicle.objects.create(
+                vehicle_number=f'BUDGET {i}', type=vehicle_type, make='Make', model='Model',
+                capacity='1', status='Active', registration_date=date.today()
+            )
+            driver = Driver.objects.create(name=f'Driver {i}', license_number=f'LIC-{i}')
+            GatePass.objects.create(
+                person_name=f'Person {i}', person_phone='123',
+                entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z',
+                purpose=purpose, gate=gate, vehicle=vehicle, driver=driver,
+                created_by=self.user, approved_by=self.admin,
+            )
+        # Budgets are for a process that has loaded the reference tables.
+        for reference_table in reference.TABLES.values():
+            reference_table.snapshot()
+
+    def test_list_page_stays_within_budget(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('gatepass-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 5)
+
+    def test_dashboard_summary_is_a_single_query(self):
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('dashboard-summary'))
+        self.assertEqual(response.data['pending_count'], 5)
+
+
+class GatePassSearchTests(APITestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='password123', is_staff=True)
+        vehicle_type = VehicleType.objects.create(name='Search Type')
+        self.vehicle = Vehicle.objects.create(
+            vehicle_number='KA 01 AB 1234', type=vehicle_type, make='Make', model='Model',
+            capacity='1', status='Active', registration_date=date.today()
+        )
+        self.with_vehicle = GatePass.objects.create(
+            person_name='Zoë Rahman', person_phone='+880 1711-223344', person_nid='19901234567',
+            entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z',
+            vehicle=self.vehicle, created_by=self.admin,
+        )
+        self.other = GatePass.objects.create(
+            person_name='Abdul Kazoe', person_phone='01911000000',
+            entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z', created_by=self.admin,
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def search(self, q, name='gatepass-list'):
+        response = self.client.get(reverse(name), {'q': q})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data]
+
+    def test_matches_name_phone_tail_nid_and_plate_in_any_spelling(self):
+        for q in ['zoe rah', 'ZOË RAHMAN', '223344', '1711 223', '19901234567', 'ka-01-ab-12', 'KA01AB1234', 'ab 1234']:
+            self.assertEqual(self.search(q), [self.with_vehicle.id], q)
+        self.assertEqual(self.search('nobody'), [])
+
+    def test_word_starts_rank_first(self):
+        # "zoe" starts a word of the first pass's name but is inside "kazoe".
+        self.assertEqual(self.search('zoe'), [self.with_vehicle.id, self.other.id])
+        self.assertEqual(self.search('kazoe'), [self.other.id])
+
+    def test_renumbered_vehicle_is_found_by_its_new_plate(self):
+        self.vehicle.vehicle_number = 'DHAKA METRO 11-2233'
+        self.vehicle.save()
+        self.assertEqual(self.search('metro 11'), [self.with_vehicle.id])
+        self.assertEqual(self.search('ka01ab'), [])
+
+    def test_saves_that_leave_searchable_fields_alone_do_not_load_the_vehicle(self):
+        gate_pass = GatePass.objects.get(pk=self.with_vehicle.pk)
+        gate_pass.status = GatePass.APPROVED
+        with CaptureQueriesContext(connection) as queries:
+            gate_pass.save()
+        self.assertFalse([query for query in queries if 'vehicles_vehicle' in query['sql']])
+
+        gate_pass.person_name = 'Zoë Chowdhury'
+        gate_pass.save()
+        self.assertEqual(self.search('chowdhury ka01ab'), [gate_pass.id])
+
+    def test_too_short_queries_are_refused(self):
+        self.assertEqual(self.client.get(reverse('gatepass-list'), {'q': 'z'}).status_code, 400)
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_visitor_passes_and_pre_approved_visitors(self, send_message):
+        VisitorPass.objects.create(
+            visitor_name='Nadia Islam', visitor_company='Acme Ltd', purpose='Meeting',
+            whom_to_visit=self.admin, visitor_selfie='visitor_selfies/a.jpg',
+        )
+        PreApprovedVisitor.objects.create(
+            name='Karim Uddin', nid='NID-778899', phone='01700 000111', company='Acme', approved_by=self.admin,
+        )
+        self.assertEqual(len(self.search('acme', 'visitorpass-list')), 1)
+        self.assertEqual(len(self.search('778899', 'pre-approved-visitor-list')), 1)
+        self.assertEqual(len(self.search('000111', 'pre-approved-visitor-list')), 1)
+
+
+class PreApprovedMembershipTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = CustomUser.objects.create_user(username='guard', password='password123')
+        self.purpose = Purpose.objects.create(name='Pre-approved Purpose')
+        self.gate = Gate.objects.create(name='Pre-approved Gate')
+        PreApprovedVisitor.objects.create(
+            name='Regular Visitor', nid='NID-REGULAR', phone='555', company='Acme', approved_by=self.user,
+        )
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = preapproved.BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'NID-{i}')
+        self.assertTrue(all(f'NID-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'OTHER-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_unknown_nids_need_no_query_once_built(self):
+        self.assertTrue(preapproved.is_pre_approved('NID-REGULAR'))
+        with self.assertNumQueries(0):
+            self.assertTrue(preapproved.is_pre_approved('NID-REGULAR'))
+            self.assertFalse(preapproved.is_pre_approved('NID-STRANGER'))
+            self.assertFalse(preapproved.is_pre_approved(''))
+            self.assertFalse(preapproved.is_pre_approved(123456))
+
+    def test_saves_and_deletes_rebuild_the_filter(self):
+        self.assertFalse(preapproved.is_pre_approved('NID-NEW'))
+        with self.captureOnCommitCallbacks(execute=True):
+            visitor = PreApprovedVisitor.objects.create(
+                name='New Visitor', nid='NID-NEW', phone='556', company='Acme', approved_by=self.user,
+            )
+        self.assertTrue(preapproved.is_pre_approved('NID-NEW'))
+        with self.captureOnCommitCallbacks(execute=True):
+            visitor.delete()
+        self.assertFalse(preapproved.is_pre_approved('NID-NEW'))
+
+    def test_bumps_made_by_other_processes_are_seen_after_the_ttl(self):
+        self.assertTrue(preapproved.is_pre_approved('NID-REGULAR'))
+        # Another process deletes the visitor; its bump reaches this one only through the database.
+        PreApprovedVisitor.objects.filter(nid='NID-REGULAR').delete()
+        DataVersion.objects.create(name=preapproved.VERSION, version=1)
+        self.assertTrue(preapproved.is_pre_approved('NID-REGULAR'))
+        with override_settings(DATA_VERSION_TTL=0):
+            self.assertFalse(preapproved.is_pre_approved('NID-REGULAR'))
+
+    def test_passes_for_pre_approved_visitors_are_approved_on_creation(self):
+        self.client.force_authenticate(user=self.user)
+        data = {
+            'person_name': 'Regular Visitor', 'person_phone': '555', 'purpose_id': self.purpose.id,
+            'gate_id': self.gate.id, 'entry_time': '2025-01-01T12:00:00Z', 'exit_time': '2025-01-01T13:00:00Z',
+        }
+        response = self.client.post(reverse('gatepass-list'), {**data, 'person_nid': 'NID-REGULAR'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(GatePass.objects.get(pk=response.data['id']).status, GatePass.APPROVED)
+        response = self.client.post(reverse('gatepass-list'), {**data, 'person_nid': 'NID-STRANGER'})
+        self.assertEqual(GatePass.objects.get(pk=response.data['id']).status, GatePass.PENDING)
+
+
+class GatePassExpiryTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='expiry', password='password123')
+        self.purpose = Purpose.objects.create(name='Expiry Purpose')
+        self.now = timezone.now()
+
+    def create_pass(self, ends_in, **kwargs):
+        return GatePass.objects.create(
+            person_name="Expiry Test", person_phone="123", purpose=self.purpose, created_by=self.user,
+            entry_time=self.now + ends_in - timedelta(hours=2), exit_time=self.now + ends_in,
+            status=GatePass.APPROVED, **kwargs
+        )
+
+    def test_sweeper_expires_passes_past_their_window_in_chunks(self):
+        stale = [self.create_pass(timedelta(days=-i - 1)) for i in range(5)]
+        current = self.create_pass(timedelta(hours=1))
+        # An occurrence of a recurring pass ends with its own window, not the recurrence.
+        stale.append(self.create_pass(
+            timedelta(days=-3), is_recurring=True, recurrence_end_date=(self.now + timedelta(days=3)).date(),
+        ))
+
+        self.assertEqual(expire_passes(chunk_size=2), 6)
+        self.assertEqual(
+            set(GatePass.objects.filter(status=GatePass.EXPIRED).values_list('id', flat=True)),
+            {gate_pass.id for gate_pass in stale},
+        )
+        self.assertEqual(GatePassHistory.objects.filter(details__endswith='to EXPIRED.').count(), 6)
+        current.refresh_from_db()
+        self.assertEqual(current.status, GatePass.APPROVED)
+        self.assertEqual(expire_passes(), 0)
+
+    def test_scans_are_checked_against_the_validity_window(self):
+        stale = self.create_pass(timedelta(days=-1))
+        self.assertEqual(scan_refusal(stale), "Gate Pass has expired.")
+        self.assertIsNone(scan_refusal(self.create_pass(timedelta(hours=1))))
+        self.assertTrue(scan_refusal(self.create_pass(timedelta(days=2))).startswith("Gate Pass is not valid until"))
+
+        # Someone still inside when their pass expires can always scan out.
+        stale.status, stale.presence = GatePass.EXPIRED, GatePass.INSIDE
+        self.assertIsNone(scan_refusal(stale))
+
+
+class InlineExecutor:
+    """Runs submitted calls straight away, recording them."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args, **kwargs):
+        self.calls.append((fn, args))
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class VisitorSelfieTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.employee = CustomUser.objects.create_user(username='host', password='password123', is_staff=True)
+
+    def phone_photo(self):
+        """A landscape JPEG with EXIF saying it must be rotated a quarter turn to be upright."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        buffer = BytesIO()
+        Image.new('RGB', (2000, 1000), 'red').save(buffer, format='JPEG', exif=exif)
+        return SimpleUploadedFile('selfie.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_selfie_is_normalised_and_lists_get_the_thumbnail(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('visitorpass-list'), {
+                'visitor_name': 'Visitor', 'visitor_company': 'Acme', 'purpose': 'Meeting',
+                'whom_to_visit_id': self.employee.id, 'visitor_selfie': self.phone_photo(),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        visitor_pass = VisitorPass.objects.get()
+        with Image.open(visitor_pass.visitor_selfie.path) as original:
+            self.assertEqual((original.format, original.size), ('JPEG', (800, 1600)))
+            self.assertNotIn(0x0112, original.getexif())
+        with Image.open(visitor_pass.visitor_selfie_thumbnail.path) as thumbnail:
+            self.assertEqual((thumbnail.format, max(thumbnail.size)), ('WEBP', 320))
+
+        self.client.force_authenticate(user=self.employee)
+        listed = self.client.get(reverse('visitorpass-list')).data
+        rows = listed['results'] if isinstance(listed, dict) else listed
+        self.assertTrue(rows[0]['visitor_selfie'].endswith('.webp'))
+        detail = self.client.get(reverse('visitorpass-detail', args=[visitor_pass.id])).data
+        self.assertTrue(detail['visitor_selfie'].endswith('.jpg'))
+
+    @override_settings(SELFIE_PROCESSING='pool')
+    def test_pool_workers_read_the_upload_themselves(self):
+        pool, store_pool = InlineExecutor(), InlineExecutor()
+        with mock.patch.object(selfies, 'get_pool', return_value=pool), \
+                mock.patch.object(selfies, 'get_store_pool', return_value=store_pool), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('visitorpass-list'), {
+                'visitor_name': 'Visitor', 'visitor_company': 'Acme', 'purpose': 'Meeting',
+                'whom_to_visit_id': self.employee.id, 'visitor_selfie': self.phone_photo(),
+            }, format='multipart')
+
+        # The worker gets the storage name, not the image, and results are stored off its result thread.
+        [(fn, (raw_name,))] = pool.calls
+        self.assertEqual((fn, type(raw_name)), (selfies.process_stored, str))
+        self.assertEqual(store_pool.calls[0][0], selfies._complete)
+        with Image.open(VisitorPass.objects.get().visitor_selfie.path) as original:
+            self.assertEqual(original.size, (800, 1600))
@@ -1,20 +1,31 @@
 # backend/apps/gatepass/views.py
 
+import uuid
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from .models import VisitorPass, GatePass, PreApprovedVisitor, GatePassTemplate
+from . import preapproved, selfies
+from .search import SearchMixin
+from apps.uploads import chunks
 from .serializers import VisitorPassSerializer, GatePassSerializer, PreApprovedVisitorSerializer, GatePassTemplateSerializer
 from django.core.mail import send_mail
 from django.conf import settings
 from rest_framework.views import APIView
 from datetime import date, timedelta, datetime
 from dateutil.relativedelta import relativedelta
+from apps.monitoring.metrics import track_notification
+from apps.monitoring.query_budget import QueryBudgetMixin
+from apps.core_data.models import Gate, Purpose
+from apps.sync.conditional import ConditionalGetMixin
+from django.db.models import Count, Q
 
 
-class DashboardSummaryView(APIView):
+class DashboardSummaryView(QueryBudgetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = 1
 
     def get(self, request):
         user = self.request.user
@@ -22,20 +33,20 @@ class DashboardSummaryView(APIView):
         if not (user.is_staff or user.is_superuser):
             base_queryset = base_queryset.filter(created_by=user)
 
-        pending_count = base_queryset.filter(status=GatePass.PENDING).count()
-        approved_count = base_queryset.filter(status=GatePass.APPROVED).count()
-        rejected_count = base_queryset.filter(status=GatePass.REJECTED).count()
+        counts = base_queryset.aggregate(
+            pending_count=Count('id', filter=Q(status=GatePass.PENDING)),
+            approved_count=Count('id', filter=Q(status=GatePass.APPROVED)),
+            rejected_count=Count('id', filter=Q(status=GatePass.REJECTED)),
+        )
 
-        return Response({
-            'pending_count': pending_count,
-            'approved_count': approved_count,
-            'rejected_count': rejected_count,
-        })
+        return Response(counts)
 
 
-class VisitorPassViewSet(viewsets.ModelViewSet):
+class VisitorPassViewSet(QueryBudgetMixin, SearchMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = VisitorPassSerializer
     queryset = VisitorPass.objects.all().order_by('-created_at')
+    query_budget = {'list': 4, 'retrieve': 3}
+    last_modified_field = 'updated_at'
 
     def get_permissions(self):
         if self.action == 'create':
@@ -49,13 +60,19 @@ class VisitorPassViewSet(viewsets.ModelViewSet):
         if not user.is_authenticated:
             return VisitorPass.objects.none()
 
+        queryset = VisitorPass.objects.select_related('whom_to_visit').order_by('-created_at')
         if user.groups.filter(name='Security').exists():
-            return VisitorPass.objects.filter(status=VisitorPass.APPROVED)
+            return queryset.filter(status=VisitorPass.APPROVED)
 
         if user.is_staff or user.is_superuser:
-            return VisitorPass.objects.all()
+            return queryset
+
+        return queryset.filter(whom_to_visit=user)
 
-        return VisitorPass.objects.filter(whom_to_visit=user)
+    def perform_create(self, serializer):
+        visitor_pass = serializer.save()
+        # Resized, EXIF-stripped and thumbnailed off the request (apps/gatepass/selfies.py).
+        selfies.schedule(visitor_pass)
 
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def approve(self, request, pk=None):
@@ -81,9 +98,15 @@ class VisitorPassViewSet(viewsets.ModelViewSet):
 
 
 # GatePass ViewSet
-class GatePassViewSet(viewsets.ModelViewSet):
+class GatePassViewSet(QueryBudgetMixin, SearchMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = GatePass.objects.all()
     serializer_class = GatePassSerializer
+    # Once the gate and purpose tables are loaded (apps/core_data/reference.py).
+    query_budget = {'list': 4, 'retrieve': 3}
+    # Passes nest their vehicle, driver, gate and purpose (apps/sync/conditional.py).
+    conditional_fields = ('change_seq', 'vehicle__change_seq', 'driver__change_seq')
+    conditional_references = (Gate, Purpose)
+    last_modified_field = 'updated_at'
 
     def get_permissions(self):
         if self.action in ['create', 'list', 'retrieve']:
@@ -113,6 +136,7 @@ class GatePassViewSet(viewsets.ModelViewSet):
                 )
 
             gate_passes_data = []
+            pre_approved = preapproved.is_pre_approved(request.data.get('person_nid'))
             current_date = start_date
             while current_date <= end_date:
                 entry_time = datetime.combine(current_date, serializer.validated_data.get('entry_time').time())
@@ -139,8 +163,7 @@ class GatePassViewSet(viewsets.ModelViewSet):
                     **validated_data
                 )
 
-                person_nid = request.data.get('person_nid')
-                if person_nid and PreApprovedVisitor.objects.filter(nid=person_nid).exists():
+                if pre_approved:
                     gate_pass.status = GatePass.APPROVED
                     gate_pass.approved_by = request.user
 
@@ -163,8 +186,7 @@ class GatePassViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
-        person_nid = self.request.data.get('person_nid')
-        if person_nid and PreApprovedVisitor.objects.filter(nid=person_nid).exists():
+        if preapproved.is_pre_approved(self.request.data.get('person_nid')):
             serializer.save(
                 created_by=self.request.user,
                 status=GatePass.APPROVED,
@@ -180,9 +202,12 @@ class GatePassViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        queryset = GatePass.objects.select_related(
+            'vehicle', 'driver', 'created_by', 'approved_by'
+        ).order_by('-created_at')
         if user.is_staff or user.is_superuser or user.groups.filter(name='Client Care').exists():
-            return GatePass.objects.all()
-        return GatePass.objects.filter(created_by=user)
+            return queryset
+        return queryset.filter(created_by=user)
 
     @action(detail=True, methods=['post'])
     def approve(self, request, pk=None):
@@ -214,13 +239,14 @@ class GatePassViewSet(viewsets.ModelViewSet):
                     f"\nApproved By: {request.user.get_full_name() or request.user.username}"
                     f"\n\nThank you,\nGate Pass System"
                 )
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [recipient_email],
-                    fail_silently=False, # Set to True in production if you don't want crashes on email failure
-                )
+                with track_notification('email', 'gatepass_approval'):
+                    send_mail(
+                        subject,
+                        message,
+                        settings.DEFAULT_FROM_EMAIL,
+                        [recipient_email],
+                        fail_silently=False, # Set to True in production if you don't want crashes on email failure
+                    )
                 print(f"DEBUG: Approval email sent to {recipient_email}") # For console backend confirmation
             else:
                 print(f"DEBUG: No email address for user {gate_pass.created_by.username} to send approval notification.")
@@ -263,7 +289,7 @@ class GatePassTemplateViewSet(viewsets.ModelViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PreApprovedVisitorViewSet(viewsets.ModelViewSet):
+class PreApprovedVisitorViewSet(SearchMixin, viewsets.ModelViewSet):
     queryset = PreApprovedVisitor.objects.all()
     serializer_class = PreApprovedVisitorSerializer
 
@@ -285,15 +311,26 @@ class PreApprovedVisitorViewSet(viewsets.ModelViewSet):
 
         result = request.data.get('result')
         photo = request.data.get('photo')
+        # Or a finished resumable upload (apps/uploads/), for weak links.
+        photo_upload_id = request.data.get('photo_upload_id')
 
         if result not in ['pass', 'fail']:
             return Response({"detail": "Invalid result. Must be 'pass' or 'fail'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not photo:
+        if not photo and not photo_upload_id:
             return Response({"detail": "Photo is required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if photo_upload_id:
+            try:
+                upload_id = uuid.UUID(str(photo_upload_id))
+            except ValueError:
+                return Response({"detail": "Invalid photo_upload_id."}, status=status.HTTP_400_BAD_REQUEST)
+            upload = chunks.claim(upload_id, request.user)
+            if upload is None:
+                return Response({"detail": "No finished upload with this id."}, status=status.HTTP_400_BAD_REQUEST)
+            photo = upload.file.name
+
         # Save the photo and update the gate pass
-        # This is a simplified example. In a real application, you would want to handle file uploads more robustly.
         gate_pass.alcohol_test_photo = photo
         if result == 'pass':
             gate_pass.status = GatePass.APPROVED
@@ -308,7 +345,7 @@ class PreApprovedVisitorViewSet(viewsets.ModelViewSet):
             gate_pass.save()
             # Send rejection notification and alert for driver change
 
-        serializer = self.get_serializer(gate_pass)
+        serializer = GatePassSerializer(gate_pass, context=self.get_serializer_context())
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'])
@@ -338,13 +375,14 @@ class PreApprovedVisitorViewSet(viewsets.ModelViewSet):
                     f"\nRejected By: {request.user.get_full_name() or request.user.username}"
                     f"\n\nThank you,\nGate Pass System"
                 )
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [recipient_email],
-                    fail_silently=False, # Set to True in production if you don't want crashes on email failure
-                )
+                with track_notification('email', 'gatepass_rejection'):
+                    send_mail(
+                        subject,
+                        message,
+                        settings.DEFAULT_FROM_EMAIL,
+                        [recipient_email],
+                        fail_silently=False, # Set to True in production if you don't want crashes on email failure
+                    )
                 print(f"DEBUG: Rejection email sent to {recipient_email}") # For console backend confirmation
             else:
                 print(f"DEBUG: No email address for user {gate_pass.created_by.username} to send rejection notification.")
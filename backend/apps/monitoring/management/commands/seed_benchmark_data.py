@@ -0,0 +1,210 @@
+import json
+import os
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.core_data.models import Gate, Purpose, VehicleType
+from apps.drivers.models import Driver
+from apps.gate_operations.models import GateLog
+from apps.gatepass import search
+from apps.gatepass.models import GatePass
+from apps.sync.models import backfill_change_seqs
+from apps.users.models import CustomUser
+from apps.vehicles import plates
+from apps.vehicles.models import Vehicle
+
+BENCH_PREFIX = 'bench_'
+BENCH_PASSWORD = 'bench-password'
+STATUS_WEIGHTS = [
+    (GatePass.APPROVED, 60),
+    (GatePass.PENDING, 20),
+    (GatePass.REJECTED, 15),
+    (GatePass.CANCELLED, 5),
+]
+# Share of approved passes whose window covers the benchmark run (from up to
+# 12 hours ago to 7-30 days ahead), so scans of them are let through and the
+# expiry sweeper leaves them approved. Only these are handed to the scan load.
+CURRENT_SHARE = 0.2
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Lets bulk_create keep the timestamps we generate instead of auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a large, deterministic data set for the benchmark suite in benchmarks/. '
+        'Rows are created with bulk_create, so signals (history, notifications) do not fire.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--passes', type=int, default=100_000)
+        parser.add_argument('--logs', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated benchmark data first.')
+        parser.add_argument(
+            '--manifest', default=str(settings.BASE_DIR / 'benchmarks' / 'results' / 'dataset.json'),
+            help='Where to write the credentials and sample ids used by benchmarks/run.py.',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+
+        if options['clear']:
+            self.clear()
+
+        password = make_password(BENCH_PASSWORD)
+        admin, _ = CustomUser.objects.get_or_create(
+            username=f'{BENCH_PREFIX}admin', defaults={'password': password, 'is_staff': True, 'is_superuser': True}
+        )
+        guard, _ = CustomUser.objects.get_or_create(username=f'{BENCH_PREFIX}guard', defaults={'password': password})
+        security, _ = Group.objects.get_or_create(name='Security')
+        guard.groups.add(security)
+
+        self.stdout.write(f"Creating {options['users']} users...")
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    username=f'{BENCH_PREFIX}user_{i}', password=password,
+                    first_name=f'First{i}', last_name=f'Last{i}', email=f'{BENCH_PREFIX}user_{i}@example.com',
+                )
+                for i in range(options['users'])
+            ],
+            batch_size=batch_size,
+        )
+
+        gates = [Gate.objects.get_or_create(name=name)[0] for name in ('Main Gate', 'Service Gate', 'North Gate')]
+        purposes = [Purpose.objects.get_or_create(name=name)[0] for name in ('Meeting', 'Delivery', 'Maintenance')]
+        vehicle_types = [VehicleType.objects.get_or_create(name=name)[0] for name in ('Truck', 'Car', 'Van')]
+
+        fleet_size = max(1, options['passes'] // 50)
+        self.stdout.write(f'Creating {fleet_size} vehicles and drivers...')
+        today = timezone.now().date()
+        vehicles = Vehicle.objects.bulk_create(
+            [
+                Vehicle(
+                    vehicle_number=f'BN {i:06d}', type=rng.choice(vehicle_types), make='Make', model='Model',
+                    capacity='1 ton', status='Active', registration_date=today,
+                    # bulk_create skips Vehicle.save(), which derives these.
+                    plate_key=plates.canonical(f'BN {i:06d}'), plate_ocr_key=plates.ocr_key(f'BN {i:06d}'),
+                    plate_ocr_key_reversed=plates.ocr_key(f'BN {i:06d}')[::-1],
+                )
+                for i in range(fleet_size)
+            ],
+            batch_size=batch_size,
+        )
+        drivers = Driver.objects.bulk_create(
+            [
+                Driver(
+                    name=f'Driver {i}', license_number=f'{BENCH_PREFIX}LIC{i:06d}',
+                    contact_details=f'555{i:07d}', address='Benchmark Street', status='Active',
+                )
+                for i in range(fleet_size)
+            ],
+            batch_size=batch_size,
+        )
+
+        self.stdout.write(f"Creating {options['passes']} gate passes...")
+        statuses, weights = zip(*STATUS_WEIGHTS)
+        now = timezone.now()
+        pass_ids = {status: [] for status in statuses}
+        current_ids = []
+        with explicit_timestamps(GatePass._meta.get_field('created_at')):
+            for start in range(0, options['passes'], batch_size):
+                batch = []
+                for i in range(start, min(start + batch_size, options['passes'])):
+                    status = rng.choices(statuses, weights)[0]
+                    if status == GatePass.APPROVED and rng.random() < CURRENT_SHARE:
+                        entry_time = now - timedelta(hours=rng.uniform(0, 12))
+                        exit_time = now + timedelta(days=rng.randint(7, 30))
+                    else:
+                        entry_time = now - timedelta(days=rng.uniform(-7, 365))
+                        exit_time = entry_time + timedelta(hours=rng.randint(1, 10))
+                    batch.append(GatePass(
+                        person_name=f'Visitor {i}', person_nid=f'NID{i:08d}', person_phone=f'017{i:08d}',
+                        entry_time=entry_time, exit_time=exit_time,
+                        purpose=rng.choice(purposes), gate=rng.choice(gates),
+                        vehicle=rng.choice(vehicles), driver=rng.choice(drivers),
+                        status=status, created_by=rng.choice(users),
+                        approved_by=admin if status != GatePass.PENDING else None,
+                        created_at=entry_time - timedelta(days=1),
+                    ))
+                for gate_pass in batch:
+                    # bulk_create skips the pre_save signal that fills search_text.
+                    gate_pass.search_text = search.gatepass_text(gate_pass, gate_pass.vehicle.vehicle_number)
+                for gate_pass in GatePass.objects.bulk_create(batch):
+                    pass_ids[gate_pass.status].append(gate_pass.id)
+                    if gate_pass.status == GatePass.APPROVED and gate_pass.entry_time <= now < gate_pass.exit_time:
+                        current_ids.append(gate_pass.id)
+
+        self.stdout.write('Numbering new rows for the sync API...')
+        for model in (Vehicle, Driver, GatePass):
+            backfill_change_seqs(model, batch_size=batch_size)
+
+        self.stdout.write(f"Creating {options['logs']} gate logs...")
+        approved_ids = pass_ids[GatePass.APPROVED] or [None]
+        for start in range(0, options['logs'], batch_size):
+            batch = []
+            for i in range(start, min(start + batch_size, options['logs'])):
+                timestamp = now - timedelta(seconds=rng.uniform(0, 365 * 86400))
+                if rng.random() < 0.05:
+                    batch.append(GateLog(
+                        security_personnel=guard, gate=rng.choice(gates), action='scan_attempt',
+                        status='failure', reason='Invalid QR code data format.',
+                        scanned_data=f'garbage-{rng.randint(0, 50)}', timestamp=timestamp,
+                    ))
+                else:
+                    batch.append(GateLog(
+                        security_personnel=guard, gate=rng.choice(gates), gate_pass_id=rng.choice(approved_ids),
+                        action=rng.choice(('entry', 'exit')), status='success', timestamp=timestamp,
+                    ))
+            GateLog.objects.bulk_create(batch)
+
+        manifest = {
+            'admin': {'username': admin.username, 'password': BENCH_PASSWORD},
+            'guard': {'username': guard.username, 'password': BENCH_PASSWORD},
+            # Approved and valid now: what the scan storm scans.
+            'approved_pass_ids': rng.sample(current_ids, min(5000, len(current_ids))),
+            'pending_pass_ids': rng.sample(pass_ids[GatePass.PENDING], min(5000, len(pass_ids[GatePass.PENDING]))),
+            'plates': [vehicle.vehicle_number for vehicle in rng.sample(vehicles, min(1000, len(vehicles)))],
+            # What guards type into ?q=: part of a name, a phone tail, part of a plate.
+            'search_terms': [
+                rng.choice([f'visitor {i}', f'{i:08d}'[-4:], f'bn{i % fleet_size:06d}'])
+                for i in rng.sample(range(options['passes']), min(1000, options['passes']))
+            ],
+            'counts': {'users': options['users'], 'passes': options['passes'], 'logs': options['logs']},
+            'seed': options['seed'],
+        }
+        manifest_path = options['manifest']
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, 'w') as fh:
+            json.dump(manifest, fh)
+
+        self.stdout.write(self.style.SUCCESS(f'Benchmark data created. Manifest written to {manifest_path}'))
+
+    def clear(self):
+        self.stdout.write(self.style.WARNING('Deleting previous benchmark data...'))
+        bench_users = CustomUser.objects.filter(username__startswith=BENCH_PREFIX)
+        GateLog.objects.filter(security_personnel__in=bench_users).delete()
+        GatePass.objects.filter(created_by__in=bench_users).delete()
+        Vehicle.objects.filter(vehicle_number__startswith='BN ').delete()
+        Driver.objects.filter(license_number__startswith=f'{BENCH_PREFIX}LIC').delete()
+        bench_users.delete()
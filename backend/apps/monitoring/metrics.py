@@ -0,0 +1,166 @@
+# backend/apps/monitoring/metrics.py
+#
+# Minimal in-process metrics (counters and histograms) rendered in the
+# Prometheus text exposition format at /metrics. Values live in the memory of
+# each worker process, so scrape every worker (or run a single one) to get the
+# full picture; nothing here talks to an external service.
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, key)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(_escape(labels.get(name, '')) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self, items):
+        for key, value in items:
+            yield f'{self.name}{_format_labels(self.labelnames, key)} {value}'
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def _render_samples(self, items):
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, key, ['le="%s"' % le])
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, key)} {count}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+REGISTRY = Registry()
+
+# Per-request metrics, recorded by MetricsMiddleware.
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    'gatepass_http_request_duration_seconds', 'Time to handle a request.', ['view', 'method', 'status']))
+REQUEST_QUERIES = REGISTRY.register(Histogram(
+    'gatepass_http_request_queries', 'Database queries issued per request.', ['view'], QUERY_BUCKETS))
+REQUEST_DB_SECONDS = REGISTRY.register(Histogram(
+    'gatepass_http_request_db_seconds', 'Time spent in database queries per request.', ['view']))
+REQUEST_APP_SECONDS = REGISTRY.register(Histogram(
+    'gatepass_http_request_app_seconds',
+    'Time spent outside the database per request (serialization, rendering, Python code).', ['view']))
+RESPONSE_BYTES = REGISTRY.register(Histogram(
+    'gatepass_http_response_bytes', 'Size of response bodies.', ['view'], BYTES_BUCKETS))
+
+# Instrumentation hooks in application code.
+SCAN_SECONDS = REGISTRY.register(Histogram(
+    'gatepass_scan_duration_seconds', 'Time to validate and log a QR code scan.', ['outcome']))
+QR_RENDER_SECONDS = REGISTRY.register(Histogram(
+    'gatepass_qr_render_seconds', 'Time to render and store a gate pass QR code image.'))
+REPORT_EXPORT_SECONDS = REGISTRY.register(Histogram(
+    'gatepass_report_export_seconds', 'Time to build a report export.', ['report', 'format']))
+REPORT_EXPORT_BYTES = REGISTRY.register(Histogram(
+    'gatepass_report_export_bytes', 'Size of report exports.', ['report', 'format'], BYTES_BUCKETS))
+NOTIFICATION_SECONDS = REGISTRY.register(Histogram(
+    'gatepass_notification_send_seconds', 'Time to send a notification.', ['channel', 'kind']))
+NOTIFICATION_FAILURES = REGISTRY.register(Counter(
+    'gatepass_notification_failures_total', 'Notifications that failed to send.', ['channel', 'kind']))
+
+
+@contextmanager
+def track_notification(channel, kind):
+    """Times a notification send and counts it as failed if the block raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        NOTIFICATION_FAILURES.inc(channel=channel, kind=kind)
+        raise
+    finally:
+        NOTIFICATION_SECONDS.observe(time.perf_counter() - started, channel=channel, kind=kind)
@@ -0,0 +1,73 @@
+# backend/apps/monitoring/middleware.py
+
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from . import metrics, tracing
+
+
+class TracingMiddleware:
+    """
+    Opens a root span around every request so views can attach child spans
+    with `tracing.span(...)`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with tracing.span(f'{request.method} {request.path}') as span:
+            response = self.get_response(request)
+            if span is not None:
+                span.tags['status'] = response.status_code
+            return response
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper that counts queries and the time spent in them.
+    Installed with `connection.execute_wrapper(recorder)`.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Records latency, query count, database time and response size for every
+    request, labelled by the resolved view name.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        metrics.REQUEST_LATENCY.observe(duration, view=view, method=request.method, status=response.status_code)
+        metrics.REQUEST_QUERIES.observe(recorder.count, view=view)
+        metrics.REQUEST_DB_SECONDS.observe(recorder.seconds, view=view)
+        metrics.REQUEST_APP_SECONDS.observe(max(duration - recorder.seconds, 0.0), view=view)
+        if not response.streaming:
+            metrics.RESPONSE_BYTES.observe(len(response.content), view=view)
+        if settings.METRICS_QUERY_COUNT_HEADER:
+            response['X-Query-Count'] = str(recorder.count)
+        return response
@@ -0,0 +1,122 @@
+# backend/apps/monitoring/query_budget.py
+#
+# Declarative per-view query budgets. A view lists the maximum number of
+# queries its handler may issue, either as a single number or per action /
+# HTTP method:
+#
+#     class GatePassViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+#         query_budget = {'list': 5, 'retrieve': 3}
+#
+# Queries are counted from the end of authentication and permission checks to
+# the end of the handler, so the budget covers the view's own work only.
+# QUERY_BUDGET_MODE decides what happens when a budget is exceeded: 'off'
+# (no counting), 'warn' (log the offending duplicate SQL) or 'raise' (used by
+# the test suite).
+
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('gatepass_project.query_budget')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# Savepoints come and go with nesting (every test runs inside a transaction),
+# so they are not counted against a view's budget.
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+_state = threading.local()
+
+
+@contextmanager
+def unbudgeted():
+    """
+    Leaves the queries issued inside out of the current view's count: periodic
+    bookkeeping that whichever request comes along pays for, such as rereading
+    data versions (apps/core_data/versions.py), is not that view's work.
+    """
+    depth = getattr(_state, 'unbudgeted', 0)
+    _state.unbudgeted = depth + 1
+    try:
+        yield
+    finally:
+        _state.unbudgeted = depth
+
+
+class QueryLog:
+    """Database execute wrapper that keeps the SQL of every query issued."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not getattr(_state, 'unbudgeted', 0) and not sql.lstrip().upper().startswith(TRANSACTION_CONTROL):
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def duplicates(self):
+        return [(sql, count) for sql, count in Counter(self.queries).most_common() if count > 1]
+
+
+def budget_report(view_name, budget, log):
+    lines = [f'{view_name} issued {len(log.queries)} queries (budget {budget}).']
+    duplicates = log.duplicates()
+    if duplicates:
+        lines.append('Repeated queries:')
+        lines.extend(f'  {count}x {sql}' for sql, count in duplicates)
+    return '\n'.join(lines)
+
+
+class QueryBudgetMixin:
+    query_budget = None
+
+    def get_query_budget(self):
+        budget = self.query_budget
+        if isinstance(budget, dict):
+            return budget.get(getattr(self, 'action', None) or self.request.method.lower())
+        return budget
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            # finalize_response() is skipped when the handler raises an
+            # exception DRF doesn't handle; never leave the log on the connection.
+            log = getattr(self, '_query_log', None)
+            if log is not None and log in connection.execute_wrappers:
+                connection.execute_wrappers.remove(log)
+            self._query_log = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._query_log = None
+        if settings.QUERY_BUDGET_MODE != 'off' and self.get_query_budget() is not None:
+            self._query_log = QueryLog()
+            connection.execute_wrappers.append(self._query_log)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        log = getattr(self, '_query_log', None)
+        if log is None:
+            return response
+
+        connection.execute_wrappers.remove(log)
+        self._query_log = None
+        budget = self.get_query_budget()
+        if len(log.queries) > budget:
+            view_name = type(self).__name__
+            if getattr(self, 'action', None):
+                view_name = f'{view_name}.{self.action}'
+            report = budget_report(view_name, budget, log)
+            if settings.QUERY_BUDGET_MODE == 'raise':
+                raise QueryBudgetExceeded(report)
+            logger.warning(report)
+        return response
@@ -0,0 +1,76 @@
+# backend/apps/monitoring/sampling.py
+#
+# Sentry sampling hooks. This module is imported from settings, so it must not
+# import Django models or anything that needs configured settings.
+
+import re
+from datetime import datetime
+
+SCAN_PATH_RE = re.compile(r'/api/gate-operations/scan')
+DETAIL_SEGMENT_RE = re.compile(r'/\d+/?$')
+
+
+def parse_sample_rules(value):
+    """
+    Parses "METHOD:path-regex=rate" rules separated by commas, e.g.
+    "GET:/api/reports/=0.5,*:/api/token/=0". METHOD may be "*" for any method.
+    """
+    rules = []
+    for item in filter(None, (part.strip() for part in (value or '').split(','))):
+        target, _, rate = item.rpartition('=')
+        method, _, pattern = target.partition(':')
+        rules.append((method.upper(), re.compile(pattern), float(rate)))
+    return rules
+
+
+def build_traces_sampler(default_rate, scan_rate, list_rate, rules=()):
+    """
+    Returns a Sentry `traces_sampler` that picks a rate per endpoint:
+    explicit rules first, then scans, then list (collection GET) calls,
+    then the default rate. Upstream sampling decisions are honoured.
+    """
+    def traces_sampler(sampling_context):
+        parent_sampled = sampling_context.get('parent_sampled')
+        if parent_sampled is not None:
+            return float(parent_sampled)
+
+        environ = sampling_context.get('wsgi_environ') or {}
+        scope = sampling_context.get('asgi_scope') or {}
+        path = environ.get('PATH_INFO') or scope.get('path') or ''
+        method = (environ.get('REQUEST_METHOD') or scope.get('method') or '').upper()
+
+        for rule_method, pattern, rate in rules:
+            if rule_method in ('*', method) and pattern.search(path):
+                return rate
+        if SCAN_PATH_RE.search(path):
+            return scan_rate
+        if method == 'GET' and path.startswith('/api/') and not DETAIL_SEGMENT_RE.search(path):
+            return list_rate
+        return default_rate
+
+    return traces_sampler
+
+
+def _as_timestamp(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    return float(value or 0)
+
+
+def build_transaction_filter(slow_scan_ms):
+    """
+    Returns a Sentry `before_send_transaction` hook that keeps scan
+    transactions only when they were slow or failed, so scans can be traced
+    at a 100% rate without shipping every fast, successful one.
+    """
+    def before_send_transaction(event, hint):
+        if 'scan' not in (event.get('transaction') or ''):
+            return event
+        if event.get('contexts', {}).get('trace', {}).get('status') not in (None, 'ok'):
+            return event
+        duration_ms = (_as_timestamp(event.get('timestamp')) - _as_timestamp(event.get('start_timestamp'))) * 1000
+        return event if duration_ms >= slow_scan_ms else None
+
+    return before_send_transaction
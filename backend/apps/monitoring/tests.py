@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework.views import APIView
+
+from apps.gatepass import expiry
+from apps.gatepass.models import GatePass
+from apps.users.models import CustomUser
+from . import metrics
+from .query_budget import QueryBudgetExceeded, QueryBudgetMixin
+from .sampling import build_traces_sampler, build_transaction_filter, parse_sample_rules
+from .tracing import SpanRecorder, get_recorder
+
+
+class TracesSamplerTests(TestCase):
+    def setUp(self):
+        self.sampler = build_traces_sampler(
+            default_rate=0.05, scan_rate=1.0, list_rate=0.01,
+            rules=parse_sample_rules('GET:/api/reports/=0.5'),
+        )
+
+    def context(self, method, path):
+        return {'wsgi_environ': {'REQUEST_METHOD': method, 'PATH_INFO': path}}
+
+    def test_scans_are_always_traced(self):
+        self.assertEqual(self.sampler(self.context('POST', '/api/gate-operations/scan_qr_code/')), 1.0)
+
+    def test_list_and_detail_calls_use_different_rates(self):
+        self.assertEqual(self.sampler(self.context('GET', '/api/gatepass/gatepasses/')), 0.01)
+        self.assertEqual(self.sampler(self.context('GET', '/api/gatepass/gatepasses/12/')), 0.05)
+
+    def test_rules_take_precedence(self):
+        self.assertEqual(self.sampler(self.context('GET', '/api/reports/daily-summary/')), 0.5)
+
+    def test_parent_decision_is_honoured(self):
+        self.assertEqual(self.sampler({'parent_sampled': False}), 0.0)
+
+    def test_only_slow_scan_transactions_are_sent(self):
+        before_send = build_transaction_filter(slow_scan_ms=300)
+        start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        fast = {'transaction': '/api/gate-operations/scan_qr_code/', 'start_timestamp': start,
+                'timestamp': start + timedelta(milliseconds=20)}
+        slow = dict(fast, timestamp=start + timedelta(milliseconds=450))
+        other = dict(fast, transaction='/api/gatepass/gatepasses/')
+        self.assertIsNone(before_send(fast, {}))
+        self.assertIs(before_send(slow, {}), slow)
+        self.assertIs(before_send(other, {}), other)
+
+
+class SpanRecorderTests(TestCase):
+    def test_unsampled_fast_spans_are_dropped(self):
+        recorder = SpanRecorder(sample_rate=0.0, slow_ms=10_000)
+        with recorder.span('fast'):
+            pass
+        self.assertEqual(recorder.recent(), [])
+
+    def test_slow_spans_are_always_kept(self):
+        recorder = SpanRecorder(sample_rate=0.0, slow_ms=0)
+        with recorder.span('root'):
+            with recorder.span('child', step=1):
+                pass
+        spans = recorder.recent()
+        self.assertEqual([s['name'] for s in spans], ['root', 'child'])
+        self.assertEqual(spans[1]['parent'], 'root')
+        self.assertEqual(spans[0]['trace_id'], spans[1]['trace_id'])
+
+    def test_sampled_trace_keeps_children(self):
+        recorder = SpanRecorder(sample_rate=1.0, slow_ms=10_000)
+        with recorder.span('root'):
+            with recorder.span('child'):
+                pass
+        self.assertEqual(len(recorder.recent()), 2)
+
+
+class RecentSpansViewTests(APITestCase):
+    def test_admin_can_read_recent_spans(self):
+        admin = CustomUser.objects.create_user(username='admin', password='password', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        recorder = get_recorder()
+        recorder.clear()
+        with mock.patch.object(recorder, 'slow_ms', 0):
+            with recorder.span('manual-span'):
+                pass
+        response = self.client.get(reverse('monitoring-traces'), {'limit': 10})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('manual-span', [s['name'] for s in response.data])
+
+    def test_non_admin_is_forbidden(self):
+        user = CustomUser.objects.create_user(username='guard', password='password')
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('monitoring-traces'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        metrics.REGISTRY.clear()
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram('test_seconds', 'Test.', ['view'], buckets=(0.1, 1.0))
+        histogram.observe(0.05, view='a')
+        histogram.observe(0.5, view='a')
+        histogram.observe(5, view='a')
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{view="a",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="a",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{view="a"} 3', lines)
+
+    def test_requests_are_recorded_per_view(self):
+        user = CustomUser.objects.create_user(username='user', password='password')
+        self.client.force_authenticate(user=user)
+        self.client.get(reverse('gatepass-list'))
+        self.assertEqual(metrics.REQUEST_QUERIES.count(view='gatepass-list'), 1)
+        self.assertEqual(metrics.REQUEST_LATENCY.count(view='gatepass-list', method='GET', status=200), 1)
+        self.assertEqual(metrics.RESPONSE_BYTES.count(view='gatepass-list'), 1)
+
+    def test_scan_outcome_is_recorded(self):
+        user = CustomUser.objects.create_user(username='guard', password='password')
+        self.client.force_authenticate(user=user)
+        self.client.post(reverse('scan_qr_code'), {'qr_code_data': 'garbage'}, format='json')
+        self.assertEqual(metrics.SCAN_SECONDS.count(outcome='invalid'), 1)
+
+    def test_export_format_label_is_bounded(self):
+        from apps.reports.views import instrumented_export
+        export = instrumented_export('test_report')(lambda view, request: Response({}))
+        for export_format in ('csv', 'xlsx', 'anything-else'):
+            request = mock.Mock(query_params={'format': export_format})
+            export(None, request)
+        self.assertEqual(metrics.REPORT_EXPORT_SECONDS.count(report='test_report', format='csv'), 1)
+        self.assertEqual(metrics.REPORT_EXPORT_SECONDS.count(report='test_report', format='other'), 2)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_endpoint_serves_prometheus_text(self):
+        self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn(b'# TYPE gatepass_http_request_duration_seconds histogram', response.content)
+        self.assertIn(b'gatepass_http_request_queries_count{view="metrics"} 1', response.content)
+
+    @override_settings(METRICS_TOKEN='scrape-token')
+    def test_metrics_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong-token')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_endpoint_is_closed_without_a_token(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class NPlusOneView(QueryBudgetMixin, APIView):
+    permission_classes = []
+    query_budget = {'get': 2}
+
+    def get(self, request):
+        for user in CustomUser.objects.all():
+            list(user.groups.all())
+        return Response({})
+
+
+class CrashingView(QueryBudgetMixin, APIView):
+    permission_classes = []
+    query_budget = 1
+
+    def get(self, request):
+        raise RuntimeError('boom')
+
+
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        for name in ('a', 'b', 'c'):
+            CustomUser.objects.create_user(username=name, password='password')
+        self.request = APIRequestFactory().get('/n-plus-one/')
+
+    def test_exceeding_the_budget_raises_with_duplicate_sql(self):
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            NPlusOneView.as_view()(self.request)
+        report = str(ctx.exception)
+        self.assertIn('NPlusOneView issued 4 queries (budget 2)', report)
+        self.assertIn('3x SELECT', report)
+
+    @override_settings(QUERY_BUDGET_MODE='warn')
+    def test_warn_mode_logs_instead_of_raising(self):
+        with self.assertLogs('gatepass_project.query_budget', level='WARNING') as logs:
+            response = NPlusOneView.as_view()(self.request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Repeated queries', logs.output[0])
+
+    def test_unhandled_errors_do_not_leave_the_query_log_behind(self):
+        wrappers = list(connection.execute_wrappers)
+        with self.assertRaises(RuntimeError):
+            CrashingView.as_view()(self.request)
+        self.assertEqual(connection.execute_wrappers, wrappers)
+
+    @override_settings(QUERY_BUDGET_MODE='off')
+    def test_off_mode_does_not_count(self):
+        response = NPlusOneView.as_view()(self.request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class SeedBenchmarkDataTests(TestCase):
+    def test_scan_load_gets_passes_valid_now(self):
+        manifest = os.path.join(tempfile.mkdtemp(), 'dataset.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(manifest))
+        call_command(
+            'seed_benchmark_data', '--users=5', '--passes=200', '--logs=10', f'--manifest={manifest}',
+            stdout=StringIO(),
+        )
+        expiry.expire_passes()
+        with open(manifest) as fh:
+            pass_ids = json.load(fh)['approved_pass_ids']
+
+        self.assertTrue(pass_ids)
+        refusals = [expiry.scan_refusal(gate_pass) for gate_pass in GatePass.objects.filter(id__in=pass_ids)]
+        self.assertEqual(refusals, [None] * len(pass_ids))
@@ -0,0 +1,120 @@
+# backend/apps/monitoring/tracing.py
+#
+# A lightweight, in-process span recorder. It keeps the most recent spans in a
+# bounded ring buffer so we have visibility into slow requests without sending
+# anything to an external service. Spans are also forwarded to Sentry when a
+# DSN is configured, so the same instrumentation feeds both.
+
+import contextvars
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import sentry_sdk
+from django.conf import settings
+
+logger = logging.getLogger('gatepass_project.tracing')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'parent', 'sampled', 'tags', 'start', 'duration_ms', 'error')
+
+    def __init__(self, name, parent=None, tags=None, sampled=False):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.sampled = parent.sampled if parent else sampled
+        self.tags = tags or {}
+        self.start = time.time()
+        self.duration_ms = None
+        self.error = None
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'parent': self.parent.name if self.parent else None,
+            'tags': self.tags,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+        }
+
+
+class SpanRecorder:
+    """
+    Records finished spans into a ring buffer. Each trace is sampled once, at
+    its root span; spans slower than `slow_ms` (or that raised) are always
+    kept, whatever the sampling decision, and logged as warnings.
+    """
+
+    def __init__(self, capacity=500, sample_rate=0.1, slow_ms=500):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._spans = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, **tags):
+        parent = _current_span.get()
+        span = Span(name, parent, tags, sampled=parent is None and random.random() < self.sample_rate)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            with sentry_sdk.start_span(op=name):
+                yield span
+        except Exception as exc:
+            span.error = type(exc).__name__
+            raise
+        finally:
+            span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span):
+        slow = span.duration_ms >= self.slow_ms
+        if slow:
+            logger.warning('Slow span %s took %.1f ms %s', span.name, span.duration_ms, span.tags)
+        if span.sampled or slow or span.error:
+            with self._lock:
+                self._spans.append(span.as_dict())
+
+    def recent(self, limit=None):
+        with self._lock:
+            spans = list(self._spans)
+        spans.reverse()
+        return spans[:limit] if limit else spans
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_recorder = None
+
+
+def get_recorder():
+    global _recorder
+    if _recorder is None:
+        _recorder = SpanRecorder(
+            capacity=settings.TRACING_BUFFER_SIZE,
+            sample_rate=settings.TRACING_SAMPLE_RATE,
+            slow_ms=settings.TRACING_SLOW_MS,
+        )
+    return _recorder
+
+
+@contextmanager
+def span(name, **tags):
+    """Times a block of code as a span; a no-op when tracing is disabled."""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    with get_recorder().span(name, **tags) as current:
+        yield current
@@ -0,0 +1,8 @@
+# backend/apps/monitoring/urls.py
+
+from django.urls import path
+from .views import RecentSpansView
+
+urlpatterns = [
+    path('traces/', RecentSpansView.as_view(), name='monitoring-traces'),
+]
@@ -0,0 +1,40 @@
+# backend/apps/monitoring/views.py
+
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import REGISTRY
+from .tracing import get_recorder
+
+
+class RecentSpansView(APIView):
+    """
+    Returns the spans kept by the in-process recorder, newest first.
+    Use `?limit=` to cap the number returned.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 100))
+        except ValueError:
+            limit = 100
+        return Response(get_recorder().recent(limit))
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Answers only requests carrying
+    `Authorization: Bearer <METRICS_TOKEN>`, and nobody while METRICS_TOKEN is
+    unset; client addresses prove nothing behind a reverse proxy.
+    """
+    token = settings.METRICS_TOKEN
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if not token or scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.encode(), token.encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -115,6 +115,15 @@ class ReportViewSetTests(APITestCase):
         self.assertEqual(response['Content-Type'], 'application/pdf')
         self.assertIn('Content-Disposition', response)
 
+    def test_security_incident_export_reads_aggregated_failures(self):
+        GateLog.objects.filter(status='failure').update(repeat_count=42)
+        url = reverse('report-security-incidents-export')
+        response = self.client.get(url, {'format': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        header, row = response.content.decode().splitlines()
+        self.assertTrue(header.endswith('Count,Last Seen'))
+        self.assertIn('Test incident,42,', row)
+
     def test_export_with_invalid_format(self):
         url = reverse('report-daily-summary-export')
         response = self.client.get(url, {'format': 'xml'})
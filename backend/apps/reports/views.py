@@ -1,11 +1,13 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.negotiation import DefaultContentNegotiation
 from django.utils import timezone
 from apps.gatepass.models import GatePass
 from apps.gate_operations.models import GateLog
 from apps.gate_operations.serializers import GateLogSerializer
 from django.db.models import Count
+from django.db.models.functions import Coalesce
 from .filters import GatePassFilter, GateLogFilter
 from django.http import HttpResponse
 import csv
@@ -14,8 +16,41 @@ from reportlab.lib import colors
 from datetime import timedelta
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
+from apps.monitoring import metrics
+import functools
+import time
+
+
+def instrumented_export(report):
+    """Records build time and size of a report export, labelled by report and format."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, request, *args, **kwargs):
+            # Anything but the two real formats shares one label, so clients can't mint new series.
+            export_format = request.query_params.get('format')
+            export_format = export_format if export_format in ('csv', 'pdf') else 'other'
+            started = time.perf_counter()
+            response = func(self, request, *args, **kwargs)
+            metrics.REPORT_EXPORT_SECONDS.observe(time.perf_counter() - started, report=report, format=export_format)
+            if not isinstance(response, Response):
+                metrics.REPORT_EXPORT_BYTES.observe(len(response.content), report=report, format=export_format)
+            return response
+        return wrapper
+    return decorator
+
+class ExportFormatNegotiation(DefaultContentNegotiation):
+    """
+    The export actions use `?format=csv|pdf` to pick the file type and build
+    their own HttpResponse, so the parameter must not be treated as DRF's
+    renderer override (which answers 404 for unknown formats).
+    """
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
 
 class ReportViewSet(viewsets.GenericViewSet):
+    content_negotiation_class = ExportFormatNegotiation
+
     @method_decorator(cache_page(60 * 15))
     @action(detail=False, methods=['get'], url_path='daily-summary', url_name='daily-summary')
     def daily_visitor_summary(self, request):
@@ -35,6 +70,7 @@ class ReportViewSet(viewsets.GenericViewSet):
         return Response(summary)
 
     @action(detail=False, methods=['get'])
+    @instrumented_export('daily_visitor_summary')
     def daily_visitor_summary_export(self, request):
         filterset = GatePassFilter(request.query_params, queryset=GatePass.objects.all())
         gate_passes = filterset.qs
@@ -102,6 +138,7 @@ class ReportViewSet(viewsets.GenericViewSet):
         return Response(summary)
 
     @action(detail=False, methods=['get'])
+    @instrumented_export('monthly_visitor_summary')
     def monthly_visitor_summary_export(self, request):
         filterset = GatePassFilter(request.query_params, queryset=GatePass.objects.all())
         gate_passes = filterset.qs
@@ -159,6 +196,7 @@ class ReportViewSet(viewsets.GenericViewSet):
         return Response(driver_performance)
 
     @action(detail=False, methods=['get'])
+    @instrumented_export('driver_performance_report')
     def driver_performance_report_export(self, request):
         filterset = GatePassFilter(request.query_params, queryset=GatePass.objects.all())
         gate_passes = filterset.qs
@@ -207,17 +245,22 @@ class ReportViewSet(viewsets.GenericViewSet):
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @instrumented_export('security_incident_report')
     def security_incident_report_export(self, request):
         filterset = GateLogFilter(request.query_params, queryset=GateLog.objects.filter(status='failure'))
         incidents = filterset.qs
-        data = incidents.values_list('gate_pass__person_name', 'security_personnel__username', 'timestamp', 'reason')
+        # Repeated identical failures are one row each, with how many there were and when the last was.
+        data = incidents.values_list(
+            'gate_pass__person_name', 'security_personnel__username', 'timestamp', 'reason',
+            'repeat_count', Coalesce('last_seen_at', 'timestamp'),
+        )
         export_format = request.query_params.get('format')
 
         if export_format == 'csv':
             response = HttpResponse(content_type='text/csv')
             response['Content-Disposition'] = 'attachment; filename="security_incident_report.csv"'
             writer = csv.writer(response)
-            writer.writerow(['Person Name', 'Security Personnel', 'Timestamp', 'Reason'])
+            writer.writerow(['Person Name', 'Security Personnel', 'Timestamp', 'Reason', 'Count', 'Last Seen'])
             for row in data:
                 writer.writerow(row)
             return response
@@ -226,7 +269,7 @@ class ReportViewSet(viewsets.GenericViewSet):
             response['Content-Disposition'] = 'attachment; filename="security_incident_report.pdf"'
             doc = SimpleDocTemplate(response)
             elements = []
-            table_data = [['Person Name', 'Security Personnel', 'Timestamp', 'Reason']]
+            table_data = [['Person Name', 'Security Personnel', 'Timestamp', 'Reason', 'Count', 'Last Seen']]
             table_data.extend(list(data))
             table = Table(table_data)
             table.setStyle(TableStyle([
@@ -0,0 +1,115 @@
+# backend/apps/sync/conditional.py
+#
+# Conditional GET for list and retrieve endpoints. Responses carry an ETag and,
+# for models with an updated_at column, a Last-Modified header; a client
+# sending them back in If-None-Match / If-Modified-Since gets 304 without the
+# response being serialized.
+#
+# The validators come from change numbers (models.py): a list's ETag is made
+# of the global change counter, which every save and delete of a tracked row
+# moves, read by primary key instead of aggregating the list's rows; a
+# detail's from the change numbers of the fetched row and the related rows its
+# representation nests (see `conditional_fields`). Both also cover the
+# request's path and query string, the user and the media type, since those
+# change what the same rows render as. Users nested in a representation, and
+# the groups that scope a list, are not change-tracked, so such changes show
+# up once something tracked changes.
+#
+# updated_at cannot see rows leaving a list or nested rows changing, so
+# If-Modified-Since is only honoured for details that nest no tracked rows,
+# and lists carry no Last-Modified; clients revalidate them by ETag.
+
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from apps.core_data import reference
+from .models import current_change_seq
+
+
+def make_etag(request, *parts):
+    key = '|'.join(str(part) for part in (
+        request.get_full_path(), request.user.pk, getattr(request, 'accepted_media_type', ''), *parts,
+    ))
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def not_modified(request, etag, last_modified=None, honour_last_modified=False):
+    """A 304 response when the request's validators match, else None."""
+    response = get_conditional_response(
+        request, etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified and honour_last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Cached copies must be revalidated; they may differ per user.
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _follow(instance, path):
+    for name in path.split('__'):
+        if instance is None:
+            return None
+        instance = getattr(instance, name)
+    return instance
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified validation for `list` and `retrieve`. List validators
+    cost one primary key lookup; detail validators are read off the fetched row.
+    """
+    # Change numbers of a row and of the related rows it nests, one of which
+    # moves whenever its representation does.
+    conditional_fields = ('change_seq',)
+    # Reference tables (apps/core_data/reference.py) nested in the
+    # representation; their versions are part of every validator.
+    conditional_references = ()
+    last_modified_field = None
+
+    def reference_versions(self):
+        return [reference.table(model).version() for model in self.conditional_references]
+
+    def honours_last_modified(self):
+        # Only a detail's own updated_at moves with everything it renders.
+        return self.conditional_fields == ('change_seq',) and not self.conditional_references
+
+    def list_validators(self, queryset):
+        return make_etag(self.request, current_change_seq(), *self.reference_versions()), None
+
+    def object_validators(self, instance):
+        seqs = [_follow(instance, field) for field in self.conditional_fields]
+        last_modified = getattr(instance, self.last_modified_field) if self.last_modified_field else None
+        return make_etag(self.request, instance.pk, *seqs, *self.reference_versions()), last_modified
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.list_validators(queryset)
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+        else:
+            response = Response(self.get_serializer(queryset, many=True).data)
+        return set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.object_validators(instance)
+        response = not_modified(request, etag, last_modified, honour_last_modified=self.honours_last_modified())
+        if response is not None:
+            return response
+        return set_validators(Response(self.get_serializer(instance).data), etag, last_modified)
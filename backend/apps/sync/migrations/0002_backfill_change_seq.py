@@ -0,0 +1,38 @@
+from django.db import migrations
+
+TRACKED_MODELS = [
+    ('gatepass', 'GatePass'),
+    ('gatepass', 'VisitorPass'),
+    ('core_data', 'Gate'),
+    ('core_data', 'Purpose'),
+    ('vehicles', 'Vehicle'),
+    ('drivers', 'Driver'),
+]
+
+
+def number_existing_rows(apps, schema_editor):
+    """
+    Creates the change counter and gives every existing row a change number,
+    so a client's first sync (since=0) can page through them.
+    """
+    from apps.sync.models import COUNTER_ID, backfill_change_seqs
+
+    ChangeCounter = apps.get_model('sync', 'ChangeCounter')
+    ChangeCounter.objects.get_or_create(pk=COUNTER_ID)
+    for app_label, model_name in TRACKED_MODELS:
+        backfill_change_seqs(apps.get_model(app_label, model_name), counter_model=ChangeCounter)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0001_initial'),
+        ('gatepass', '0011_gatepass_change_seq_visitorpass_change_seq'),
+        ('core_data', '0003_gate_change_seq_purpose_change_seq'),
+        ('vehicles', '0002_vehicle_change_seq'),
+        ('drivers', '0002_driver_change_seq'),
+    ]
+
+    operations = [
+        migrations.RunPython(number_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sync', '0002_backfill_change_seq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScopeChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('change_seq', models.BigIntegerField(db_index=True)),
+                ('before', models.JSONField()),
+                ('after', models.JSONField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,119 @@
+# backend/apps/sync/models.py
+#
+# Change tracking for the delta-sync API. Every save of a tracked model takes
+# the next value of a single, global change counter, and every delete leaves a
+# Tombstone carrying one. Incrementing the counter row locks it until the
+# writing transaction commits, so change numbers become visible in commit
+# order and a client that has seen number N can never miss a later commit
+# with a smaller one.
+
+from django.db import models, router, transaction
+from django.db.models import F
+
+COUNTER_ID = 1
+
+
+class ChangeCounter(models.Model):
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return str(self.value)
+
+
+class Tombstone(models.Model):
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.resource} #{self.object_id} deleted at {self.change_seq}"
+
+
+class ScopeChange(models.Model):
+    """
+    A save that changed the fields deciding who may see a row (its
+    sync_scope_fields), with their values before and after, so a client that
+    could see the row before is told it has gone (see SyncView).
+    """
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    change_seq = models.BigIntegerField(db_index=True)
+    before = models.JSONField()
+    after = models.JSONField()
+
+    def __str__(self):
+        return f"{self.resource} #{self.object_id} changed scope at {self.change_seq}"
+
+
+def reserve_change_seqs(count=1, using='default', counter_model=ChangeCounter):
+    """
+    Takes `count` consecutive change numbers and returns them as a range. Call
+    inside the transaction that writes the rows, so the counter stays locked
+    until they are committed.
+    """
+    counters = counter_model.objects.using(using)
+    if not counters.filter(pk=COUNTER_ID).update(value=F('value') + count):
+        counters.get_or_create(pk=COUNTER_ID)
+        counters.filter(pk=COUNTER_ID).update(value=F('value') + count)
+    value = counters.values_list('value', flat=True).get(pk=COUNTER_ID)
+    return range(value - count + 1, value + 1)
+
+
+def next_change_seq(using='default'):
+    return reserve_change_seqs(1, using)[0]
+
+
+def current_change_seq(using='default'):
+    return ChangeCounter.objects.using(using).filter(pk=COUNTER_ID).values_list('value', flat=True).first() or 0
+
+
+def backfill_change_seqs(model, counter_model=ChangeCounter, batch_size=1000):
+    """
+    Numbers rows that have no change number yet, e.g. rows written with
+    bulk_create or queryset.update(). Also used by the backfill migration,
+    which passes historical models.
+    """
+    pending = model.objects.filter(change_seq=0).order_by('pk')
+    while True:
+        with transaction.atomic():
+            batch = list(pending[:batch_size])
+            if not batch:
+                return
+            for obj, seq in zip(batch, reserve_change_seqs(len(batch), counter_model=counter_model)):
+                obj.change_seq = seq
+            model.objects.bulk_update(batch, ['change_seq'])
+
+
+class ChangeTracked(models.Model):
+    """
+    Base for models served by the delta-sync API (/api/sync/). Saves through
+    the ORM are numbered automatically; bulk_create and queryset.update() are
+    not, so follow them with backfill_change_seqs().
+
+    sync_scope_fields lists the fields that decide who may see a row; saves
+    through the ORM that change them leave a ScopeChange (apps/sync/signals.py).
+    """
+    change_seq = models.BigIntegerField(default=0, db_index=True, editable=False)
+
+    sync_scope_fields = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if cls.sync_scope_fields:
+            loaded = dict(zip(field_names, values))
+            if all(name in loaded for name in cls.sync_scope_fields):
+                instance._loaded_scope = {name: loaded[name] for name in cls.sync_scope_fields}
+        return instance
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        if kwargs.get('update_fields'):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'change_seq'}
+        with transaction.atomic(using=using, savepoint=False):
+            self.change_seq = next_change_seq(using)
+            super().save(*args, **kwargs)
@@ -0,0 +1,84 @@
+# backend/apps/sync/resources.py
+#
+# What the delta-sync API serves. Each resource lists the columns sent to
+# clients (foreign keys as plain ids, files as storage names) and which rows a
+# user may see, mirroring the scoping of the matching list endpoint. A scoped
+# resource says so twice: as a queryset filter, and as a test on the values
+# of the model's sync_scope_fields, used to tell whether a row recorded in a
+# ScopeChange was in the caller's scope before and after.
+
+from apps.core_data.models import Gate, Purpose
+from apps.drivers.models import Driver
+from apps.gatepass.models import GatePass, VisitorPass
+from apps.vehicles.models import Vehicle
+
+
+class SyncResource:
+    def __init__(self, name, model, fields, scope=None, in_scope=None):
+        self.name = name
+        self.model = model
+        self.fields = ('id', *fields)
+        self.scope = scope
+        self.in_scope = in_scope
+
+    def queryset(self, user):
+        queryset = self.model.objects.all()
+        return self.scope(queryset, user) if self.scope else queryset
+
+
+def group_names(user):
+    """The names of `user`'s groups, read once per user object."""
+    if not hasattr(user, '_sync_group_names'):
+        user._sync_group_names = set(user.groups.values_list('name', flat=True))
+    return user._sync_group_names
+
+
+def sees_all_gatepasses(user):
+    return user.is_staff or user.is_superuser or 'Client Care' in group_names(user)
+
+
+def scope_gatepasses(queryset, user):
+    if sees_all_gatepasses(user):
+        return queryset
+    return queryset.filter(created_by=user)
+
+
+def gatepass_in_scope(values, user):
+    return sees_all_gatepasses(user) or values['created_by_id'] == user.pk
+
+
+def scope_visitor_passes(queryset, user):
+    if 'Security' in group_names(user):
+        return queryset.filter(status=VisitorPass.APPROVED)
+    if user.is_staff or user.is_superuser:
+        return queryset
+    return queryset.filter(whom_to_visit=user)
+
+
+def visitor_pass_in_scope(values, user):
+    if 'Security' in group_names(user):
+        return values['status'] == VisitorPass.APPROVED
+    return user.is_staff or user.is_superuser or values['whom_to_visit_id'] == user.pk
+
+
+RESOURCES = [
+    SyncResource('gatepasses', GatePass, (
+        'person_name', 'person_nid', 'person_phone', 'person_address', 'entry_time', 'exit_time',
+        'purpose_id', 'gate_id', 'vehicle_id', 'driver_id', 'qr_code', 'status', 'created_by_id',
+        'approved_by_id', 'alcohol_test_required', 'is_recurring', 'recurrence_end_date', 'frequency',
+        'created_at', 'updated_at',
+    ), scope=scope_gatepasses, in_scope=gatepass_in_scope),
+    SyncResource('visitor_passes', VisitorPass, (
+        'visitor_name', 'visitor_company', 'purpose', 'whom_to_visit_id', 'visitor_selfie',
+        'visitor_selfie_thumbnail', 'status', 'created_at', 'updated_at',
+    ), scope=scope_visitor_passes, in_scope=visitor_pass_in_scope),
+    SyncResource('gates', Gate, ('name', 'location')),
+    SyncResource('purposes', Purpose, ('name', 'description')),
+    SyncResource('vehicles', Vehicle, (
+        'vehicle_number', 'type_id', 'make', 'model', 'capacity', 'status', 'registration_date', 'notes',
+    )),
+    SyncResource('drivers', Driver, ('name', 'license_number', 'contact_details', 'address', 'status')),
+]
+
+RESOURCES_BY_MODEL = {resource.model: resource for resource in RESOURCES}
+RESOURCES_BY_NAME = {resource.name: resource for resource in RESOURCES}
@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+
+from .models import ScopeChange, Tombstone, next_change_seq
+from .resources import RESOURCES_BY_MODEL
+
+
+def record_tombstone(sender, instance, using, **kwargs):
+    """Leaves a numbered marker so syncing clients learn about the deletion."""
+    Tombstone.objects.using(using).create(
+        resource=RESOURCES_BY_MODEL[sender].name, object_id=instance.pk, change_seq=next_change_seq(using),
+    )
+
+
+def record_scope_change(sender, instance, using, created, **kwargs):
+    """Records a change to the fields deciding who may see a row, numbered with the row's save."""
+    before = getattr(instance, '_loaded_scope', None)
+    if before is None and not created:
+        return  # Loaded without these fields; reading them now would cost a query each.
+    after = {name: getattr(instance, name) for name in sender.sync_scope_fields}
+    if not created and after != before:
+        ScopeChange.objects.using(using).create(
+            resource=RESOURCES_BY_MODEL[sender].name, object_id=instance.pk, change_seq=instance.change_seq,
+            before=before, after=after,
+        )
+    instance._loaded_scope = after
+
+
+for model in RESOURCES_BY_MODEL:
+    post_delete.connect(record_tombstone, sender=model, dispatch_uid=f'sync-tombstone-{model._meta.label_lower}')
+    if model.sync_scope_fields:
+        post_save.connect(record_scope_change, sender=model, dispatch_uid=f'sync-scope-{model._meta.label_lower}')
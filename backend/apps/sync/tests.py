@@ -0,0 +1,174 @@
+from datetime import date
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from apps.core_data.models import Gate, Purpose
+from apps.core_data.models import VehicleType
+from apps.drivers.models import Driver
+from apps.gatepass.models import GatePass, VisitorPass
+from apps.gatepass.serializers import GatePassSerializer
+from apps.users.models import CustomUser
+from apps.vehicles.models import Vehicle
+from .models import current_change_seq
+
+
+class SyncTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='employee', password='password')
+        self.other = CustomUser.objects.create_user(username='other', password='password')
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('sync')
+        self.purpose = Purpose.objects.create(name='Sync Purpose')
+
+    def create_pass(self, created_by, name='Visitor'):
+        return GatePass.objects.create(
+            created_by=created_by, person_name=name, person_phone='123',
+            entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z', purpose=self.purpose,
+        )
+
+    def rows(self, response, resource):
+        data = response.data['resources'].get(resource, {})
+        return [dict(zip(data['fields'], row)) for row in data.get('rows', [])]
+
+    def test_saves_take_increasing_change_numbers(self):
+        first = self.create_pass(self.user)
+        second = self.create_pass(self.user)
+        self.assertLess(first.change_seq, second.change_seq)
+        first.save(update_fields=['person_name'])
+        first.refresh_from_db()
+        self.assertGreater(first.change_seq, second.change_seq)
+
+    def test_returns_only_changes_since_cursor(self):
+        cursor = self.client.get(self.url, {'since': 0}).data['cursor']
+        gate_pass = self.create_pass(self.user)
+        self.create_pass(self.other)
+
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in self.rows(response, 'gatepasses')], [gate_pass.id])
+        self.assertNotIn('purposes', response.data['resources'])
+        self.assertFalse(response.data['has_more'])
+
+        response = self.client.get(self.url, {'since': response.data['cursor']})
+        self.assertEqual(response.data['resources'], {})
+
+    def test_deletions_are_sent_as_tombstones(self):
+        gate = Gate.objects.create(name='Sync Gate')
+        gate_id, cursor = gate.id, current_change_seq()
+        gate.delete()
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual(response.data['resources']['gates'], {'deleted': [gate_id]})
+
+    def test_rows_leaving_the_callers_scope_are_sent_as_deleted(self):
+        guard = CustomUser.objects.create_user(username='guard', password='password')
+        guard.groups.create(name='Security')
+        visitor_pass = VisitorPass.objects.create(
+            visitor_name='Guest', visitor_company='Acme', purpose='Meeting', whom_to_visit=self.user,
+            status=VisitorPass.APPROVED,
+        )
+        self.client.force_authenticate(user=guard)
+        response = self.client.get(self.url, {'since': 0})
+        self.assertEqual([row['id'] for row in self.rows(response, 'visitor_passes')], [visitor_pass.id])
+
+        visitor_pass.status = VisitorPass.REJECTED
+        visitor_pass.save()
+        response = self.client.get(self.url, {'since': response.data['cursor']})
+        self.assertEqual(response.data['resources']['visitor_passes'], {'deleted': [visitor_pass.id]})
+
+    def test_only_rows_the_caller_saw_are_sent_as_leaving_scope(self):
+        mine, theirs = self.create_pass(self.user), self.create_pass(self.other)
+        response = self.client.get(self.url, {'since': 0})
+        self.assertNotIn('deleted', response.data['resources']['gatepasses'])
+
+        cursor = response.data['cursor']
+        theirs.person_name = 'Renamed'
+        theirs.save()
+        mine = GatePass.objects.get(pk=mine.pk)
+        mine.created_by = self.other
+        mine.save()
+        response = self.client.get(self.url, {'since': cursor})
+        self.assertEqual(response.data['resources']['gatepasses'], {'deleted': [mine.id]})
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_pages_through_large_change_sets(self):
+        created = [self.create_pass(self.user, f'Visitor {i}').id for i in range(5)]
+        cursor, seen = current_change_seq() - 5, []
+        while True:
+            response = self.client.get(self.url, {'since': cursor})
+            seen.extend(row['id'] for row in self.rows(response, 'gatepasses'))
+            cursor = response.data['cursor']
+            if not response.data['has_more']:
+                break
+        self.assertEqual(seen, created)
+
+    def test_rejects_unknown_cursor(self):
+        response = self.client.get(self.url, {'since': current_change_seq() + 100})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='password', is_staff=True)
+        self.client.force_authenticate(user=self.admin)
+        self.vehicle = Vehicle.objects.create(
+            vehicle_number='KA 01 CG 1', type=VehicleType.objects.create(name='Conditional Type'), make='Make',
+            model='Model', capacity='1', status='Active', registration_date=date.today(),
+        )
+        self.gate_pass = GatePass.objects.create(
+            created_by=self.admin, person_name='Visitor', person_phone='123', vehicle=self.vehicle,
+            entry_time='2025-01-01T12:00:00Z', exit_time='2025-01-01T13:00:00Z',
+        )
+
+    def test_unchanged_list_is_not_modified(self):
+        url = reverse('gatepass-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(url, {'page': 1}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_changes_to_rows_and_nested_rows_move_the_list_etag(self):
+        url = reverse('gatepass-list')
+        etag = self.client.get(url)['ETag']
+        self.vehicle.vehicle_number = 'KA 01 CG 2'
+        self.vehicle.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.gate_pass.delete()
+        self.assertNotEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_details_are_validated_without_serializing(self):
+        url = reverse('gatepass-detail', args=[self.gate_pass.pk])
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with mock.patch.object(GatePassSerializer, 'to_representation') as serialize:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        serialize.assert_not_called()
+        self.gate_pass.person_name = 'Renamed'
+        self.gate_pass.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_visitor_pass_details_honour_if_modified_since(self):
+        visitor_pass = VisitorPass.objects.create(
+            visitor_name='Guest', visitor_company='Acme', purpose='Meeting', whom_to_visit=self.admin,
+        )
+        url = reverse('visitorpass-detail', args=[visitor_pass.pk])
+        since = http_date(visitor_pass.updated_at.timestamp() + 1)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 304)
+
+    def test_drivers_and_reference_data(self):
+        driver = Driver.objects.create(name='Driver', license_number='CG-1')
+        url = reverse('driver-detail', args=[driver.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        url = reverse('vehicletype-detail', args=[self.vehicle.type_id])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
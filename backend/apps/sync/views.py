@@ -0,0 +1,95 @@
+# backend/apps/sync/views.py
+
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.monitoring.query_budget import QueryBudgetMixin
+from .models import ScopeChange, Tombstone, current_change_seq
+from .resources import RESOURCES, RESOURCES_BY_NAME
+
+
+@method_decorator(gzip_page, name='dispatch')
+class SyncView(QueryBudgetMixin, APIView):
+    """
+    Returns everything that changed since `?since=<cursor>` across gate passes,
+    visitor passes, gates, purposes, vehicles and drivers. Start with since=0
+    for a full download, then pass back the returned `cursor`; while
+    `has_more` is true, call again straight away.
+
+    Rows are sent as arrays in the order of each resource's `fields`, and
+    deleted rows as lists of ids, to keep payloads small. Rows whose owner or
+    status took them out of what the caller could see since the cursor (e.g.
+    a visitor pass a guard saw approved that was then rejected) are sent as
+    deleted too; a full download (since=0) has nothing to drop. Deleting a gate,
+    purpose, vehicle or driver clears references to it without renumbering the
+    referring passes, so clients should clear those references themselves.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = 10
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            return Response({"detail": "'since' must be an integer cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        high_water = current_change_seq()
+        if since < 0 or since > high_water:
+            return Response(
+                {"detail": "Unknown cursor; start again with since=0."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        limit = settings.SYNC_PAGE_SIZE
+        changed = {}
+        for resource in RESOURCES:
+            changed[resource.name] = list(
+                resource.queryset(request.user)
+                .filter(change_seq__gt=since, change_seq__lte=high_water)
+                .order_by('change_seq')
+                .values_list('change_seq', *resource.fields)[:limit + 1]
+            )
+        scope_changes = []
+        if since:
+            scope_changes = list(
+                ScopeChange.objects.filter(change_seq__gt=since, change_seq__lte=high_water)
+                .order_by('change_seq')
+                .values_list('change_seq', 'resource', 'object_id', 'before', 'after')[:limit + 1]
+            )
+        tombstones = list(
+            Tombstone.objects.filter(change_seq__gt=since, change_seq__lte=high_water)
+            .order_by('change_seq')
+            .values_list('change_seq', 'resource', 'object_id')[:limit + 1]
+        )
+
+        # When a stream has more than a page of changes, stop every stream at
+        # the last change number of that page so the cursor never skips rows.
+        cursor = high_water
+        for rows in (*changed.values(), scope_changes, tombstones):
+            if len(rows) > limit:
+                cursor = min(cursor, rows[limit - 1][0])
+
+        payload = {}
+        for resource in RESOURCES:
+            rows = [row[1:] for row in changed[resource.name] if row[0] <= cursor]
+            if rows:
+                payload[resource.name] = {'fields': resource.fields, 'rows': rows}
+        # A row the caller could see before its first scope change in this
+        # page and cannot after its last one has left the caller's scope.
+        spans = {}
+        for seq, name, object_id, before, after in scope_changes:
+            if seq <= cursor:
+                first_before, _ = spans.get((name, object_id), (before, None))
+                spans[name, object_id] = (first_before, after)
+        for (name, object_id), (before, after) in spans.items():
+            in_scope = RESOURCES_BY_NAME[name].in_scope
+            if in_scope(before, request.user) and not in_scope(after, request.user):
+                payload.setdefault(name, {}).setdefault('deleted', []).append(object_id)
+        for seq, name, object_id in tombstones:
+            if seq <= cursor:
+                payload.setdefault(name, {}).setdefault('deleted', []).append(object_id)
+
+        return Response({'cursor': cursor, 'has_more': cursor < high_water, 'resources': payload})
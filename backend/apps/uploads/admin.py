@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Upload
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ('id', 'filename', 'owner', 'size', 'received', 'status', 'created_at')
+    list_filter = ('status',)
+    readonly_fields = ('received',)
@@ -0,0 +1,152 @@
+# backend/apps/uploads/chunks.py
+#
+# Chunk handling for resumable uploads. A PATCH body is copied from the
+# request stream to the upload's staging file (UPLOAD_STAGING_DIR/<id>.part)
+# in small pieces, so memory stays bounded whatever the chunk size, and
+# whatever part of it arrived before the link dropped is kept: the client asks
+# for the offset and carries on from there.
+#
+# The offset only moves through a conditional UPDATE on the expected value. Two
+# requests racing for the same offset (a retry overtaking a stalled original)
+# both write the same bytes of the same file to the same place, and only one
+# of them advances `received`.
+#
+# Once the last byte is in, the image is checked off the request (on a thread,
+# or inline with UPLOAD_VALIDATION = 'sync') and moved to media storage.
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image
+
+from .models import Upload
+
+logger = logging.getLogger('gatepass_project.uploads')
+
+COPY_BUFFER_SIZE = 64 * 1024
+ALLOWED_FORMATS = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def staging_path(upload_id):
+    return os.path.join(settings.UPLOAD_STAGING_DIR, f'{upload_id}.part')
+
+
+def append(upload, offset, stream, length):
+    """
+    Writes up to `length` bytes from `stream` at `offset` of the upload's
+    staging file and advances the upload past what was written. Returns the
+    upload's offset afterwards, or None when another request moved it first.
+    """
+    os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+    path = staging_path(upload.pk)
+    written = 0
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as staged:
+        staged.seek(offset)
+        try:
+            while written < length:
+                piece = stream.read(min(COPY_BUFFER_SIZE, length - written))
+                if not piece:
+                    break
+                staged.write(piece)
+                written += len(piece)
+        except OSError:
+            # The client went away mid-chunk; keep what arrived.
+            logger.info('Upload %s interrupted after %d bytes of a chunk.', upload.pk, written)
+
+    received = offset + written
+    done = received >= upload.size
+    with transaction.atomic():
+        updated = Upload.objects.filter(pk=upload.pk, status=Upload.UPLOADING, received=offset).update(
+            received=received, status=Upload.VALIDATING if done else Upload.UPLOADING,
+        )
+        if not updated:
+            return None
+        if done:
+            schedule_validation(upload.pk)
+    upload.received = received
+    if done:
+        upload.status = Upload.VALIDATING
+    return received
+
+
+def schedule_validation(upload_id):
+    if settings.UPLOAD_VALIDATION == 'sync':
+        transaction.on_commit(partial(validate, upload_id))
+    else:
+        transaction.on_commit(partial(_get_executor().submit, _validate_in_thread, upload_id))
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='upload-validation')
+        return _executor
+
+
+def _validate_in_thread(upload_id):
+    try:
+        validate(upload_id)
+    except Exception:
+        logger.exception('Could not validate upload %s.', upload_id)
+    finally:
+        close_old_connections()
+
+
+def validate(upload_id):
+    """Checks a fully received upload is an image and moves it to media storage."""
+    upload = Upload.objects.get(pk=upload_id)
+    path = staging_path(upload_id)
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            image.verify()
+        if image_format not in ALLOWED_FORMATS:
+            raise ValueError(f'unsupported image format {image_format}')
+    except Exception as exc:
+        logger.info('Upload %s is not a usable image: %s', upload_id, exc)
+        Upload.objects.filter(pk=upload_id, status=Upload.VALIDATING).update(
+            status=Upload.FAILED, error='The file is not a JPEG, PNG or WebP image.',
+        )
+        _discard(path)
+        return
+
+    with open(path, 'rb') as staged:
+        upload.file.save(os.path.basename(upload.filename) or f'{upload_id}.jpg', File(staged), save=False)
+    updated = Upload.objects.filter(pk=upload_id, status=Upload.VALIDATING).update(
+        file=upload.file.name, content_type=ALLOWED_FORMATS[image_format], status=Upload.READY,
+    )
+    if not updated:
+        upload.file.storage.delete(upload.file.name)
+    _discard(path)
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def claim(upload_id, user):
+    """
+    Marks a ready upload as used and returns it, or returns None when there
+    is no such ready upload for `user`. Uploads made without signing in can be
+    claimed by whoever holds their id.
+    """
+    owner = Q(owner__isnull=True)
+    if user is not None and user.is_authenticated:
+        owner |= Q(owner=user)
+    if not Upload.objects.filter(owner, pk=upload_id, status=Upload.READY).update(status=Upload.CLAIMED):
+        return None
+    return Upload.objects.get(pk=upload_id)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.uploads.retention import purge
+
+
+class Command(BaseCommand):
+    help = 'Deletes media files past their retention period and files no row refers to.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Rows or files per batch (default MEDIA_RETENTION_BATCH_SIZE).')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted without deleting it.')
+        parser.add_argument('--skip-orphans', action='store_true', help='Only apply the retention policies.')
+
+    def handle(self, *args, **options):
+        report = None
+        if options['verbosity'] > 1:
+            report = lambda policy, name: self.stdout.write(f'{policy}: {name}')
+        counts = purge(
+            batch_size=options['batch_size'], dry_run=options['dry_run'],
+            orphans=not options['skip_orphans'], report=report,
+        )
+        verb = 'would delete' if options['dry_run'] else 'deleted'
+        for policy, count in counts.items():
+            self.stdout.write(f'{policy}: {verb} {count} file(s).')
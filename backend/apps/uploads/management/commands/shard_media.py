@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.uploads.media import shard_files
+
+
+class Command(BaseCommand):
+    help = 'Moves media files saved in the old flat directories into the sharded layout.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows read per query.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the files that would move.')
+
+    def handle(self, *args, **options):
+        moved = shard_files(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = 'would move' if options['dry_run'] else 'moved'
+        for field, count in moved.items():
+            self.stdout.write(f'{field}: {verb} {count} file(s).')
@@ -0,0 +1,72 @@
+# backend/apps/uploads/media.py
+#
+# The media fields in the project and moving their files into the sharded
+# layout of storage.py. Files saved before that layout (qrcodes/gatepass_1.png,
+# visitor_selfies/selfie.jpg, ...) keep working where they are; shard_files()
+# (`manage.py shard_media`) copies each to a sharded name, points its row at
+# the copy and then deletes the original, a batch of rows at a time.
+
+from django.apps import apps
+from django.db import transaction
+
+from apps.sync.models import ChangeTracked, next_change_seq
+from .storage import SHARDED_NAME, sharded_name
+
+# (model, field) for every media file field.
+MEDIA_FIELDS = [
+    ('gatepass.GatePass', 'qr_code'),
+    ('gatepass.GatePass', 'alcohol_test_photo'),
+    ('gatepass.VisitorPass', 'visitor_selfie'),
+    ('gatepass.VisitorPass', 'visitor_selfie_thumbnail'),
+    ('uploads.Upload', 'file'),
+]
+
+
+def media_fields():
+    for label, field_name in MEDIA_FIELDS:
+        model = apps.get_model(label)
+        yield model, model._meta.get_field(field_name)
+
+
+def _unsharded(model, field, batch_size):
+    """(pk, name) of rows whose file is not in the sharded layout, in batches of pk order."""
+    after = None
+    while True:
+        rows = model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+        if after is not None:
+            rows = rows.filter(pk__gt=after)
+        batch = list(rows.order_by('pk').values_list('pk', field.name)[:batch_size])
+        if not batch:
+            return
+        after = batch[-1][0]
+        yield [(pk, name) for pk, name in batch if not SHARDED_NAME.match(name)]
+
+
+def shard_files(batch_size=500, dry_run=False):
+    """
+    Moves files outside the sharded layout into it. Returns {'model.field':
+    files moved (or, with `dry_run`, to move)}.
+    """
+    moved = {}
+    for model, field in media_fields():
+        key = f'{model._meta.label}.{field.name}'
+        moved[key] = 0
+        prefix = field.upload_to.prefix
+        for batch in _unsharded(model, field, batch_size):
+            if dry_run:
+                moved[key] += len(batch)
+                continue
+            for pk, old_name in batch:
+                if not field.storage.exists(old_name):
+                    continue
+                with field.storage.open(old_name, 'rb') as original:
+                    new_name = field.storage.save(sharded_name(prefix, old_name), original)
+                changes = {field.name: new_name}
+                with transaction.atomic():
+                    if issubclass(model, ChangeTracked):
+                        changes['change_seq'] = next_change_seq()
+                    # Only if the row still points at the old file.
+                    updated = model.objects.filter(pk=pk, **{field.name: old_name}).update(**changes)
+                field.storage.delete(old_name if updated else new_name)
+                moved[key] += bool(updated)
+    return moved
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:29
+
+import apps.uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='upload',
+            name='file',
+            field=models.FileField(blank=True, null=True, upload_to=apps.uploads.storage.sharded('uploads')),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# backend/apps/uploads/models.py
+#
+# Resumable uploads for photos sent from the gate over weak mobile links. A
+# client declares the file, then sends it in chunks that are appended straight
+# to a staging file on disk; a dropped connection resumes from the last byte
+# the server has. Finished uploads are checked in the background and then
+# referenced by id from the endpoints that need the photo (visitor pass
+# selfies, alcohol-test photos), which claim them so each is used once.
+
+import uuid
+
+from django.db import models
+from apps.users.models import CustomUser
+from .storage import sharded
+
+
+class Upload(models.Model):
+    UPLOADING = 'uploading'
+    VALIDATING = 'validating'
+    READY = 'ready'
+    FAILED = 'failed'
+    CLAIMED = 'claimed'
+    STATUS_CHOICES = [
+        (UPLOADING, 'Uploading'),
+        (VALIDATING, 'Validating'),
+        (READY, 'Ready'),
+        (FAILED, 'Failed'),
+        (CLAIMED, 'Claimed'),
+    ]
+
+    # Unguessable: anonymous visitors resume and reference their upload by id alone.
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='uploads')
+    # Where an anonymous upload came from; bounds how many each address may have open.
+    client_ip = models.GenericIPAddressField(null=True, blank=True, editable=False)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=UPLOADING)
+    error = models.CharField(max_length=255, blank=True, default='')
+    file = models.FileField(upload_to=sharded('uploads'), blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['client_ip'], condition=models.Q(status='uploading'), name='upload_open_by_ip_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes, {self.status})"
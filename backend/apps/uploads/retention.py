@@ -0,0 +1,251 @@
+# backend/apps/uploads/retention.py
+#
+# Media retention. Nothing else ever deletes media files, so without this the
+# media storage only grows. purge() (`manage.py purge_media`) applies:
+#
+# - row policies: files that are kept only for a while after something
+#   happened to their row, e.g. the QR code of a pass that expired, was
+#   rejected or was cancelled MEDIA_RETENTION_QR_DAYS ago. The file is deleted
+#   and the field cleared (with a sync change number where the model has one);
+# - upload expiry: resumable uploads (models.Upload) never claimed within
+#   MEDIA_RETENTION_UPLOAD_DAYS, with their staging files;
+# - an orphan sweep: files under the media directories that no row refers to
+#   (left behind by re-approvals regenerating QR codes, failed requests and the
+#   like) and older than MEDIA_ORPHAN_GRACE_HOURS, so files whose row is still
+#   being saved are left alone.
+#
+# Rows are read in keyset-paged batches and storage is walked one directory at
+# a time, with the names checked against the database a batch at a time, so
+# memory stays flat however many files there are. With dry_run nothing is
+# deleted and the counts say what would be.
+
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.sync.models import ChangeTracked, reserve_change_seqs
+from .media import media_fields
+from .models import Upload
+
+logger = logging.getLogger('gatepass_project.media_retention')
+
+STAGING_SUFFIX = '.part'
+
+
+class Policy:
+    """
+    Files in `fields` of `model` rows matching `due(cutoff)` are deleted, the
+    cutoff being the number of days in setting `days_setting` ago (0
+    disables the policy).
+    """
+
+    def __init__(self, name, model, fields, days_setting, due):
+        self.name = name
+        self.model = model
+        self.fields = fields
+        self.days_setting = days_setting
+        self.due = due
+
+
+POLICIES = [
+    Policy(
+        'qr_codes', 'gatepass.GatePass', ('qr_code',), 'MEDIA_RETENTION_QR_DAYS',
+        # updated_at is when the pass expired, was rejected or was cancelled.
+        lambda cutoff: Q(status__in=['EXPIRED', 'REJECTED', 'CANCELLED'], updated_at__lt=cutoff),
+    ),
+    Policy(
+        'alcohol_test_photos', 'gatepass.GatePass', ('alcohol_test_photo',), 'MEDIA_RETENTION_ALCOHOL_TEST_DAYS',
+        lambda cutoff: Q(created_at__lt=cutoff),
+    ),
+    Policy(
+        'visitor_selfies', 'gatepass.VisitorPass', ('visitor_selfie', 'visitor_selfie_thumbnail'),
+        'MEDIA_RETENTION_SELFIE_DAYS', lambda cutoff: Q(created_at__lt=cutoff),
+    ),
+]
+
+
+def _with_files(fields):
+    has_file = Q()
+    for field in fields:
+        has_file |= Q(**{f'{field}__gt': ''})
+    return has_file
+
+
+def _batches(queryset, fields, batch_size):
+    after = None
+    while True:
+        page = queryset if after is None else queryset.filter(pk__gt=after)
+        batch = list(page.order_by('pk').only('pk', *fields)[:batch_size])
+        if not batch:
+            return
+        after = batch[-1].pk
+        yield batch
+
+
+def _delete(storage, name):
+    try:
+        storage.delete(name)
+    except FileNotFoundError:
+        pass
+
+
+def apply_policy(policy, now, batch_size, dry_run=False, report=None):
+    """Deletes the files `policy` no longer keeps and clears their fields. Returns the number of files."""
+    days = getattr(settings, policy.days_setting)
+    if not days:
+        return 0
+    model = apps.get_model(policy.model)
+    queryset = model.objects.filter(policy.due(now - timedelta(days=days)), _with_files(policy.fields))
+    deleted = 0
+    for batch in _batches(queryset, policy.fields, batch_size):
+        for row in batch:
+            for field in policy.fields:
+                name = getattr(row, field).name
+                if name:
+                    deleted += 1
+                    if report:
+                        report(policy.name, name)
+                    if not dry_run:
+                        _delete(model._meta.get_field(field).storage, name)
+                    setattr(row, field, '')
+        if dry_run:
+            continue
+        update_fields = list(policy.fields)
+        with transaction.atomic():
+            if issubclass(model, ChangeTracked):
+                for row, seq in zip(batch, reserve_change_seqs(len(batch))):
+                    row.change_seq = seq
+                update_fields.append('change_seq')
+            model.objects.bulk_update(batch, update_fields)
+    return deleted
+
+
+def expire_uploads(now, batch_size, dry_run=False, report=None):
+    """
+    Deletes uploads that were never claimed within MEDIA_RETENTION_UPLOAD_DAYS,
+    with their files. Rows of claimed uploads go too, but their file belongs
+    to whatever claimed it. Returns the number of uploads.
+    """
+    cutoff = now - timedelta(days=settings.MEDIA_RETENTION_UPLOAD_DAYS)
+    expired = 0
+    for batch in _batches(Upload.objects.filter(updated_at__lt=cutoff), ('status', 'file'), batch_size):
+        expired += len(batch)
+        for upload in batch:
+            if report:
+                report('uploads', upload.file.name or f'{upload.pk}{STAGING_SUFFIX}')
+            if dry_run:
+                continue
+            if upload.status != Upload.CLAIMED and upload.file:
+                _delete(upload.file.storage, upload.file.name)
+            staged = os.path.join(settings.UPLOAD_STAGING_DIR, f'{upload.pk}{STAGING_SUFFIX}')
+            if os.path.exists(staged):
+                os.remove(staged)
+        if not dry_run:
+            Upload.objects.filter(pk__in=[upload.pk for upload in batch]).delete()
+    return expired
+
+
+def walk(storage, directory):
+    """Yields the name of every file under `directory`, one directory listing at a time."""
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        try:
+            directories, files = storage.listdir(current)
+        except FileNotFoundError:
+            continue
+        for name in files:
+            yield f'{current}/{name}'
+        pending.extend(f'{current}/{name}' for name in directories)
+
+
+def _referenced(names):
+    referenced = set()
+    for model, field in media_fields():
+        referenced.update(model.objects.filter(**{f'{field.name}__in': names}).values_list(field.name, flat=True))
+    return referenced
+
+
+def media_roots():
+    """Top-level media directories, e.g. 'qrcodes' and 'visitor_selfies' (which holds the thumbnails)."""
+    roots = {field.upload_to.prefix.split('/')[0] for _, field in media_fields()}
+    return sorted(roots)
+
+
+def sweep_orphans(now, batch_size, dry_run=False, report=None, storage=None):
+    """Deletes media files no row refers to, older than MEDIA_ORPHAN_GRACE_HOURS. Returns the number of files."""
+    storage = storage or default_storage
+    cutoff = now - timedelta(hours=settings.MEDIA_ORPHAN_GRACE_HOURS)
+    deleted = 0
+
+    def check(names):
+        nonlocal deleted
+        referenced = _referenced(names)
+        for name in names:
+            if name in referenced or storage.get_modified_time(name) >= cutoff:
+                continue
+            deleted += 1
+            if report:
+                report('orphans', name)
+            if not dry_run:
+                _delete(storage, name)
+
+    for root in media_roots():
+        names = []
+        for name in walk(storage, root):
+            names.append(name)
+            if len(names) >= batch_size:
+                check(names)
+                names = []
+        if names:
+            check(names)
+    return deleted
+
+
+def sweep_staging(now, dry_run=False, report=None):
+    """Deletes staging files whose upload is gone, older than MEDIA_ORPHAN_GRACE_HOURS."""
+    staging_dir = settings.UPLOAD_STAGING_DIR
+    if not os.path.isdir(staging_dir):
+        return 0
+    cutoff = (now - timedelta(hours=settings.MEDIA_ORPHAN_GRACE_HOURS)).timestamp()
+    deleted = 0
+    with os.scandir(staging_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(STAGING_SUFFIX) or entry.stat().st_mtime >= cutoff:
+                continue
+            try:
+                upload_id = uuid.UUID(entry.name.removesuffix(STAGING_SUFFIX))
+            except ValueError:
+                continue
+            if Upload.objects.filter(pk=upload_id).exists():
+                continue
+            deleted += 1
+            if report:
+                report('staging', entry.path)
+            if not dry_run:
+                os.remove(entry.path)
+    return deleted
+
+
+def purge(now=None, batch_size=None, dry_run=False, orphans=True, report=None):
+    """Applies every retention policy. Returns a Counter of files deleted (or due) per policy."""
+    now = now or timezone.now()
+    batch_size = batch_size or settings.MEDIA_RETENTION_BATCH_SIZE
+    counts = Counter()
+    for policy in POLICIES:
+        counts[policy.name] = apply_policy(policy, now, batch_size, dry_run=dry_run, report=report)
+    counts['uploads'] = expire_uploads(now, batch_size, dry_run=dry_run, report=report)
+    if orphans:
+        counts['orphans'] = sweep_orphans(now, batch_size, dry_run=dry_run, report=report)
+        counts['staging'] = sweep_staging(now, dry_run=dry_run, report=report)
+    logger.info('Media retention%s: %s', ' (dry run)' if dry_run else '', dict(counts))
+    return counts
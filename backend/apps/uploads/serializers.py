@@ -0,0 +1,25 @@
+# backend/apps/uploads/serializers.py
+
+from django.conf import settings
+from rest_framework import serializers
+from .models import Upload
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Upload
+        fields = ('id', 'filename', 'content_type', 'size', 'offset', 'chunk_size', 'status', 'error', 'created_at')
+        read_only_fields = ('id', 'offset', 'status', 'error', 'created_at')
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_MAX_CHUNK_BYTES
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Size must be positive.")
+        if value > settings.UPLOAD_MAX_BYTES:
+            raise serializers.ValidationError(f"Uploads are limited to {settings.UPLOAD_MAX_BYTES} bytes.")
+        return value
@@ -0,0 +1,52 @@
+# backend/apps/uploads/storage.py
+#
+# Media file layout. Every media field names its files with sharded(<prefix>):
+# a random 32-hex name, filed under two levels of directories taken from that
+# name (qrcodes/3f/a9/3fa9....png), so no directory grows past a few hundred
+# entries and listings, backups and saves stay fast as files pile up.
+#
+# The names are unique by construction, so MediaStorage skips the existence
+# check (and the retry loop) that FileSystemStorage runs on every save. Names
+# it did not hand out itself still get the usual check.
+#
+# Which storage holds the files is the STORAGES['default'] setting:
+# MediaStorage on local disk, or an S3-compatible bucket (MEDIA_STORAGE = 's3',
+# see settings/base.py). Code that touches media goes through field files or
+# `default_storage` and never assumes a local path.
+
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+SHARDED_NAME = re.compile(r'^(?:[\w.-]+/)*[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{32}(?:\.\w+)?$')
+
+
+def sharded_name(prefix, filename):
+    """A new, unique `prefix`/ab/cd/abcd....ext name for a file called `filename`."""
+    key = uuid.uuid4().hex
+    extension = os.path.splitext(filename)[1].lower()
+    return f'{prefix}/{key[:2]}/{key[2:4]}/{key}{extension}'
+
+
+@deconstructible
+class sharded:
+    """upload_to for a media field: sharded, collision-free names under `prefix`."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix.strip('/')
+
+    def __call__(self, instance, filename):
+        return sharded_name(self.prefix, filename)
+
+    def __eq__(self, other):
+        return isinstance(other, sharded) and other.prefix == self.prefix
+
+
+class MediaStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        if SHARDED_NAME.match(name.replace('\\', '/')):
+            return name
+        return super().get_available_name(name, max_length=max_length)
@@ -0,0 +1,314 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings as django_settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage, default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.throttling import ScopedRateThrottle
+
+from apps.gatepass.models import GatePass, VisitorPass
+from apps.users.models import CustomUser
+from .models import Upload
+from .retention import purge
+from .storage import SHARDED_NAME, MediaStorage
+
+
+def jpeg_bytes(size=(1200, 900)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'blue').save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+class UploadTests(APITestCase):
+    def setUp(self):
+        self.media_root = media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings = override_settings(
+            MEDIA_ROOT=media_root, UPLOAD_STAGING_DIR=os.path.join(media_root, 'staging'), UPLOAD_MAX_CHUNK_BYTES=4096,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.guard = CustomUser.objects.create_user(username='guard', password='password123')
+
+    def start(self, data):
+        response = self.client.post(reverse('upload-create'), {
+            'filename': 'photo.jpg', 'content_type': 'image/jpeg', 'size': len(data),
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['offset'], response.data['chunk_size']), (0, 4096))
+        return response.data['id']
+
+    def send(self, upload_id, offset, chunk):
+        return self.client.generic(
+            'PATCH', reverse('upload-detail', args=[upload_id]), chunk,
+            content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def upload(self, data):
+        upload_id = self.start(data)
+        with self.captureOnCommitCallbacks(execute=True):
+            for offset in range(0, len(data), 4096):
+                self.assertEqual(self.send(upload_id, offset, data[offset:offset + 4096]).status_code, 200)
+        return upload_id
+
+    def test_chunks_resume_from_the_server_offset(self):
+        data = jpeg_bytes()
+        upload_id = self.start(data)
+        self.assertEqual(self.send(upload_id, 0, data[:4096])['Upload-Offset'], '4096')
+
+        # A retried chunk and a skipped-ahead chunk are both refused with the offset to resume from.
+        for offset in (0, 8192):
+            response = self.send(upload_id, offset, data[offset:offset + 4096])
+            self.assertEqual((response.status_code, response['Upload-Offset']), (409, '4096'))
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[upload_id])).data['offset'], 4096)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for offset in range(4096, len(data), 4096):
+                self.send(upload_id, offset, data[offset:offset + 4096])
+
+        upload = Upload.objects.get(pk=upload_id)
+        self.assertEqual((upload.status, upload.received), (Upload.READY, len(data)))
+        with upload.file.open('rb') as stored:
+            self.assertEqual(stored.read(), data)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'staging')), [])
+
+    def test_an_interrupted_chunk_keeps_what_arrived(self):
+        data = jpeg_bytes()
+        upload_id = self.start(data)
+
+        class DroppedStream(BytesIO):
+            def read(self, size=-1):
+                if self.tell() >= 1000:
+                    raise OSError('connection reset')
+                return super().read(min(size, 1000 - self.tell()))
+
+        with mock.patch('rest_framework.request.Request.stream', new_callable=mock.PropertyMock) as stream:
+            stream.return_value = DroppedStream(data[:4096])
+            response = self.send(upload_id, 0, data[:4096])
+        self.assertEqual((response.status_code, response['Upload-Offset']), (200, '1000'))
+        self.assertEqual(self.send(upload_id, 1000, data[1000:5096])['Upload-Offset'], '5096')
+
+    def test_non_images_fail_validation(self):
+        upload_id = self.upload(b'not an image' * 100)
+        upload = Upload.objects.get(pk=upload_id)
+        self.assertEqual(upload.status, Upload.FAILED)
+        self.assertFalse(upload.file)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'staging')), [])
+
+    def test_oversized_chunks_and_uploads_are_refused(self):
+        with override_settings(UPLOAD_MAX_BYTES=1000):
+            response = self.client.post(reverse('upload-create'), {
+                'filename': 'photo.jpg', 'content_type': 'image/jpeg', 'size': 1001,
+            }, format='json')
+        self.assertEqual(response.status_code, 400)
+        upload_id = self.start(b'x' * 10000)
+        self.assertEqual(self.send(upload_id, 0, b'x' * 4097).status_code, 400)
+
+    @override_settings(UPLOAD_MAX_OPEN=2)
+    def test_open_uploads_are_capped_per_address(self):
+        self.start(b'x' * 10)
+        finished = self.upload(jpeg_bytes())
+        self.start(b'x' * 10)
+        response = self.client.post(reverse('upload-create'), {
+            'filename': 'photo.jpg', 'content_type': 'image/jpeg', 'size': 10,
+        }, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(Upload.objects.get(pk=finished).client_ip, '127.0.0.1')
+
+        # Signed-in users are counted on their own.
+        self.client.force_authenticate(user=self.guard)
+        self.start(b'x' * 10)
+
+    def test_new_uploads_are_rate_limited(self):
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', {'uploads': '1/hour'}):
+            self.start(b'x' * 10)
+            response = self.client.post(reverse('upload-create'), {
+                'filename': 'photo.jpg', 'content_type': 'image/jpeg', 'size': 10,
+            }, format='json')
+        self.assertEqual(response.status_code, 429)
+
+    def test_visitor_pass_takes_a_finished_upload_once(self):
+        employee = CustomUser.objects.create_user(username='host', password='password123', is_staff=True)
+        upload_id = self.upload(jpeg_bytes((2000, 1000)))
+        fields = {
+            'visitor_name': 'Visitor', 'visitor_company': 'Acme', 'purpose': 'Meeting',
+            'whom_to_visit_id': employee.id, 'visitor_selfie_upload_id': upload_id,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('visitorpass-list'), fields, format='json')
+        self.assertEqual(response.status_code, 201)
+        visitor_pass = VisitorPass.objects.get()
+        with visitor_pass.visitor_selfie.open('rb') as stored, Image.open(stored) as selfie:
+            self.assertEqual(selfie.size, (1600, 800))
+        self.assertEqual(Upload.objects.get(pk=upload_id).status, Upload.CLAIMED)
+
+        self.assertEqual(self.client.post(reverse('visitorpass-list'), fields, format='json').status_code, 400)
+        fields.pop('visitor_selfie_upload_id')
+        self.assertEqual(self.client.post(reverse('visitorpass-list'), fields, format='json').status_code, 400)
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_alcohol_test_takes_the_guards_upload(self, send_message):
+        admin = CustomUser.objects.create_superuser(username='admin', password='password123', email='admin@example.com')
+        gate_pass = GatePass.objects.create(
+            person_name='Driver', entry_time='2030-01-01T08:00:00Z', exit_time='2030-01-01T18:00:00Z',
+            created_by=admin, alcohol_test_required=True,
+        )
+        self.client.force_authenticate(user=self.guard)
+        upload_id = self.upload(jpeg_bytes())
+
+        self.client.force_authenticate(user=admin)
+        url = reverse('pre-approved-visitor-alcohol-test', args=[gate_pass.id])
+        # Someone else's upload cannot be claimed.
+        self.assertEqual(self.client.post(url, {'result': 'pass', 'photo_upload_id': upload_id}).status_code, 400)
+
+        Upload.objects.filter(pk=upload_id).update(owner=admin)
+        response = self.client.post(url, {'result': 'pass', 'photo_upload_id': upload_id})
+        self.assertEqual(response.status_code, 200)
+        gate_pass.refresh_from_db()
+        self.assertEqual(gate_pass.status, GatePass.APPROVED)
+        self.assertEqual(gate_pass.alcohol_test_photo.name, Upload.objects.get(pk=upload_id).file.name)
+
+
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = CustomUser.objects.create_user(username='owner', password='password123')
+
+    def gate_pass(self, **fields):
+        return GatePass.objects.create(
+            person_name='Driver', entry_time='2030-01-01T08:00:00Z', exit_time='2030-01-01T18:00:00Z',
+            created_by=self.user, **fields,
+        )
+
+    def test_files_get_sharded_names_without_an_existence_check(self):
+        gate_pass = self.gate_pass()
+        with mock.patch.object(MediaStorage, 'exists', side_effect=AssertionError('exists() called')):
+            gate_pass.generate_qr_code()
+            gate_pass.generate_qr_code()
+        name = gate_pass.qr_code.name
+        self.assertRegex(name, r'^qrcodes/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{28}\.png$')
+        self.assertTrue(default_storage.exists(name))
+
+        # Names the storage did not hand out are still made unique.
+        first = default_storage.save('legacy/photo.jpg', ContentFile(b'a'))
+        self.assertNotEqual(default_storage.save('legacy/photo.jpg', ContentFile(b'b')), first)
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_shard_media_moves_flat_files(self, send_message):
+        legacy = default_storage.save('qrcodes/gatepass_1.png', ContentFile(b'png'))
+        gate_pass = self.gate_pass(qr_code=legacy)
+        change_seq = gate_pass.change_seq
+
+        call_command('shard_media', '--dry-run', stdout=StringIO())
+        gate_pass.refresh_from_db()
+        self.assertEqual(gate_pass.qr_code.name, legacy)
+
+        call_command('shard_media', stdout=StringIO())
+        gate_pass.refresh_from_db()
+        self.assertRegex(gate_pass.qr_code.name, SHARDED_NAME)
+        self.assertGreater(gate_pass.change_seq, change_seq)
+        self.assertFalse(default_storage.exists(legacy))
+        with gate_pass.qr_code.open('rb') as moved:
+            self.assertEqual(moved.read(), b'png')
+
+
+class MediaRetentionTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_STAGING_DIR=os.path.join(self.media_root, 'staging'))
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = CustomUser.objects.create_user(username='owner', password='password123')
+
+    @mock.patch('fcm_django.models.FCMDeviceQuerySet.send_message')
+    def test_policies_and_orphans(self, send_message):
+        def gate_pass(status):
+            gate_pass = GatePass.objects.create(
+                person_name='Driver', entry_time='2030-01-01T08:00:00Z', exit_time='2030-01-01T18:00:00Z',
+                created_by=self.user, status=status,
+            )
+            gate_pass.generate_qr_code()
+            gate_pass.save()
+            return gate_pass
+
+        expired, approved = gate_pass(GatePass.EXPIRED), gate_pass(GatePass.APPROVED)
+        orphan = default_storage.save('qrcodes/gatepass_old.png', ContentFile(b'png'))
+        stale_upload = Upload.objects.create(filename='a.jpg', content_type='image/jpeg', size=10)
+        os.makedirs(os.path.join(self.media_root, 'staging'))
+        with open(os.path.join(self.media_root, 'staging', f'{stale_upload.pk}.part'), 'wb') as staged:
+            staged.write(b'12345')
+        expired_qr, approved_qr = expired.qr_code.name, approved.qr_code.name
+        later = timezone.now() + timedelta(days=8)
+
+        counts = purge(now=later, dry_run=True)
+        self.assertEqual((counts['qr_codes'], counts['orphans'], counts['uploads']), (1, 1, 1))
+        self.assertTrue(default_storage.exists(expired_qr) and default_storage.exists(orphan))
+
+        with self.assertNumQueries(17):
+            counts = purge(now=later, batch_size=100)
+        self.assertEqual((counts['qr_codes'], counts['orphans'], counts['uploads']), (1, 1, 1))
+        expired.refresh_from_db()
+        self.assertFalse(expired.qr_code)
+        self.assertFalse(default_storage.exists(expired_qr) or default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(approved_qr))
+        self.assertFalse(Upload.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'staging')), [])
+
+    def test_orphans_younger_than_the_grace_period_are_kept(self):
+        orphan = default_storage.save('visitor_selfies/thumbnails/ab/cd/new.webp', ContentFile(b'webp'))
+        self.assertEqual(purge()['orphans'], 0)
+        self.assertTrue(default_storage.exists(orphan))
+
+
+class BucketStorage(InMemoryStorage):
+    """In-memory files with no local paths, as S3Storage has none."""
+
+    def path(self, name):
+        raise NotImplementedError("This backend doesn't support absolute paths.")
+
+    def _relative_path(self, name):
+        return os.path.relpath(super().path(name), self.location)
+
+
+class RemoteStorageMixin:
+    """
+    Runs a test case with STORAGES['default'] on a storage that has no local
+    paths, standing in for an S3-compatible bucket (MEDIA_STORAGE = 's3').
+    """
+
+    def setUp(self):
+        super().setUp()
+        storages = override_settings(STORAGES={
+            **django_settings.STORAGES, 'default': {'BACKEND': 'apps.uploads.tests.BucketStorage'},
+        })
+        storages.enable()
+        self.addCleanup(storages.disable)
+        with self.assertRaises(NotImplementedError):
+            default_storage.path('qrcodes')
+
+
+class RemoteStorageUploadTests(RemoteStorageMixin, UploadTests):
+    pass
+
+
+class RemoteMediaStorageTests(RemoteStorageMixin, MediaStorageTests):
+    pass
+
+
+class RemoteMediaRetentionTests(RemoteStorageMixin, MediaRetentionTests):
+    pass
@@ -0,0 +1,9 @@
+# backend/apps/uploads/urls.py
+
+from django.urls import path
+from .views import UploadCreateView, UploadDetailView
+
+urlpatterns = [
+    path('', UploadCreateView.as_view(), name='upload-create'),
+    path('<uuid:upload_id>/', UploadDetailView.as_view(), name='upload-detail'),
+]
@@ -0,0 +1,120 @@
+# backend/apps/uploads/views.py
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.views import APIView
+
+from apps.monitoring.query_budget import QueryBudgetMixin
+from . import chunks
+from .models import Upload
+from .serializers import UploadSerializer
+
+
+def _with_offset(response, upload):
+    response['Upload-Offset'] = str(upload.received)
+    response['Upload-Length'] = str(upload.size)
+    return response
+
+
+class UploadCreateView(QueryBudgetMixin, APIView):
+    """
+    Starts a resumable upload. POST {filename, size, content_type}; the
+    response carries the upload `id`, the `offset` to send from (0) and the
+    largest `chunk_size` accepted per PATCH.
+    """
+    # Visitors register their own passes without signing in, so new uploads
+    # are rate limited and each client may only have UPLOAD_MAX_OPEN open.
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'uploads'
+    query_budget = 2
+
+    def post(self, request):
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if request.user.is_authenticated:
+            owner, client_ip = request.user, None
+            open_uploads = Upload.objects.filter(owner=owner)
+        else:
+            # The address the throttle counts, which honours NUM_PROXIES.
+            owner, client_ip = None, ScopedRateThrottle().get_ident(request)
+            open_uploads = Upload.objects.filter(client_ip=client_ip)
+        if open_uploads.filter(status=Upload.UPLOADING).count() >= settings.UPLOAD_MAX_OPEN:
+            return Response(
+                {"detail": "Too many unfinished uploads; finish or abandon one first."},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+        upload = serializer.save(owner=owner, client_ip=client_ip)
+        return _with_offset(Response(serializer.data, status=status.HTTP_201_CREATED), upload)
+
+
+class UploadDetailView(QueryBudgetMixin, APIView):
+    """
+    GET (or HEAD) reports how much of the upload has arrived; resume from
+    `offset` after a dropped connection. PATCH appends a chunk: the raw bytes
+    as the body, with an `Upload-Offset` header saying where they start. A
+    PATCH whose offset is not the current one gets 409 and the current offset.
+
+    Once every byte is in, `status` moves to 'validating' and then to 'ready'
+    (or 'failed' with an `error`); pass the id of a ready upload to the
+    endpoint that takes the photo.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'upload_chunks'
+    query_budget = {'get': 1, 'head': 1, 'patch': 2}
+
+    def get_upload(self, request, upload_id):
+        upload = get_object_or_404(Upload, pk=upload_id)
+        # Unguessable ids stand in for ownership of anonymous uploads only.
+        if upload.owner_id is not None and upload.owner_id != request.user.pk:
+            return None
+        return upload
+
+    def get(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return _with_offset(Response(UploadSerializer(upload).data), upload)
+
+    def head(self, request, upload_id):
+        return self.get(request, upload_id)
+
+    def patch(self, request, upload_id):
+        upload = self.get_upload(request, upload_id)
+        if upload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        if upload.status != Upload.UPLOADING:
+            return _with_offset(
+                Response({"detail": f"Upload is {upload.status}."}, status=status.HTTP_409_CONFLICT), upload
+            )
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response(
+                {"detail": "Send the chunk's start in an integer Upload-Offset header."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if offset != upload.received:
+            return _with_offset(
+                Response({"detail": "Offset mismatch; resume from the current offset."}, status=status.HTTP_409_CONFLICT),
+                upload,
+            )
+        if length <= 0 or length > settings.UPLOAD_MAX_CHUNK_BYTES or offset + length > upload.size:
+            return _with_offset(Response(
+                {"detail": f"Chunks must be 1 to {settings.UPLOAD_MAX_CHUNK_BYTES} bytes and end within the upload."},
+                status=status.HTTP_400_BAD_REQUEST,
+            ), upload)
+
+        # Read straight from the request stream; request.data would load the body into memory.
+        if chunks.append(upload, offset, request.stream, length) is None:
+            upload.refresh_from_db(fields=['received', 'status'])
+            return _with_offset(
+                Response({"detail": "Offset mismatch; resume from the current offset."}, status=status.HTTP_409_CONFLICT),
+                upload,
+            )
+        return _with_offset(Response(UploadSerializer(upload).data), upload)
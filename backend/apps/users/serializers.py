@@ -31,4 +31,11 @@ class UserSerializer(serializers.ModelSerializer):
             'groups',
             # Add any other fields you want to expose from your CustomUser model
         ]
-        read_only_fields = ['is_staff', 'is_superuser', 'is_active', 'groups'] # These are usually set by admins
\ No newline at end of file
+        read_only_fields = ['is_staff', 'is_superuser', 'is_active', 'groups'] # These are usually set by admins
+
+
+class EmployeeNameSerializer(serializers.ModelSerializer):
+    """What anyone may see of an employee: who to pick on the public visitor form."""
+    class Meta:
+        model = CustomUser
+        fields = ['id', 'first_name', 'last_name']
@@ -72,3 +72,19 @@ def test_register_fcm_device():
 
     assert response.status_code == 201
     assert FCMDevice.objects.filter(user=user, registration_id='test_device_token_12345').exists()
+
+
+@pytest.mark.django_db
+def test_anonymous_employee_list_shows_names_only():
+    """
+    Tests that the public employee list gives names and ids, not usernames or groups.
+    """
+    User.objects.create_user(username='host', first_name='Anita', last_name='Shah', password='password123')
+    User.objects.create_user(username='service-account', password='password123')
+
+    response = APIClient().get('/api/users/employees/')
+
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'id': User.objects.get(username='host').id, 'first_name': 'Anita', 'last_name': 'Shah'},
+    ]
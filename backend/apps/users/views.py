@@ -1,5 +1,5 @@
 from rest_framework import generics, permissions
-from .serializers import UserSerializer, MyTokenObtainPairSerializer
+from .serializers import EmployeeNameSerializer, UserSerializer, MyTokenObtainPairSerializer
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.views import TokenObtainPairView
 
@@ -17,6 +17,15 @@ class CurrentUserView(generics.RetrieveAPIView):
 
 
 class EmployeeListView(generics.ListAPIView):
-    queryset = User.objects.filter(is_active=True).order_by('first_name', 'last_name')
-    serializer_class = UserSerializer
-    permission_classes = [permissions.AllowAny]
\ No newline at end of file
+    # Prefer /api/core-data/autocomplete/employees/ for pickers; this lists everyone.
+    # The public visitor form only gets names, and only of employees who have one.
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        employees = User.objects.filter(is_active=True).order_by('first_name', 'last_name')
+        if not self.request.user.is_authenticated:
+            return employees.exclude(first_name='', last_name='')
+        return employees.prefetch_related('groups')
+
+    def get_serializer_class(self):
+        return UserSerializer if self.request.user.is_authenticated else EmployeeNameSerializer
\ No newline at end of file
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-19 12:35
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# The keys as apps/vehicles/plates.py derived them when this migration was
+# written; copied so later changes there do not change what this backfills.
+NON_ALPHANUMERIC = re.compile(r'[^0-9A-Z]+')
+OCR_CONFUSIONS = str.maketrans({'O': '0', 'D': '0', 'Q': '0', 'I': '1', 'L': '1', 'B': '8', 'S': '5', 'Z': '2', 'G': '6'})
+
+
+def canonical(plate):
+    if not plate:
+        return ''
+    plate = unicodedata.normalize('NFKD', str(plate))
+    return NON_ALPHANUMERIC.sub('', plate.upper())
+
+
+def backfill_plate_keys(apps, schema_editor):
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    batch = []
+    for vehicle in Vehicle.objects.order_by('pk').iterator(chunk_size=1000):
+        vehicle.plate_key = canonical(vehicle.vehicle_number)
+        vehicle.plate_ocr_key = vehicle.plate_key.translate(OCR_CONFUSIONS)
+        batch.append(vehicle)
+        if len(batch) == 1000:
+            Vehicle.objects.bulk_update(batch, ['plate_key', 'plate_ocr_key'])
+            batch = []
+    Vehicle.objects.bulk_update(batch, ['plate_key', 'plate_ocr_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0002_vehicle_change_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='plate_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='vehicle',
+            name='plate_ocr_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_plate_keys, migrations.RunPython.noop),
+    ]
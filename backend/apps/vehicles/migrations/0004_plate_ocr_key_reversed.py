@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+def backfill_reversed_keys(apps, schema_editor):
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    batch = []
+    for vehicle in Vehicle.objects.only('pk', 'plate_ocr_key').order_by('pk').iterator(chunk_size=1000):
+        vehicle.plate_ocr_key_reversed = vehicle.plate_ocr_key[::-1]
+        batch.append(vehicle)
+        if len(batch) == 1000:
+            Vehicle.objects.bulk_update(batch, ['plate_ocr_key_reversed'])
+            batch = []
+    Vehicle.objects.bulk_update(batch, ['plate_ocr_key_reversed'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vehicles', '0003_plate_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='plate_ocr_key_reversed',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_reversed_keys, migrations.RunPython.noop),
+    ]
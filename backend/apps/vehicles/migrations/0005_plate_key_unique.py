@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-19 13:35
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_plates(apps, schema_editor):
+    """
+    Folds vehicles whose plates differ only in spacing or case into the
+    oldest of them before plate_key becomes unique: whatever referred to a
+    duplicate (gate passes, templates) moves to it, and the duplicates are
+    deleted and left as sync tombstones. Every merge is printed.
+    """
+    from apps.sync.models import backfill_change_seqs, reserve_change_seqs
+
+    Vehicle = apps.get_model('vehicles', 'Vehicle')
+    Tombstone = apps.get_model('sync', 'Tombstone')
+    ChangeCounter = apps.get_model('sync', 'ChangeCounter')
+    duplicated = list(
+        Vehicle.objects.exclude(plate_key='').values('plate_key')
+        .annotate(vehicles=Count('id')).filter(vehicles__gt=1).values_list('plate_key', flat=True)
+    )
+    if not duplicated:
+        return
+
+    referring = [relation for relation in Vehicle._meta.related_objects if relation.one_to_many]
+    for key in duplicated:
+        keep, *merged = Vehicle.objects.filter(plate_key=key).order_by('pk')
+        merged_ids = [vehicle.pk for vehicle in merged]
+        for relation in referring:
+            model, name = relation.related_model, relation.field.name
+            changes = {name: keep}
+            if any(field.name == 'change_seq' for field in model._meta.fields):
+                changes['change_seq'] = 0  # Renumbered below, so syncing clients see the new vehicle.
+            model.objects.filter(**{f'{name}__in': merged_ids}).update(**changes)
+        Vehicle.objects.filter(pk__in=merged_ids).delete()
+        Tombstone.objects.bulk_create([
+            Tombstone(resource='vehicles', object_id=pk, change_seq=seq)
+            for pk, seq in zip(merged_ids, reserve_change_seqs(len(merged_ids), counter_model=ChangeCounter))
+        ])
+        print(
+            f"\n  Merged vehicles {', '.join(vehicle.vehicle_number for vehicle in merged)} "
+            f"into #{keep.pk} {keep.vehicle_number} (same plate)."
+        )
+    for relation in referring:
+        if any(field.name == 'change_seq' for field in relation.related_model._meta.fields):
+            backfill_change_seqs(relation.related_model, counter_model=ChangeCounter)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_data', '0006_dataversion'),
+        ('gatepass', '0018_search_text'),
+        ('sync', '0003_scopechange'),
+        ('vehicles', '0004_plate_ocr_key_reversed'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_plates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='vehicle',
+            constraint=models.UniqueConstraint(condition=models.Q(('plate_key', ''), _negated=True), fields=('plate_key',), name='vehicle_plate_key_unique'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.db import models
+from apps.sync.models import ChangeTracked
 from apps.core_data.models import VehicleType
+from . import plates
 
-class Vehicle(models.Model):
+class Vehicle(ChangeTracked):
     vehicle_number = models.CharField(max_length=255, unique=True)
     type = models.ForeignKey(VehicleType, on_delete=models.CASCADE)
     make = models.CharField(max_length=255)
@@ -10,6 +12,27 @@ class Vehicle(models.Model):
     status = models.CharField(max_length=255)
     registration_date = models.DateField()
     notes = models.TextField(blank=True, null=True)
+    # Derived from vehicle_number for plate lookups (apps/vehicles/plates.py).
+    plate_key = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    plate_ocr_key = models.CharField(max_length=255, db_index=True, editable=False, default='')
+    # plate_ocr_key backwards, so a suffix is an indexed prefix search.
+    plate_ocr_key_reversed = models.CharField(max_length=255, db_index=True, editable=False, default='')
+
+    class Meta:
+        constraints = [
+            # "KA 01 AB 1234" and "ka01ab1234" are the same plate.
+            models.UniqueConstraint(
+                fields=['plate_key'], condition=~models.Q(plate_key=''), name='vehicle_plate_key_unique'
+            ),
+        ]
 
     def __str__(self):
         return self.vehicle_number
+
+    def save(self, *args, **kwargs):
+        self.plate_key = plates.canonical(self.vehicle_number)
+        self.plate_ocr_key = plates.ocr_key(self.vehicle_number)
+        self.plate_ocr_key_reversed = self.plate_ocr_key[::-1]
+        if kwargs.get('update_fields'):
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'plate_key', 'plate_ocr_key', 'plate_ocr_key_reversed'}
+        super().save(*args, **kwargs)
@@ -0,0 +1,70 @@
+# backend/apps/vehicles/plates.py
+#
+# Plate numbers are typed by people and read by ANPR cameras, so the same
+# plate arrives as "KA 01 AB 1234", "KA01AB1234" or "ka-01-ab-1234". Vehicles
+# store two keys derived from vehicle_number, both indexed:
+#
+# - plate_key: the canonical plate, uppercase letters and digits only;
+# - plate_ocr_key: plate_key with the characters cameras confuse (O/0/D/Q,
+#   I/1/L, B/8, S/5, Z/2, G/6) folded together, so a misread of one of those
+#   still finds the vehicle by exact match.
+#
+# lookup() tries plate_key, then plate_ocr_key, then vehicles one edit away
+# (a character misread, dropped or added). Those are looked for among the
+# vehicles sharing the first or the second half of the read (fuzzy_anchors),
+# found by prefix on the indexed plate_ocr_key and its reverse,
+# plate_ocr_key_reversed, and at most PLATE_FUZZY_MAX_CANDIDATES of them.
+
+import re
+import unicodedata
+
+NON_ALPHANUMERIC = re.compile(r'[^0-9A-Z]+')
+OCR_CONFUSIONS = str.maketrans({'O': '0', 'D': '0', 'Q': '0', 'I': '1', 'L': '1', 'B': '8', 'S': '5', 'Z': '2', 'G': '6'})
+
+EXACT = 'exact'
+OCR = 'ocr'
+FUZZY = 'fuzzy'
+
+
+def canonical(plate):
+    """`plate` as uppercase letters and digits only: 'ka-01 ab 1234' -> 'KA01AB1234'."""
+    if not plate:
+        return ''
+    plate = unicodedata.normalize('NFKD', str(plate))
+    return NON_ALPHANUMERIC.sub('', plate.upper())
+
+
+def ocr_key(plate):
+    """canonical(plate) with OCR-confusable characters folded together."""
+    return canonical(plate).translate(OCR_CONFUSIONS)
+
+
+def fuzzy_anchors(key):
+    """
+    (prefix, reversed suffix) of `key` such that every key one edit away
+    starts with the prefix or ends with the suffix: an edit before the middle
+    leaves the characters after it alone, and one after it those before.
+    """
+    half = len(key) // 2
+    return key[:half], key[half + 1:][::-1]
+
+
+def within_one_edit(a, b):
+    """Whether `a` becomes `b` with at most one substitution, insertion or deletion."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+            j += 1
+            continue
+        i += 1
+        j += 1
+    return edits + (len(b) - j) <= 1
@@ -1,7 +1,20 @@
 from rest_framework import serializers
 from .models import Vehicle
+from . import plates
 
 class VehicleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vehicle
         fields = '__all__'
+
+    def validate_vehicle_number(self, value):
+        key = plates.canonical(value)
+        if not key:
+            raise serializers.ValidationError("A plate needs letters or digits.")
+        others = Vehicle.objects.filter(plate_key=key)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        # "KA 01 AB 1234" and "ka01ab1234" are the same plate.
+        if others.exists():
+            raise serializers.ValidationError("A vehicle with this plate already exists.")
+        return value
@@ -1,3 +1,96 @@
-from django.test import TestCase
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.core_data.models import VehicleType
+from apps.gatepass.models import GatePass
+from apps.users.models import CustomUser
+from .models import Vehicle
+from . import plates
+
+
+class PlateTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='guard', password='password123')
+        self.vehicle_type = VehicleType.objects.create(name='Truck')
+        self.vehicle = self.create_vehicle('KA 01 AB 1234')
+        self.client.force_authenticate(user=self.user)
+
+    def create_vehicle(self, number):
+        return Vehicle.objects.create(
+            vehicle_number=number, type=self.vehicle_type, make='Make', model='Model',
+            capacity='1', status='Active', registration_date=date.today(),
+        )
+
+    def create_pass(self, starts_in, status=GatePass.APPROVED):
+        now = timezone.now()
+        return GatePass.objects.create(
+            person_name='Driver', person_phone='123', vehicle=self.vehicle, created_by=self.user, status=status,
+            entry_time=now + starts_in, exit_time=now + starts_in + timedelta(hours=4),
+        )
+
+    def lookup(self, plate):
+        return self.client.get(reverse('vehicle-lookup'), {'plate': plate})
+
+    def test_keys(self):
+        self.assertEqual((self.vehicle.plate_key, self.vehicle.plate_ocr_key), ('KA01AB1234', 'KA01A81234'))
+        self.assertEqual(plates.canonical('ka-01 ab.1234'), 'KA01AB1234')
+        self.assertTrue(plates.within_one_edit('KA01A81234', 'KA01A8124'))
+        self.assertFalse(plates.within_one_edit('KA01A81234', 'KA10A81234'))
+
+    def test_every_plate_one_edit_away_shares_an_anchor(self):
+        key = 'KA01A81234'
+        prefix, reversed_suffix = plates.fuzzy_anchors(key)
+        edits = {key[:i] + key[i + 1:] for i in range(len(key))}
+        edits |= {key[:i] + 'X' + key[i + skip:] for i in range(len(key) + 1) for skip in (0, 1)}
+        for other in edits:
+            self.assertTrue(other.startswith(prefix) or other[::-1].startswith(reversed_suffix), other)
+
+    def test_lookup_returns_the_vehicle_and_its_valid_passes_in_one_query(self):
+        current = self.create_pass(timedelta(hours=-1))
+        self.create_pass(timedelta(days=-3))
+        self.create_pass(timedelta(hours=-1), status=GatePass.PENDING)
+        with self.assertNumQueries(1):
+            response = self.lookup('ka-01-ab-1234')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['match'], response.data['vehicle']['id']), ('exact', self.vehicle.id))
+        self.assertEqual([gate_pass['id'] for gate_pass in response.data['gate_passes']], [current.id])
+
+    def test_ocr_misreads(self):
+        self.assertEqual(self.lookup('KAO1A81234').data['match'], 'ocr')
+        fuzzy = self.lookup('KA01AB124')
+        self.assertEqual((fuzzy.data['match'], fuzzy.data['vehicle']['id'], fuzzy.data['gate_passes']), ('fuzzy', self.vehicle.id, []))
+        # A misread state code is found from the rest of the plate.
+        self.assertEqual(self.lookup('XA01AB1234').data['vehicle']['id'], self.vehicle.id)
+        self.assertEqual(self.lookup('MH12XY9999').status_code, 404)
+
+        self.create_vehicle('KA01AB1235')
+        ambiguous = self.lookup('KA01AB123')
+        self.assertEqual(ambiguous.status_code, 404)
+        self.assertEqual(sorted(ambiguous.data['candidates']), ['KA 01 AB 1234', 'KA01AB1235'])
+        # An exact match beats its OCR look-alikes.
+        self.create_vehicle('KA01A81234')
+        self.assertEqual(self.lookup('KA01AB1234').data['vehicle']['id'], self.vehicle.id)
+
+    @override_settings(PLATE_FUZZY_MAX_CANDIDATES=2)
+    def test_too_many_fuzzy_candidates_are_reported_as_ambiguous(self):
+        for number in ('KA01AB1111', 'KA01AB2222', 'KA01AB3333'):
+            self.create_vehicle(number)
+        response = self.lookup('KA01AB124')
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('Too many', response.data['detail'])
+
+    def test_the_same_plate_cannot_be_registered_twice(self):
+        response = self.client.post(reverse('vehicle-list'), {
+            'vehicle_number': 'ka01ab1234', 'type': self.vehicle_type.id, 'make': 'Make', 'model': 'Model',
+            'capacity': '1', 'status': 'Active', 'registration_date': date.today().isoformat(),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vehicle_number', response.data)
+        # Nor through the ORM, which the serializer check does not cover.
+        with self.assertRaises(IntegrityError):
+            self.create_vehicle('KA-01-AB-1234')
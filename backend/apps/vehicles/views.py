@@ -1,11 +1,109 @@
 # backend/apps/vehicles/views.py
 
-from rest_framework import viewsets, permissions
+from django.conf import settings
+from django.db.models import FilteredRelation, Q
+from django.db.models.functions import Length
+from django.utils import timezone
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from apps.gatepass.expiry import grace
+from apps.gatepass.models import GatePass
+from apps.monitoring.query_budget import QueryBudgetMixin
+from apps.sync.conditional import ConditionalGetMixin
+from . import plates
 from .models import Vehicle
 from .serializers import VehicleSerializer
 
+LOOKUP_VEHICLE_FIELDS = ('id', 'vehicle_number', 'type_id', 'make', 'model', 'status')
+LOOKUP_PASS_FIELDS = ('id', 'person_name', 'driver_id', 'gate_id', 'entry_time', 'exit_time', 'presence')
+
+
+def with_valid_passes(vehicles, now):
+    """
+    One row per vehicle and currently valid pass (or per vehicle, without
+    one): a LEFT JOIN restricted to approved passes inside their window.
+    """
+    slack = grace()
+    valid = FilteredRelation('gatepasses', condition=Q(
+        gatepasses__status=GatePass.APPROVED,
+        gatepasses__entry_time__lte=now + slack, gatepasses__exit_time__gte=now - slack,
+    ))
+    return vehicles.annotate(valid_pass=valid).values(
+        *LOOKUP_VEHICLE_FIELDS, *(f'valid_pass__{field}' for field in LOOKUP_PASS_FIELDS),
+    ).order_by('id', 'valid_pass__entry_time')
+
+
+def group_rows(rows):
+    """{vehicle id: (vehicle, [passes])} from with_valid_passes() rows."""
+    vehicles = {}
+    for row in rows:
+        vehicle, passes = vehicles.setdefault(row['id'], ({field: row[field] for field in LOOKUP_VEHICLE_FIELDS}, []))
+        if row['valid_pass__id'] is not None:
+            passes.append({field: row[f'valid_pass__{field}'] for field in LOOKUP_PASS_FIELDS})
+    return vehicles
+
+
 # Vehicle ViewSet - Accessible only by Admins/Staff
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Vehicle.objects.all()
     serializer_class = VehicleSerializer
-    permission_classes = [permissions.IsAuthenticated] # Only authenticated users can manage vehicles
\ No newline at end of file
+    permission_classes = [permissions.IsAuthenticated] # Only authenticated users can manage vehicles
+    # An exact or OCR-equivalent plate is one query; a fuzzy match takes three.
+    query_budget = {'lookup': 3}
+
+    @action(detail=False, methods=['get'])
+    def lookup(self, request):
+        """
+        The vehicle with the plate in `?plate=` (any spacing or case) and its
+        currently valid gate passes. `match` says how it was found: 'exact',
+        'ocr' (only up to characters cameras confuse, like O and 0) or
+        'fuzzy' (one character misread, dropped or added). A plate matching
+        several vehicles equally well, or too many vehicles to compare,
+        returns 404 with the `candidates` found.
+        """
+        key = plates.canonical(request.query_params.get('plate'))
+        if len(key) < 2:
+            return Response({"detail": "Send the plate in ?plate=."}, status=status.HTTP_400_BAD_REQUEST)
+        ocr_key = plates.ocr_key(key)
+        now = timezone.now()
+
+        found = group_rows(with_valid_passes(
+            Vehicle.objects.filter(Q(plate_key=key) | Q(plate_ocr_key=ocr_key)), now,
+        ))
+        exact = {pk: match for pk, match in found.items() if plates.canonical(match[0]['vehicle_number']) == key}
+        match, candidates = (plates.EXACT, exact) if exact else (plates.OCR, found)
+
+        truncated = False
+        if not candidates and len(ocr_key) >= 5:
+            prefix, reversed_suffix = plates.fuzzy_anchors(ocr_key)
+            limit = settings.PLATE_FUZZY_MAX_CANDIDATES
+            near = list(Vehicle.objects.alias(ocr_length=Length('plate_ocr_key')).filter(
+                Q(plate_ocr_key__startswith=prefix) | Q(plate_ocr_key_reversed__startswith=reversed_suffix),
+                ocr_length__range=(len(ocr_key) - 1, len(ocr_key) + 1),
+            ).order_by('plate_ocr_key', 'id').values_list('id', 'plate_ocr_key', 'vehicle_number')[:limit + 1])
+            # Past the cap the match may be among the vehicles not compared,
+            # so whatever was found is only a partial list.
+            truncated = len(near) > limit
+            near = {pk: number for pk, other, number in near[:limit] if plates.within_one_edit(ocr_key, other)}
+            match = plates.FUZZY
+            if len(near) == 1 and not truncated:
+                candidates = group_rows(with_valid_passes(Vehicle.objects.filter(pk__in=near), now))
+            else:
+                candidates = {pk: ({'id': pk, 'vehicle_number': number}, []) for pk, number in near.items()}
+
+        if len(candidates) != 1 or truncated:
+            if truncated:
+                detail = "Too many vehicles look like this plate to pick one; check the plate."
+            elif candidates:
+                detail = "Several vehicles match this plate."
+            else:
+                detail = "No vehicle with this plate."
+            return Response({
+                "detail": detail,
+                "plate": key,
+                "candidates": [vehicle['vehicle_number'] for vehicle, _ in candidates.values()],
+            }, status=status.HTTP_404_NOT_FOUND)
+        (vehicle, passes), = candidates.values()
+        return Response({"plate": key, "match": match, "vehicle": vehicle, "gate_passes": passes})
@@ -0,0 +1,95 @@
+"""
+Requests-per-second benchmark for the scan and list endpoints, used to compare
+database connection settings (fresh connection per request, persistent
+connections and psycopg's pool) against a local PostgreSQL.
+
+Start the API once per configuration and run this script against it, e.g.:
+
+    # 1. fresh connection per request
+    DB_CONN_MAX_AGE=0 gunicorn gatepass_project.wsgi -w 4 --threads 4
+    python benchmarks/db_pool.py --label no-persistence --gatepass-id 1
+
+    # 2. persistent connections
+    DB_CONN_MAX_AGE=60 gunicorn gatepass_project.wsgi -w 4 --threads 4
+    python benchmarks/db_pool.py --label persistent --gatepass-id 1
+
+    # 3. psycopg pool (requires `pip install "psycopg[binary,pool]"`)
+    DB_POOL=True gunicorn gatepass_project.wsgi -w 4 --threads 4
+    python benchmarks/db_pool.py --label pool --gatepass-id 1
+
+    python benchmarks/db_pool.py --compare
+
+Django's development server starts a new thread for every request, which throws
+away persistent connections, so use gunicorn (or another WSGI/ASGI server) for
+meaningful numbers. Results are appended to benchmarks/results/db_pool.jsonl.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from harness import format_result, obtain_token, run_load
+
+RESULTS_FILE = Path(__file__).resolve().parent / 'results' / 'db_pool.jsonl'
+
+
+def benchmark(args):
+    token = obtain_token(args.base_url, args.username, args.password)
+    headers = {'Authorization': f'Bearer {token}'}
+    scan_body = {'qr_code_data': json.dumps({'gatepass_id': args.gatepass_id})}
+
+    def scan(session, worker):
+        return session.post(f'{args.base_url}/api/gate-operations/scan_qr_code/', json=scan_body, headers=headers)
+
+    def list_passes(session, worker):
+        return session.get(f'{args.base_url}/api/gatepass/gatepasses/', headers=headers)
+
+    results = [
+        run_load('scan', scan, args.concurrency, args.duration),
+        run_load('gatepass-list', list_passes, args.concurrency, args.duration),
+    ]
+
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with RESULTS_FILE.open('a') as fh:
+        for result in results:
+            result.update(label=args.label, timestamp=time.time())
+            fh.write(json.dumps(result) + '\n')
+            print(f'{args.label:<16} {format_result(result)}')
+
+
+def compare():
+    if not RESULTS_FILE.exists():
+        print('No results recorded yet.')
+        return
+    latest = {}
+    for line in RESULTS_FILE.read_text().splitlines():
+        result = json.loads(line)
+        latest[(result['label'], result['endpoint'])] = result
+    print(f"{'configuration':<16} {'endpoint':<14} {'req/s':>8}")
+    for (label, endpoint), result in sorted(latest.items()):
+        print(f"{label:<16} {endpoint:<14} {result['rps']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--gatepass-id', type=int, help='ID of an approved gate pass to scan.')
+    parser.add_argument('--label', default='default', help='Name of the connection configuration under test.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds to run each endpoint.')
+    parser.add_argument('--compare', action='store_true', help='Print the latest result for every label and exit.')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare()
+    elif args.gatepass_id is None:
+        parser.error('--gatepass-id is required when running a benchmark.')
+    else:
+        benchmark(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Shared load-generation helpers for the benchmark scripts in this directory.
+"""
+
+import subprocess
+import threading
+import time
+
+import requests
+
+
+def obtain_token(base_url, username, password):
+    response = requests.post(f'{base_url}/api/token/', data={'username': username, 'password': password}, timeout=30)
+    response.raise_for_status()
+    return response.json()['access']
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(name, send, concurrency, duration):
+    """
+    Calls `send(session, worker)` from `concurrency` threads for `duration`
+    seconds and summarises throughput and latency. `send` returns a
+    `requests.Response`, or None when it has run out of work.
+
+    Queries per request are read from the X-Query-Count header, which the API
+    adds when METRICS_QUERY_COUNT_HEADER is enabled.
+    """
+    latencies = [[] for _ in range(concurrency)]
+    queries = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = send(session, index)
+            if response is None:
+                break
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                errors[index] += 1
+                continue
+            latencies[index].append(elapsed)
+            if 'X-Query-Count' in response.headers:
+                queries[index].append(int(response.headers['X-Query-Count']))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_latencies = sorted(value for values in latencies for value in values)
+    all_queries = [value for values in queries for value in values]
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'endpoint': name,
+        'concurrency': concurrency,
+        'requests': len(all_latencies),
+        'errors': sum(errors),
+        'rps': round(len(all_latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': ms(percentile(all_latencies, 0.50)),
+        'p90_ms': ms(percentile(all_latencies, 0.90)),
+        'p99_ms': ms(percentile(all_latencies, 0.99)),
+        'queries_per_request': round(sum(all_queries) / len(all_queries), 2) if all_queries else None,
+    }
+
+
+def format_result(result):
+    queries = result['queries_per_request']
+    return (
+        f"{result['endpoint']:<28} {result['rps']:>9} req/s  "
+        f"p50 {result['p50_ms']} ms  p90 {result['p90_ms']} ms  p99 {result['p99_ms']} ms  "
+        f"queries/req {queries if queries is not None else '-'}  errors {result['errors']}"
+    )
@@ -0,0 +1,251 @@
+"""
+Scenario benchmarks for the gate-pass API.
+
+Generate data first (deterministic for a given --seed, so runs are comparable):
+
+    python manage.py seed_benchmark_data --passes 100000 --logs 1000000 --users 2000
+
+Then run one or more scenarios against a server you started yourself, or let
+the script start one with --serve:
+
+    python benchmarks/run.py --serve gunicorn
+    python benchmarks/run.py --base-url http://127.0.0.1:8000 --scenario scan-storm
+
+Each run writes benchmarks/results/<timestamp>-<git revision>.json. Compare
+two runs (e.g. before and after a change) with:
+
+    python benchmarks/run.py --compare results/old.json results/new.json
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from harness import format_result, git_revision, obtain_token, run_load
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+class Context:
+    def __init__(self, args, manifest):
+        self.base_url = args.base_url.rstrip('/')
+        self.concurrency = args.concurrency
+        self.duration = args.duration
+        self.manifest = manifest
+        self.admin_headers = self._headers(manifest['admin'])
+        self.guard_headers = self._headers(manifest['guard'])
+
+    def _headers(self, credentials):
+        token = obtain_token(self.base_url, credentials['username'], credentials['password'])
+        return {'Authorization': f'Bearer {token}'}
+
+    def url(self, path):
+        return f'{self.base_url}{path}'
+
+
+def scan_storm(ctx):
+    """Guards scanning approved passes as fast as the gates allow."""
+    pass_ids = ctx.manifest['approved_pass_ids']
+    rngs = [random.Random(i) for i in range(ctx.concurrency)]
+
+    def scan(session, worker):
+        body = {'qr_code_data': json.dumps({'gatepass_id': rngs[worker].choice(pass_ids)})}
+        return session.post(ctx.url('/api/gate-operations/scan_qr_code/'), json=body, headers=ctx.guard_headers)
+
+    return [run_load('scan', scan, ctx.concurrency, ctx.duration)]
+
+
+def morning_approvals(ctx):
+    """Admins working through the pending queue: list passes, approve each pending one."""
+    pending = iter(ctx.manifest['pending_pass_ids'])  # shared by all workers; next() is atomic under the GIL
+
+    def list_passes(session, worker):
+        return session.get(ctx.url('/api/gatepass/gatepasses/'), headers=ctx.admin_headers)
+
+    def approve(session, worker):
+        pass_id = next(pending, None)
+        if pass_id is None:
+            return None
+        return session.post(ctx.url(f'/api/gatepass/gatepasses/{pass_id}/approve/'), headers=ctx.admin_headers)
+
+    return [
+        run_load('gatepass-list', list_passes, ctx.concurrency, ctx.duration),
+        run_load('gatepass-approve', approve, ctx.concurrency, ctx.duration),
+    ]
+
+
+def report_exports(ctx):
+    """Monthly CSV exports and the security incident report."""
+    params = {'format': 'csv', 'start_date': (date.today() - timedelta(days=30)).isoformat()}
+
+    def export_daily(session, worker):
+        return session.get(ctx.url('/api/reports/export/daily-summary/'), params=params, headers=ctx.admin_headers)
+
+    def export_incidents(session, worker):
+        return session.get(ctx.url('/api/reports/export/security-incidents/'), params=params, headers=ctx.admin_headers)
+
+    concurrency = max(1, ctx.concurrency // 4)
+    return [
+        run_load('export-daily-summary', export_daily, concurrency, ctx.duration),
+        run_load('export-security-incidents', export_incidents, concurrency, ctx.duration),
+    ]
+
+
+def dashboard_polling(ctx):
+    """Control-room screens refreshing the dashboards."""
+    def gate_dashboard(session, worker):
+        return session.get(ctx.url('/api/gate-operations/dashboard/'), headers=ctx.admin_headers)
+
+    def summary(session, worker):
+        return session.get(ctx.url('/api/gatepass/dashboard-summary/'), headers=ctx.admin_headers)
+
+    return [
+        run_load('gate-operations-dashboard', gate_dashboard, ctx.concurrency, ctx.duration),
+        run_load('dashboard-summary', summary, ctx.concurrency, ctx.duration),
+    ]
+
+
+def visitor_search(ctx):
+    """Guards looking passes up by part of a name, a phone tail or a plate (seed with --passes 1000000)."""
+    terms = ctx.manifest['search_terms']
+    rngs = [random.Random(i) for i in range(ctx.concurrency)]
+
+    def search(session, worker):
+        params = {'q': rngs[worker].choice(terms)}
+        return session.get(ctx.url('/api/gatepass/gatepasses/'), params=params, headers=ctx.admin_headers)
+
+    return [run_load('gatepass-search', search, ctx.concurrency, ctx.duration)]
+
+
+def anpr_reads(ctx):
+    """Gate cameras looking up the plates they read, spelled the way OCR returns them."""
+    plates = ctx.manifest['plates']
+    rngs = [random.Random(i) for i in range(ctx.concurrency)]
+
+    def lookup(session, worker):
+        params = {'plate': rngs[worker].choice(plates).replace(' ', '').lower()}
+        return session.get(ctx.url('/api/vehicles/lookup/'), params=params, headers=ctx.guard_headers)
+
+    return [run_load('plate-lookup', lookup, ctx.concurrency, ctx.duration)]
+
+
+SCENARIOS = {
+    'scan-storm': scan_storm,
+    'morning-approvals': morning_approvals,
+    'report-exports': report_exports,
+    'dashboard-polling': dashboard_polling,
+    'visitor-search': visitor_search,
+    'anpr-reads': anpr_reads,
+}
+
+
+def start_server(kind, address, settings_module, workers):
+    host, port = address.split(':')
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=settings_module,
+        METRICS_QUERY_COUNT_HEADER='True',
+        QUERY_BUDGET_MODE='off',
+    )
+    commands = {
+        'runserver': [sys.executable, 'manage.py', 'runserver', '--noreload', address],
+        'gunicorn': ['gunicorn', 'gatepass_project.wsgi', '-b', address, '-w', str(workers), '--threads', '4'],
+        'uvicorn': ['uvicorn', 'gatepass_project.asgi:application', '--host', host, '--port', port,
+                    '--workers', str(workers)],
+    }
+    process = subprocess.Popen(commands[kind], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, int(port)), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{kind} did not start listening on {address}')
+
+
+def compare(old_path, new_path):
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    old_results = {(r['scenario'], r['endpoint']): r for r in old['results']}
+    print(f"{old['revision']} -> {new['revision']}")
+    for result in new['results']:
+        before = old_results.get((result['scenario'], result['endpoint']))
+        if not before:
+            continue
+        rps_change = (result['rps'] - before['rps']) / before['rps'] * 100 if before['rps'] else 0.0
+        print(
+            f"{result['scenario']:<18} {result['endpoint']:<28} "
+            f"req/s {before['rps']} -> {result['rps']} ({rps_change:+.1f}%)  "
+            f"p99 {before['p99_ms']} -> {result['p99_ms']} ms  "
+            f"queries/req {before['queries_per_request']} -> {result['queries_per_request']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='Scenario to run; repeat for several. Defaults to all.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run each endpoint.')
+    parser.add_argument('--manifest', default=str(RESULTS_DIR / 'dataset.json'))
+    parser.add_argument('--serve', choices=['runserver', 'gunicorn', 'uvicorn'],
+                        help='Start this server on --base-url for the duration of the run.')
+    parser.add_argument('--settings', default='gatepass_project.settings.dev',
+                        help='DJANGO_SETTINGS_MODULE for the server started with --serve.')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compare two result files and exit.')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    manifest = json.loads(Path(args.manifest).read_text())
+    server = None
+    if args.serve:
+        server = start_server(args.serve, args.base_url.split('//', 1)[-1].rstrip('/'), args.settings, args.workers)
+
+    try:
+        ctx = Context(args, manifest)
+        results = []
+        for name in args.scenario or sorted(SCENARIOS):
+            print(f'== {name}')
+            for result in SCENARIOS[name](ctx):
+                result['scenario'] = name
+                results.append(result)
+                print(format_result(result))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    revision = git_revision()
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    output = RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json"
+    output.write_text(json.dumps({
+        'revision': revision,
+        'timestamp': time.time(),
+        'server': args.serve or args.base_url,
+        'concurrency': args.concurrency,
+        'duration': args.duration,
+        'dataset': manifest.get('counts'),
+        'seed': manifest.get('seed'),
+        'results': results,
+    }, indent=2))
+    print(f'Results written to {output}')
+
+
+if __name__ == '__main__':
+    main()
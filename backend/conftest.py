@@ -0,0 +1,81 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(settings):
+    """
+    Fails any test whose request makes a view exceed its declared query budget
+    (see apps/monitoring/query_budget.py).
+    """
+    settings.QUERY_BUDGET_MODE = 'raise'
+
+
+@pytest.fixture(autouse=True)
+def process_selfies_inline(settings):
+    """No worker processes in tests; selfies are processed when the test's on_commit callbacks run."""
+    settings.SELFIE_PROCESSING = 'sync'
+
+
+@pytest.fixture(autouse=True)
+def forget_recent_scans():
+    """Scans remembered for debounce (apps/gate_operations/debounce.py) must not leak between tests."""
+    from apps.gate_operations.debounce import recent_scans
+    recent_scans.clear()
+    yield
+    recent_scans.clear()
+
+
+@pytest.fixture(autouse=True)
+def validate_uploads_inline(settings):
+    """Finished uploads (apps/uploads/) are validated when the test's on_commit callbacks run."""
+    settings.UPLOAD_VALIDATION = 'sync'
+
+
+@pytest.fixture(autouse=True)
+def forget_autocomplete_results():
+    """Autocomplete results cached in-process (apps/core_data/autocomplete.py) must not leak between tests."""
+    from apps.core_data.autocomplete import recent_prefixes
+    recent_prefixes.clear()
+    yield
+    recent_prefixes.clear()
+
+
+@pytest.fixture(autouse=True)
+def forget_preapproved_nids():
+    """Each test builds its own pre-approved NID filter (apps/gatepass/preapproved.py)."""
+    from apps.gatepass import preapproved
+    preapproved.forget()
+    yield
+    preapproved.forget()
+
+
+@pytest.fixture(autouse=True)
+def forget_reference_data():
+    """Reference tables cached in-process (apps/core_data/reference.py) must not leak between tests."""
+    from apps.core_data import reference
+    reference.forget()
+    yield
+    reference.forget()
+
+
+@pytest.fixture(autouse=True)
+def clear_default_cache():
+    """Throttle counts and everything else in the default cache must not leak between tests."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def forget_data_versions(settings):
+    """
+    Versions read from the database (apps/core_data/versions.py) must not
+    outlive the test's transaction; within a test they are only reread when
+    the test asks for it, so query counts do not depend on timing.
+    """
+    from apps.core_data import versions
+    settings.DATA_VERSION_TTL = 3600
+    versions.forget()
+    yield
+    versions.forget()
@@ -2,6 +2,9 @@
 ASGI config for gatepass_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve the project through it (e.g. ``uvicorn gatepass_project.asgi:application``)
+so long-lived streams such as /api/gate-operations/events/ do not tie up a
+worker thread each.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
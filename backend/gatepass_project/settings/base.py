@@ -48,10 +48,15 @@ INSTALLED_APPS = [
     "apps.gatepass.apps.GatepassConfig",
     "apps.gate_operations.apps.GateOperationsConfig",
     "apps.reports.apps.ReportsConfig",
+    "apps.monitoring.apps.MonitoringConfig",
+    "apps.sync.apps.SyncConfig",
+    "apps.uploads.apps.UploadsConfig",
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'apps.monitoring.middleware.MetricsMiddleware',
+    'apps.monitoring.middleware.TracingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware', # Must be before CommonMiddleware
     'django.middleware.common.CommonMiddleware',
@@ -114,6 +119,30 @@ except (ImportError, psycopg2.OperationalError):
         }
     }
 
+# Connection persistence and pooling (PostgreSQL only).
+# DB_CONN_MAX_AGE keeps a connection open for that many seconds between requests
+# (0 closes it at the end of every request). DB_POOL=True switches to psycopg 3's
+# built-in connection pool instead; Django requires CONN_MAX_AGE = 0 with a pool,
+# and the pool needs the `psycopg[pool]` package rather than psycopg2.
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() in ('true', '1', 'yes')
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL:
+        try:
+            import psycopg_pool  # noqa: F401
+        except ImportError:
+            raise ValueError("DB_POOL=True needs psycopg 3 with its pool: pip install 'psycopg[binary,pool]'.")
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '0'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -154,6 +183,30 @@ STATIC_ROOT = BASE_DIR / 'static_collected' # Directory for collected static fil
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media' # Directory for user uploaded media
 
+# Where media files live (see apps/uploads/storage.py). 'local' keeps them under MEDIA_ROOT;
+# 's3' puts them in an S3-compatible bucket (AWS, or MinIO as a local stand-in) and needs the
+# django-storages and boto3 packages.
+MEDIA_STORAGE = os.environ.get("MEDIA_STORAGE", "local")
+STORAGES = {
+    "default": {"BACKEND": "apps.uploads.storage.MediaStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+if MEDIA_STORAGE == 's3':
+    STORAGES["default"] = {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": os.environ.get("MEDIA_S3_BUCKET", "gatepass-media"),
+            "endpoint_url": os.environ.get("MEDIA_S3_ENDPOINT_URL") or None,
+            "region_name": os.environ.get("MEDIA_S3_REGION") or None,
+            "access_key": os.environ.get("MEDIA_S3_ACCESS_KEY_ID"),
+            "secret_key": os.environ.get("MEDIA_S3_SECRET_ACCESS_KEY"),
+            # Media names are unique (sharded()), so skip the existence check on every save.
+            "file_overwrite": True,
+            "default_acl": None,
+            "querystring_auth": True,
+        },
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -174,6 +227,11 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 25, # Default page size for list views
+    # Rates for views with a throttle_scope (ScopedRateThrottle), counted per client IP in the default cache.
+    'DEFAULT_THROTTLE_RATES': {
+        'uploads': os.environ.get('UPLOAD_THROTTLE_RATE', '60/hour'),
+        'upload_chunks': os.environ.get('UPLOAD_CHUNK_THROTTLE_RATE', '300/minute'),
+    },
 }
 
 # JWT settings
@@ -230,22 +288,150 @@ CORS_ALLOW_HEADERS = [
 ]
 
 import sentry_sdk
+from apps.monitoring.sampling import build_traces_sampler, build_transaction_filter, parse_sample_rules
 
 SENTRY_DSN = os.environ.get("SENTRY_DSN")
 
+# Sentry sampling is chosen per endpoint: scans are traced at SENTRY_SCAN_TRACES_SAMPLE_RATE
+# but only sent when slower than SENTRY_SLOW_SCAN_MS (or failed), list calls are sampled at
+# SENTRY_LIST_TRACES_SAMPLE_RATE and everything else at SENTRY_TRACES_SAMPLE_RATE.
+# SENTRY_TRACES_SAMPLE_RULES adds overrides such as "GET:/api/reports/=0.5,*:/api/token/=0".
+SENTRY_TRACES_SAMPLE_RATE = float(os.environ.get("SENTRY_TRACES_SAMPLE_RATE", "0.05"))
+SENTRY_SCAN_TRACES_SAMPLE_RATE = float(os.environ.get("SENTRY_SCAN_TRACES_SAMPLE_RATE", "1.0"))
+SENTRY_LIST_TRACES_SAMPLE_RATE = float(os.environ.get("SENTRY_LIST_TRACES_SAMPLE_RATE", "0.01"))
+SENTRY_SLOW_SCAN_MS = float(os.environ.get("SENTRY_SLOW_SCAN_MS", "300"))
+# Profiling is relative to sampled transactions and is the expensive part; keep it off by default.
+SENTRY_PROFILES_SAMPLE_RATE = float(os.environ.get("SENTRY_PROFILES_SAMPLE_RATE", "0.0"))
+
 if SENTRY_DSN:
     sentry_sdk.init(
         dsn=SENTRY_DSN,
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for performance monitoring.
-        traces_sample_rate=1.0,
-        # Set profiles_sample_rate to 1.0 to profile 100%
-        # of sampled transactions.
-        # We recommend adjusting this value in production.
-        profiles_sample_rate=1.0,
+        traces_sampler=build_traces_sampler(
+            default_rate=SENTRY_TRACES_SAMPLE_RATE,
+            scan_rate=SENTRY_SCAN_TRACES_SAMPLE_RATE,
+            list_rate=SENTRY_LIST_TRACES_SAMPLE_RATE,
+            rules=parse_sample_rules(os.environ.get("SENTRY_TRACES_SAMPLE_RULES")),
+        ),
+        before_send_transaction=build_transaction_filter(SENTRY_SLOW_SCAN_MS),
+        profiles_sample_rate=SENTRY_PROFILES_SAMPLE_RATE,
         send_default_pii=True,
     )
 
+# In-process tracing (apps/monitoring/tracing.py). Works without a Sentry DSN: a sampled
+# fraction of requests, plus every span slower than TRACING_SLOW_MS, is kept in a ring
+# buffer of TRACING_BUFFER_SIZE spans and can be read at /api/monitoring/traces/.
+TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "True").lower() in ("true", "1", "yes")
+TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", "0.01"))
+TRACING_SLOW_MS = float(os.environ.get("TRACING_SLOW_MS", "500"))
+TRACING_BUFFER_SIZE = int(os.environ.get("TRACING_BUFFER_SIZE", "500"))
+
+# Per-view query budgets (apps/monitoring/query_budget.py): 'off', 'warn' or 'raise'.
+QUERY_BUDGET_MODE = os.environ.get("QUERY_BUDGET_MODE", "off")
+
+# Prometheus metrics are served at /metrics to scrapers sending "Authorization: Bearer <METRICS_TOKEN>"
+# (bearer_token in the Prometheus scrape config). Unset, the endpoint refuses everyone.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Adds an X-Query-Count header to every response; used by the benchmark suite in benchmarks/.
+METRICS_QUERY_COUNT_HEADER = os.environ.get("METRICS_QUERY_COUNT_HEADER", "False").lower() in ("true", "1", "yes")
+
+# Live gate event stream (apps/gate_operations/events.py), served at /api/gate-operations/events/.
+# Set a Redis URL when running more than one server process so every process sees every event.
+GATE_EVENTS_BROKER_URL = os.environ.get("GATE_EVENTS_BROKER_URL", "")
+# Seconds between keep-alive comments on an idle stream.
+GATE_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("GATE_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# Offline scanner snapshots (apps/gate_operations/offline.py) are signed with this key,
+# which must also be provisioned on the scanners. It is a key of its own, never SECRET_KEY:
+# a scanner holding SECRET_KEY could forge sessions, JWTs and password reset tokens.
+OFFLINE_SNAPSHOT_KEY = os.environ.get("OFFLINE_SNAPSHOT_KEY", "default-insecure-offline-key-for-dev-only")
+OFFLINE_SNAPSHOT_CACHE_SECONDS = int(os.environ.get("OFFLINE_SNAPSHOT_CACHE_SECONDS", "300"))
+OFFLINE_UPLOAD_MAX_EVENTS = int(os.environ.get("OFFLINE_UPLOAD_MAX_EVENTS", "5000"))
+# Largest batch accepted by /api/gate-operations/scan-batch/.
+SCAN_BATCH_MAX_EVENTS = int(os.environ.get("SCAN_BATCH_MAX_EVENTS", "500"))
+# Scan debounce and anti-passback (apps/gate_operations/debounce.py). A repeat scan of a pass at the
+# same gate within SCAN_DEBOUNCE_SECONDS gets the first scan's answer and is not logged again; a scan at
+# another gate within SCAN_ANTI_PASSBACK_SECONDS is refused. 0 turns either check off.
+SCAN_DEBOUNCE_SECONDS = float(os.environ.get("SCAN_DEBOUNCE_SECONDS", "5"))
+SCAN_ANTI_PASSBACK_SECONDS = float(os.environ.get("SCAN_ANTI_PASSBACK_SECONDS", "30"))
+# Cache alias shared by all server processes for recent scans; empty keeps them per process only.
+SCAN_DEBOUNCE_CACHE = os.environ.get("SCAN_DEBOUNCE_CACHE", "")
+
+# Buffered GateLog writer for QR scans (apps/gate_operations/log_writer.py). When on, scan logs are
+# journaled to GATE_LOG_JOURNAL_DIR and written in bulk every GATE_LOG_FLUSH_RECORDS rows or
+# GATE_LOG_FLUSH_MS milliseconds. Scans at the comma-separated GATE_LOG_STRICT_GATES ids are always
+# written before the scan is answered.
+GATE_LOG_BUFFERED = os.environ.get("GATE_LOG_BUFFERED", "False").lower() in ("true", "1", "yes")
+GATE_LOG_FLUSH_RECORDS = int(os.environ.get("GATE_LOG_FLUSH_RECORDS", "200"))
+GATE_LOG_FLUSH_MS = int(os.environ.get("GATE_LOG_FLUSH_MS", "250"))
+GATE_LOG_JOURNAL_DIR = os.environ.get("GATE_LOG_JOURNAL_DIR", str(BASE_DIR / 'logs' / 'gatelog-journal'))
+GATE_LOG_STRICT_GATES = [gate for gate in os.environ.get("GATE_LOG_STRICT_GATES", "").split(",") if gate]
+# Identical failed scans (same guard, gate, payload and reason) this many seconds apart or less are
+# counted on a single GateLog row instead of one row each; 0 stores every failure separately.
+SCAN_FAILURE_AGGREGATE_SECONDS = int(os.environ.get("SCAN_FAILURE_AGGREGATE_SECONDS", "300"))
+
+# Gate pass validity (apps/gatepass/expiry.py): scans are accepted this many minutes either side of a
+# pass's entry/exit window, and `manage.py expire_gate_passes` expires approved passes past it in
+# chunks of GATE_PASS_EXPIRY_CHUNK_SIZE.
+GATE_PASS_VALIDITY_GRACE_MINUTES = int(os.environ.get("GATE_PASS_VALIDITY_GRACE_MINUTES", "15"))
+GATE_PASS_EXPIRY_CHUNK_SIZE = int(os.environ.get("GATE_PASS_EXPIRY_CHUNK_SIZE", "500"))
+
+# Visitor selfie processing (apps/gatepass/selfies.py): 'pool' runs it in SELFIE_PROCESSING_WORKERS
+# worker processes after the upload request returns, 'sync' inline. Selfies are kept at most
+# SELFIE_MAX_DIMENSION pixels on a side, with WebP thumbnails of SELFIE_THUMBNAIL_SIZE.
+SELFIE_PROCESSING = os.environ.get("SELFIE_PROCESSING", "pool")
+SELFIE_PROCESSING_WORKERS = int(os.environ.get("SELFIE_PROCESSING_WORKERS", "2"))
+SELFIE_MAX_DIMENSION = int(os.environ.get("SELFIE_MAX_DIMENSION", "1600"))
+SELFIE_THUMBNAIL_SIZE = int(os.environ.get("SELFIE_THUMBNAIL_SIZE", "320"))
+
+# Data that server processes keep in memory is versioned in the database (apps/core_data/versions.py);
+# each process rereads the versions at most every DATA_VERSION_TTL seconds, so a change made through
+# another process is picked up within that long.
+DATA_VERSION_TTL = float(os.environ.get("DATA_VERSION_TTL", "1"))
+# Autocomplete (/api/core-data/autocomplete/<source>/): results per request, and how many recent
+# prefixes each process keeps answers for.
+AUTOCOMPLETE_PAGE_SIZE = int(os.environ.get("AUTOCOMPLETE_PAGE_SIZE", "10"))
+AUTOCOMPLETE_CACHE_SIZE = int(os.environ.get("AUTOCOMPLETE_CACHE_SIZE", "1024"))
+
+# Pre-approved NIDs (apps/gatepass/preapproved.py): the Bloom filter's false positive rate, and how many
+# NIDs it let through each process remembers the database's answer for.
+PREAPPROVED_BLOOM_ERROR_RATE = float(os.environ.get("PREAPPROVED_BLOOM_ERROR_RATE", "0.01"))
+PREAPPROVED_EXACT_SET_SIZE = int(os.environ.get("PREAPPROVED_EXACT_SET_SIZE", "4096"))
+
+# ?q= search on gate passes, visitor passes and pre-approved visitors (apps/gatepass/search.py): the
+# shortest useful query word, the most results returned, and on PostgreSQL the statement timeout per search.
+SEARCH_MIN_CHARS = int(os.environ.get("SEARCH_MIN_CHARS", "2"))
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", "50"))
+SEARCH_TIMEOUT_MS = int(os.environ.get("SEARCH_TIMEOUT_MS", "300"))
+
+# Vehicle lookup by plate (apps/vehicles/plates.py): a read with no exact or OCR match is compared with at
+# most this many vehicles sharing half of it; when more share it, the read is reported as ambiguous.
+PLATE_FUZZY_MAX_CANDIDATES = int(os.environ.get("PLATE_FUZZY_MAX_CANDIDATES", "200"))
+
+# Resumable chunked uploads (apps/uploads/). Partial files are staged in UPLOAD_STAGING_DIR on local
+# disk; each PATCH may carry at most UPLOAD_MAX_CHUNK_BYTES, and a whole file at most UPLOAD_MAX_BYTES.
+# Finished uploads are validated on a background thread ('thread') or inline ('sync'). The staging
+# directory holds unvalidated bytes and must not be under MEDIA_ROOT, which is served publicly.
+# A client (anonymous: per IP; signed in: per user) may have at most UPLOAD_MAX_OPEN unfinished uploads.
+UPLOAD_STAGING_DIR = os.environ.get("UPLOAD_STAGING_DIR", str(BASE_DIR / 'upload-staging'))
+UPLOAD_MAX_CHUNK_BYTES = int(os.environ.get("UPLOAD_MAX_CHUNK_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+UPLOAD_VALIDATION = os.environ.get("UPLOAD_VALIDATION", "thread")
+UPLOAD_MAX_OPEN = int(os.environ.get("UPLOAD_MAX_OPEN", "10"))
+
+# Media retention (apps/uploads/retention.py, `manage.py purge_media`), in days; 0 keeps files for good.
+# QR codes go that long after their pass expired, was rejected or was cancelled; selfies and alcohol-test
+# photos that long after they were taken; unclaimed uploads that long after their last chunk. Files no row
+# refers to are deleted once older than MEDIA_ORPHAN_GRACE_HOURS.
+MEDIA_RETENTION_QR_DAYS = int(os.environ.get("MEDIA_RETENTION_QR_DAYS", "7"))
+MEDIA_RETENTION_SELFIE_DAYS = int(os.environ.get("MEDIA_RETENTION_SELFIE_DAYS", "90"))
+MEDIA_RETENTION_ALCOHOL_TEST_DAYS = int(os.environ.get("MEDIA_RETENTION_ALCOHOL_TEST_DAYS", "365"))
+MEDIA_RETENTION_UPLOAD_DAYS = int(os.environ.get("MEDIA_RETENTION_UPLOAD_DAYS", "2"))
+MEDIA_ORPHAN_GRACE_HOURS = int(os.environ.get("MEDIA_ORPHAN_GRACE_HOURS", "24"))
+MEDIA_RETENTION_BATCH_SIZE = int(os.environ.get("MEDIA_RETENTION_BATCH_SIZE", "1000"))
+
+# Maximum number of changed rows per resource returned by one /api/sync/ call.
+SYNC_PAGE_SIZE = int(os.environ.get("SYNC_PAGE_SIZE", "1000"))
+
 # Logging (basic for now, can be expanded)
 LOGGING = {
     'version': 1,
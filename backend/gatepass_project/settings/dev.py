@@ -9,4 +9,7 @@ ALLOWED_HOSTS = ['*'] # Allows all hosts for development
 # Email Configuration for Development (Console Backend)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'admin@yourgatepasssystem.com'
-SERVER_EMAIL = 'admin@yourgatepasssystem.com' # For error reporting
\ No newline at end of file
+SERVER_EMAIL = 'admin@yourgatepasssystem.com' # For error reporting
+
+# Log a warning with the repeated SQL whenever a view exceeds its query budget.
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'warn')
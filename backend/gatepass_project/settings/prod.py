@@ -10,9 +10,24 @@ SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
 if not SECRET_KEY:
     raise ValueError("DJANGO_SECRET_KEY environment variable not set.")
 
+# Offline snapshots are verified on the scanners, so they are signed with a key
+# of their own (see base.py) that must not be the server's SECRET_KEY.
+OFFLINE_SNAPSHOT_KEY = os.environ.get('OFFLINE_SNAPSHOT_KEY')
+if not OFFLINE_SNAPSHOT_KEY:
+    raise ValueError("OFFLINE_SNAPSHOT_KEY environment variable not set.")
+if OFFLINE_SNAPSHOT_KEY == SECRET_KEY:
+    raise ValueError("OFFLINE_SNAPSHOT_KEY must differ from DJANGO_SECRET_KEY.")
+
 # Database settings in production should often come from environment variables for security
 # DATABASES are configured in base.py to read from environment variables by default.
 
+# Reuse PostgreSQL connections across requests instead of opening one per request.
+# CONN_HEALTH_CHECKS (set in base.py) makes Django ping a reused connection before
+# handing it out, so connections dropped by the server are replaced transparently.
+# Set DB_POOL=True to use psycopg's connection pool instead (see base.py).
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' and not DB_POOL:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+
 # Production specific static files serving settings (e.g., using WhiteNoise)
 # STATIC_ROOT = BASE_DIR / 'staticfiles' # Ensure this matches your deployment setup
 # STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
@@ -21,11 +21,13 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 from apps.users.views import MyTokenObtainPairView
+from apps.monitoring.views import metrics_view
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     # JWT Authentication Endpoints
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -42,6 +44,9 @@ urlpatterns = [
     path('api/gate-operations/', include('apps.gate_operations.urls')),
     path('api/core-data/', include('apps.core_data.urls')), 
     path('api/reports/', include('apps.reports.urls')),
+    path('api/monitoring/', include('apps.monitoring.urls')),
+    path('api/sync/', include('apps.sync.urls')),
+    path('api/uploads/', include('apps.uploads.urls')),
 ]
 
 # Serve static and media files during development